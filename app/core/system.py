@@ -1,16 +1,33 @@
-from autoop.core.storage import LocalStorage
-from autoop.core.database import Database
+from autoop.core.storage import CachingStorage, LocalStorage, SQLiteStorage
+from autoop.core.storage import CompressedStorage, ShardedStorage
+from autoop.core.database import Database, JournalDatabase, SQLiteDatabase
 from autoop.core.ml.dataset import Dataset
-from autoop.core.ml.artifact import Artifact
-from autoop.core.storage import Storage
+from autoop.core.ml.artifact import Artifact, StorageLoader
+from autoop.core.storage import MAX_WORKERS, NotFoundError, Storage
+from autoop.core.storage import AsyncStorage, map_threads
+from autoop.functional.profile import join_sketches, split_sketches
 
-from typing import List
+import asyncio
+import hashlib
+import json
+import os
+import re
+import weakref
+from typing import List, MutableMapping, Tuple, Union
 
 
 class ArtifactRegistry():
     """
     Class for registering and handling artifacts.
+
+    The data of artifacts is stored content addressed: under the SHA-256
+    hash of the data, in the blobs collection of the database. Identical
+    data of different artifacts is therefore stored once. Every blob counts
+    the artifacts that hold or reference it and is deleted once that count
+    drops to zero.
     """
+    _INDEXED_FIELDS = ("type", "name", "tags", "version")
+
     def __init__(
             self,
             database: Database,
@@ -25,123 +42,886 @@ class ArtifactRegistry():
         """
         self._database = database
         self._storage = storage
+        for field in self._INDEXED_FIELDS:
+            self._database.create_index("artifacts", field)
 
-    def register(self, artifact: Artifact) -> None:
+    def register(self, artifact: Artifact,
+                 references: List[Artifact] = None) -> None:
         """
         Method used for registering artifacts in the storage and the metadata
-        of the artifact in a database
+        of the artifact in a database. The data is streamed to the storage, so
+        artifacts that are not loaded are never in memory at once, and it is
+        only written if no blob with the same hash exists.
 
         Args:
             artifact (Artifact): The artifact that has to be registered.
+            references (List[Artifact]): References, created with
+            reference(), to the artifacts of which the data the artifact
+            depends on. Their data is kept while this artifact exists.
+        """
+        error = self.register_many([artifact], [references])[0]
+        if error is not None:
+            raise error
+
+    def register_many(self, artifacts: List[Artifact],
+                      references: List[List[Artifact]] = None,
+                      max_workers: int = MAX_WORKERS) -> List[Exception]:
+        """
+        Register many artifacts at once. Their data is hashed and stored in
+        parallel over a pool of threads, and their metadata is written to the
+        database in one batch.
+
+        Args:
+            artifacts (List[Artifact]): The artifacts to register.
+            references (List[List[Artifact]]): The references of each
+            artifact, see register().
+            max_workers (int): The maximum number of threads.
+        Returns:
+            List[Exception]: For every artifact the exception raised while
+            registering it, None if it was registered.
+        """
+        references = references or [None] * len(artifacts)
+        results = map_threads(self._store, artifacts, max_workers)
+        orphans = []
+        # Orphans are deleted holding the lock, so no other process can
+        # acquire their blobs in between
+        with self._database.lock():
+            with self._database.batch():
+                for index, artifact in enumerate(artifacts):
+                    if isinstance(results[index], Exception):
+                        continue
+                    try:
+                        orphans += self._commit(artifact, *results[index],
+                                                references[index] or [])
+                        results[index] = None
+                    except Exception as e:
+                        results[index] = e
+            self._delete_keys(orphans)
+        return results
+
+    def _store(self, artifact: Artifact
+               ) -> Tuple[str, int, str, dict, List[Tuple[str, bytes, str]]]:
+        """
+        Private method that hashes the data of an artifact and streams it to
+        the storage if no blob with the same hash exists. The metadata of
+        datasets gets their profile, of which the sketches are stored in a
+        blob of their own, see load_profile.
+
+        Args:
+            artifact (Artifact): The artifact to store.
+        Returns:
+            Tuple[str, int, str, dict, List[Tuple[str, bytes, str]]]: The
+            hash and size of the data, the storage key if it was stored, the
+            metadata to register and the hash, data and storage key, if it
+            was stored, of the other blobs the artifact holds.
+        """
+        digest, size = self._hash(artifact)
+        key = None
+        if self._database.get("blobs", digest) is None:
+            key = self._blob_key(digest, artifact.type)
+            self._storage.save_stream(artifact.stream(), key)
+        metadata = artifact.metadata
+        sidecars = []
+        if isinstance(artifact, Dataset):
+            metadata["profile"], sidecars = self._store_sketches(
+                artifact.profile)
+        return digest, size, key, metadata, sidecars
+
+    def _store_sketches(self, profile: dict
+                        ) -> Tuple[dict, List[Tuple[str, bytes, str]]]:
         """
-        self._storage.save(artifact.data, artifact.asset_path)
-        metadata = {
+        Private method that stores the sketches of the columns of a profile
+        in a blob, as they are much larger than the other statistics.
+
+        Args:
+            profile (dict): The profile of a dataset.
+        Returns:
+            Tuple[dict, List[Tuple[str, bytes, str]]]: The profile with the
+            hash of the blob of the sketches instead of the sketches, and the
+            hash, data and storage key, if it was stored, of that blob.
+        """
+        if isinstance(profile.get("sketches"), str):
+            # The profile of a registered dataset refers to its sketches
+            if self._database.get("blobs", profile["sketches"]) is None:
+                return {name: value for name, value in profile.items()
+                        if name != "sketches"}, []
+            return profile, [(profile["sketches"], None, None)]
+        summary, sketches = split_sketches(profile)
+        data = json.dumps(sketches).encode()
+        digest = hashlib.sha256(data).hexdigest()
+        key = None
+        if self._database.get("blobs", digest) is None:
+            key = self._blob_key(digest, "sketches")
+            self._storage.save(data, key)
+        return {**summary, "sketches": digest}, [(digest, data, key)]
+
+    def _commit(self, artifact: Artifact, digest: str, size: int, key: str,
+                metadata: dict, sidecars: List[Tuple[str, bytes, str]],
+                references: List[Artifact]) -> List[str]:
+        """
+        Private method that writes the metadata of a stored artifact to the
+        database, in a batch.
+
+        Args:
+            artifact (Artifact): The artifact to register.
+            digest (str): The hash of the data.
+            size (int): The size of the data.
+            key (str): The storage key, if the data was stored.
+            metadata (dict): The metadata of the artifact.
+            sidecars (List[Tuple[str, bytes, str]]): The other blobs the
+            artifact holds, see _store.
+            references (List[Artifact]): The references of the artifact.
+        Returns:
+            List[str]: The storage keys of the data that is no longer held.
+        """
+        reference_digests = [json.loads(reference.data)["blob"]
+                             for reference in references]
+        for reference_digest in reference_digests:
+            if self._database.get("blobs", reference_digest) is None:
+                raise NotFoundError(f"blob {reference_digest}")
+        if key is None and self._database.get("blobs", digest) is None:
+            # Another process deleted the blob since it was checked
+            key = self._blob_key(digest, artifact.type)
+            self._storage.save_stream(artifact.stream(), key)
+        entry = {
             "name": artifact.name,
             "version": artifact.version,
             "asset_path": artifact.asset_path,
             "tags": artifact.tags,
-            "metadata": artifact.metadata,
+            "metadata": metadata,
             "type": artifact.type,
+            "blob": digest,
+            # The other blobs are released with the artifact like references
+            "references": reference_digests + [sidecar[0]
+                                               for sidecar in sidecars],
         }
-        self._database.set("artifacts", artifact.id, metadata)
+        previous = self._database.get("artifacts", artifact.id)
+        orphans = self._hold(digest, key, size)
+        for sidecar_digest, data, sidecar_key in sidecars:
+            missing = self._database.get("blobs", sidecar_digest) is None
+            if data is not None and sidecar_key is None and missing:
+                # Another process deleted the blob since it was checked
+                sidecar_key = self._blob_key(sidecar_digest, "sketches")
+                self._storage.save(data, sidecar_key)
+            orphans += self._hold(sidecar_digest, sidecar_key,
+                                  len(data or b""))
+        for reference_digest in reference_digests:
+            self._acquire(reference_digest)
+        self._database.set("artifacts", artifact.id, entry)
+        return orphans + (self._release(previous) if previous else [])
 
-    def list(self, type: str = None) -> List[Artifact]:
+    def list(
+            self,
+            type: str = None,
+            lazy: bool = False,
+            tag: str = None,
+            name_prefix: str = None
+    ) -> List[Artifact]:
         """
         Gets all the selected type artifacts from the artifact registery.
 
         Args:
             type (str): The type of artifact you want to get.
+            lazy (bool): If True, the artifacts are built from the database
+            entries only and their data is loaded from the storage the first
+            time it is read.
+            tag (str): Only get the artifacts that have this tag.
+            name_prefix (str): Only get the artifacts of which the name starts
+            with this prefix.
         Returns:
             List[Artifact]: All the artifacts from the selected artifact type.
         """
-        entries = self._database.list("artifacts")
-        artifacts = []
-        for id, data in entries:
-            if type is not None and data["type"] != type:
-                continue
-            if type == "dataset":
-                artifact = Dataset(
-                    name=data["name"],
-                    version=data["version"],
-                    asset_path=data["asset_path"],
-                    tags=data["tags"],
-                    metadata=data["metadata"],
-                    data=self._storage.load(data["asset_path"]),
-                )
-            else:
-                artifact = Artifact(
-                    name=data["name"],
-                    version=data["version"],
-                    asset_path=data["asset_path"],
-                    tags=data["tags"],
-                    metadata=data["metadata"],
-                    data=self._storage.load(data["asset_path"]),
-                    type=data["type"],
-                )
-            artifacts.append(artifact)
+        equal = {"type": type} if type is not None else None
+        contains = {"tags": tag} if tag is not None else None
+        prefix = {"name": name_prefix} if name_prefix is not None else None
+        entries = self._database.query("artifacts", equal=equal,
+                                       contains=contains, prefix=prefix)
+        artifacts = self._to_artifacts([data for id, data in entries], lazy)
+        for artifact in artifacts:
+            if isinstance(artifact, Exception):
+                raise artifact
         return artifacts
 
-    def get(self, artifact_id: str) -> Artifact:
+    def get_latest(self, name: str, type: str = None,
+                   lazy: bool = False) -> Union[Artifact, None]:
+        """
+        Get the latest version of the artifacts with a name.
+
+        Args:
+            name (str): The name of the artifact.
+            type (str): The type of the artifact, any type if None.
+            lazy (bool): If True, the data of the artifact is loaded from the
+            storage the first time it is read.
+        Returns:
+            Union[Artifact, None]: The artifact with the highest version, None
+            if there is no artifact with the name.
+        """
+        equal = {"name": name}
+        if type is not None:
+            equal["type"] = type
+        entries = self._database.query("artifacts", equal=equal)
+        if not entries:
+            return None
+        id, data = max(entries, key=lambda entry: self._version_key(
+            entry[1]["version"]))
+        return self._to_artifact(data, lazy)
+
+    @staticmethod
+    def _version_key(version: str) -> Tuple:
+        """
+        Private method that gives the key versions are ordered by. Numeric
+        parts compare as numbers and rank above other parts, e.g. "1.0.0"
+        above "1.0rc1", which compare as text.
+
+        Args:
+            version (str): The version.
+        Returns:
+            Tuple: The key of the version.
+        """
+        return tuple((1, int(part), "") if part.isdigit() else (0, 0, part)
+                     for part in str(version).split("."))
+
+    def get(self, artifact_id: str, lazy: bool = False) -> Artifact:
         """
         Get a specific artifact from the artifact registery using the artifact
         id.
 
         Args:
             artifact_id (str): The artifact id you are referring to.
+            lazy (bool): If True, the data of the artifact is loaded from the
+            storage the first time it is read.
         Returns:
             Artifact: The artifact that gets returned from the id.
         """
         data = self._database.get("artifacts", artifact_id)
+        return self._to_artifact(data, lazy)
+
+    def get_many(self, artifact_ids: List[str], lazy: bool = False,
+                 max_workers: int = MAX_WORKERS
+                 ) -> List[Union[Artifact, Exception]]:
+        """
+        Get many artifacts at once, loading their data in parallel over a
+        pool of threads.
+
+        Args:
+            artifact_ids (List[str]): The artifact ids you are referring to.
+            lazy (bool): If True, the data of the artifacts is loaded from the
+            storage the first time it is read.
+            max_workers (int): The maximum number of threads.
+        Returns:
+            List[Union[Artifact, Exception]]: For every id the artifact, or
+            the exception raised while getting it.
+        """
+        entries = [self._database.get("artifacts", artifact_id)
+                   for artifact_id in artifact_ids]
+        found = [data for data in entries if data is not None]
+        artifacts = iter(self._to_artifacts(found, lazy, max_workers))
+        return [next(artifacts) if data is not None
+                else NotFoundError(f"artifact {artifact_id}")
+                for artifact_id, data in zip(artifact_ids, entries)]
+
+    def content_hash(self, artifact_id: str) -> Union[str, None]:
+        """
+        Get the hash of the data of an artifact.
+
+        Args:
+            artifact_id (str): The artifact id you are referring to.
+        Returns:
+            Union[str, None]: The SHA-256 hash of the data, None for artifacts
+            registered before data was stored by hash.
+        """
+        return self._database.get("artifacts", artifact_id).get("blob")
+
+    def load_profile(self, artifact_id: str) -> dict:
+        """
+        Get the profile of a registered dataset with the sketches of its
+        columns, which are stored apart from its metadata, e.g. to merge it
+        with the profile of other rows.
+
+        Args:
+            artifact_id (str): The id of the dataset.
+        Returns:
+            dict: The profile, see autoop.functional.profile.
+        Raises:
+            NotFoundError: If the sketches are no longer stored.
+        """
+        data = self._database.get("artifacts", artifact_id)
+        profile = data["metadata"]["profile"]
+        if not isinstance(profile.get("sketches"), str):
+            return profile
+        blob = self._database.get("blobs", profile["sketches"])
+        if blob is None:
+            raise NotFoundError(f"blob {profile['sketches']}")
+        return join_sketches(profile,
+                             json.loads(self._storage.load(blob["key"])))
+
+    def reference(self, artifact_id: str) -> Artifact:
+        """
+        Create a small artifact that refers to a registered artifact by the
+        hash of its data, e.g. to keep a dataset out of a pipeline.
+
+        Args:
+            artifact_id (str): The artifact id you are referring to.
+        Returns:
+            Artifact: Artifact of type "reference", which resolve() turns
+            back into the referred artifact.
+        """
+        data = self._database.get("artifacts", artifact_id)
+        if "blob" not in data:
+            # Artifacts registered before data was stored by hash are
+            # registered again, which moves their data to a blob
+            self.register(self._to_artifact(data, lazy=True))
+            data = self._database.get("artifacts", artifact_id)
+        return Artifact(
+            name=data["name"],
+            type="reference",
+            data=json.dumps(data).encode(),
+        )
+
+    def resolve(self, reference: Artifact, lazy: bool = True) -> Artifact:
+        """
+        Get the artifact a reference refers to. This works as long as the
+        artifact that holds the reference is registered, even if the referred
+        artifact itself was deleted.
+
+        Args:
+            reference (Artifact): The reference created with reference().
+            lazy (bool): If True, the data of the artifact is loaded from the
+            storage the first time it is read.
+        Returns:
+            Artifact: The referred artifact, a Dataset if it is a dataset.
+        """
+        return self._to_artifact(json.loads(reference.data), lazy)
+
+    def _to_artifacts(self, entries: List[dict], lazy: bool,
+                      max_workers: int = MAX_WORKERS
+                      ) -> List[Union[Artifact, Exception]]:
+        """
+        Private method that builds artifacts from their database entries,
+        loading their data in parallel unless lazy.
+
+        Args:
+            entries (List[dict]): The database entries of the artifacts.
+            lazy (bool): Whether loading the data is deferred until it is
+            read.
+            max_workers (int): The maximum number of threads.
+        Returns:
+            List[Union[Artifact, Exception]]: For every entry the artifact,
+            or the exception raised while loading its data.
+        """
+        if lazy:
+            return [self._to_artifact(data, lazy) for data in entries]
+        loaded = self._storage.load_many(
+            [self._storage_key(data) for data in entries], max_workers)
+        return [payload if isinstance(payload, Exception)
+                else self._to_artifact(data, lazy, payload)
+                for data, payload in zip(entries, loaded)]
+
+    def _to_artifact(self, data: dict, lazy: bool,
+                     loaded: bytes = None) -> Artifact:
+        """
+        Private method that builds an artifact from its database entry.
+
+        Args:
+            data (dict): The database entry of the artifact.
+            lazy (bool): Whether loading the data is deferred until it is
+            read.
+            loaded (bytes): The data of the artifact, if it was loaded
+            already.
+        Returns:
+            Artifact: The artifact, a Dataset if the entry is a dataset.
+        """
+        asset_path = data["asset_path"]
+        key = self._storage_key(data)
+        if loaded is not None:
+            payload = {"data": loaded}
+        elif lazy:
+            payload = {"loader": StorageLoader(self._storage, key)}
+        else:
+            payload = {"data": self._storage.load(key)}
+        if data["type"] == "dataset":
+            return Dataset(
+                name=data["name"],
+                version=data["version"],
+                asset_path=asset_path,
+                tags=data["tags"],
+                metadata=data["metadata"],
+                **payload,
+            )
         return Artifact(
             name=data["name"],
             version=data["version"],
-            asset_path=data["asset_path"],
+            asset_path=asset_path,
             tags=data["tags"],
             metadata=data["metadata"],
-            data=self._storage.load(data["asset_path"]),
             type=data["type"],
+            **payload,
         )
 
     def delete(self, artifact_id: str) -> None:
         """
-        Delete a specific artifact using the artifact id.
+        Delete a specific artifact using the artifact id. Its data is deleted
+        once no other artifact holds or references it.
 
         Args:
             artifact_id (str): The artifact id you are referring to.
         """
-        data = self._database.get("artifacts", artifact_id)
-        self._storage.delete(data["asset_path"])
-        self._database.delete("artifacts", artifact_id)
+        with self._database.lock():
+            with self._database.batch():
+                data = self._database.get("artifacts", artifact_id)
+                orphans = self._release(data)
+                self._database.delete("artifacts", artifact_id)
+            self._delete_keys(orphans)
+
+    def _storage_key(self, data: dict) -> str:
+        """
+        Private method that gets the storage key of the data of an artifact.
+
+        Args:
+            data (dict): The database entry of the artifact.
+        Returns:
+            str: The key of its blob, or its asset path for artifacts
+            registered before data was stored by hash.
+        """
+        if "blob" not in data:
+            return data["asset_path"]
+        blob = self._database.get("blobs", data["blob"])
+        if blob is None:
+            raise NotFoundError(f"blob {data['blob']}")
+        return blob["key"]
+
+    @staticmethod
+    def _hash(artifact: Artifact) -> Tuple[str, int]:
+        """
+        Private method that hashes the data of an artifact in chunks.
+
+        Args:
+            artifact (Artifact): The artifact to hash.
+        Returns:
+            Tuple[str, int]: The SHA-256 hash and the size of the data.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        for chunk in artifact.stream():
+            digest.update(chunk)
+            size += len(chunk)
+        return digest.hexdigest(), size
+
+    @staticmethod
+    def blob_prefix(type: str) -> str:
+        """
+        Get the storage key prefix of the data of artifacts of a type, e.g.
+        to compress types differently.
+
+        Args:
+            type (str): The type of the artifact.
+        Returns:
+            str: The storage key prefix.
+        """
+        folder = re.sub(r"[^A-Za-z0-9_-]", "_", type) or "artifact"
+        return os.path.join("blobs", folder)
+
+    @staticmethod
+    def _blob_key(digest: str, type: str) -> str:
+        """
+        Private method that gets the storage key for new data. The key starts
+        with the artifact type, so storages can treat types differently.
+
+        Args:
+            digest (str): The hash of the data.
+            type (str): The type of the artifact.
+        Returns:
+            str: The storage key.
+        """
+        return os.path.join(ArtifactRegistry.blob_prefix(type), digest[:2],
+                            digest)
+
+    def _hold(self, digest: str, key: str = None,
+              size: int = 0) -> List[str]:
+        """
+        Private method that counts an extra artifact holding a blob, which
+        may have just been stored.
+
+        Args:
+            digest (str): The hash of the data.
+            key (str): The storage key, if the data was stored.
+            size (int): The size of the data, if it was stored.
+        Returns:
+            List[str]: The key the data was stored under if the blob is held
+            under another key already, so the copy can be deleted.
+        """
+        blob = self._database.get("blobs", digest)
+        self._acquire(digest, key, size)
+        if key is not None and blob is not None and blob["key"] != key:
+            # An artifact of another type in the same batch stored the same
+            # data first, under its own key
+            return [key]
+        return []
+
+    def _acquire(self, digest: str, key: str = None, size: int = 0) -> None:
+        """
+        Private method that counts an extra artifact holding a blob.
+
+        Args:
+            digest (str): The hash of the data.
+            key (str): The storage key, required if the blob is new.
+            size (int): The size of the data, if the blob is new.
+        """
+        blob = self._database.get("blobs", digest)
+        if blob is None:
+            if key is None:
+                raise NotFoundError(f"blob {digest}")
+            blob = {"key": key, "size": size, "refs": 0}
+        self._database.set("blobs", digest, {**blob,
+                                             "refs": blob["refs"] + 1})
+
+    def _release(self, data: dict) -> List[str]:
+        """
+        Private method that stops counting an artifact for the blobs it holds
+        and references.
+
+        Args:
+            data (dict): The database entry of the artifact.
+        Returns:
+            List[str]: The storage keys of the data that is no longer held.
+        """
+        if "blob" not in data:
+            return [data["asset_path"]]
+        orphans = []
+        for digest in [data["blob"]] + data.get("references", []):
+            blob = self._database.get("blobs", digest)
+            if blob is None:
+                continue
+            if blob["refs"] <= 1:
+                self._database.delete("blobs", digest)
+                orphans.append(blob["key"])
+            else:
+                self._database.set("blobs", digest, {**blob,
+                                                     "refs": blob["refs"] - 1})
+        return orphans
+
+    def _delete_keys(self, keys: List[str]) -> None:
+        """
+        Private method that deletes data from the storage.
+
+        Args:
+            keys (List[str]): The storage keys of the data to delete.
+        """
+        for key in keys:
+            try:
+                self._storage.delete(key)
+            except NotFoundError:
+                pass
+
+
+class AsyncArtifactRegistry():
+    """
+    Asynchronous interface to an artifact registry, e.g. for a service that
+    reads many artifacts at once. The database is in memory and only
+    accessed by one call of an event loop at a time, while the data of the
+    artifacts is loaded concurrently through an AsyncStorage. The interface
+    can be used from more than one event loop, e.g. by repeated
+    asyncio.run() calls.
+
+    Example:
+        registry = AutoMLSystem.get_instance().async_registry
+        pipelines = await registry.list("pipeline")
+    """
+    def __init__(self, registry: ArtifactRegistry,
+                 storage: AsyncStorage) -> None:
+        """
+        Initialize the class AsyncArtifactRegistry.
+
+        Args:
+            registry (ArtifactRegistry): The registry to call.
+            storage (AsyncStorage): Asynchronous interface to the storage of
+            the registry, which limits the concurrent calls.
+        """
+        self._registry = registry
+        self._storage = storage
+        # asyncio primitives can only be used by one event loop, so every
+        # loop gets its own lock
+        self._locks: MutableMapping[
+            asyncio.AbstractEventLoop, asyncio.Lock
+        ] = weakref.WeakKeyDictionary()
+
+    async def register(self, artifact: Artifact,
+                       references: List[Artifact] = None) -> None:
+        """
+        Register an artifact, see ArtifactRegistry.register.
+
+        Args:
+            artifact (Artifact): The artifact that has to be registered.
+            references (List[Artifact]): References to the artifacts of which
+            the data the artifact depends on.
+        """
+        async with self._lock():
+            await self._storage.run(self._registry.register, artifact,
+                                    references)
+
+    async def register_many(self, artifacts: List[Artifact],
+                            references: List[List[Artifact]] = None
+                            ) -> List[Exception]:
+        """
+        Register many artifacts, see ArtifactRegistry.register_many.
+
+        Args:
+            artifacts (List[Artifact]): The artifacts to register.
+            references (List[List[Artifact]]): The references of each
+            artifact.
+        Returns:
+            List[Exception]: For every artifact the exception raised while
+            registering it, None if it was registered.
+        """
+        async with self._lock():
+            return await self._storage.run(self._registry.register_many,
+                                           artifacts, references)
+
+    async def get(self, artifact_id: str, lazy: bool = False) -> Artifact:
+        """
+        Get an artifact using the artifact id.
+
+        Args:
+            artifact_id (str): The artifact id you are referring to.
+            lazy (bool): If True, the data of the artifact is loaded from the
+            storage the first time it is read.
+        Returns:
+            Artifact: The artifact that gets returned from the id.
+        """
+        async with self._lock():
+            artifact = self._registry.get(artifact_id, lazy=True)
+        if not lazy:
+            await self._storage.run(self._load, artifact)
+        return artifact
+
+    async def get_many(self, artifact_ids: List[str], lazy: bool = False
+                       ) -> List[Union[Artifact, Exception]]:
+        """
+        Get many artifacts, loading their data concurrently.
+
+        Args:
+            artifact_ids (List[str]): The artifact ids you are referring to.
+            lazy (bool): If True, the data of the artifacts is loaded from the
+            storage the first time it is read.
+        Returns:
+            List[Union[Artifact, Exception]]: For every id the artifact, or
+            the exception raised while getting it.
+        """
+        return await asyncio.gather(
+            *(self.get(artifact_id, lazy) for artifact_id in artifact_ids),
+            return_exceptions=True)
+
+    async def list(self, type: str = None, lazy: bool = False,
+                   tag: str = None, name_prefix: str = None
+                   ) -> List[Artifact]:
+        """
+        Get the artifacts that match the filters, loading their data
+        concurrently. See ArtifactRegistry.list for the filters.
+
+        Args:
+            type (str): The type of artifact you want to get.
+            lazy (bool): If True, the data of the artifacts is loaded from the
+            storage the first time it is read.
+            tag (str): Only get the artifacts that have this tag.
+            name_prefix (str): Only get the artifacts of which the name starts
+            with this prefix.
+        Returns:
+            List[Artifact]: The matching artifacts.
+        """
+        async with self._lock():
+            artifacts = self._registry.list(type, lazy=True, tag=tag,
+                                            name_prefix=name_prefix)
+        if not lazy:
+            await asyncio.gather(*(self._storage.run(self._load, artifact)
+                                   for artifact in artifacts))
+        return artifacts
+
+    async def delete(self, artifact_id: str) -> None:
+        """
+        Delete an artifact using the artifact id.
+
+        Args:
+            artifact_id (str): The artifact id you are referring to.
+        """
+        async with self._lock():
+            await self._storage.run(self._registry.delete, artifact_id)
+
+    def _lock(self) -> asyncio.Lock:
+        """
+        Private method that gets the lock of the running event loop.
+
+        Returns:
+            asyncio.Lock: The lock, created on first use in the loop.
+        """
+        loop = asyncio.get_running_loop()
+        if loop not in self._locks:
+            self._locks[loop] = asyncio.Lock()
+        return self._locks[loop]
+
+    @staticmethod
+    def _load(artifact: Artifact) -> None:
+        """
+        Private method that loads the data of a lazy artifact.
+
+        Args:
+            artifact (Artifact): The artifact to load.
+        """
+        # Reading the data of a lazy artifact loads and keeps it
+        artifact.data
 
 
 class AutoMLSystem:
     """
     Class for automatically handling machine learning.
+
+    The backends of the instance are chosen by the configuration, which
+    defaults to the AUTOOP_ROOT, AUTOOP_STORAGE, AUTOOP_DATABASE,
+    AUTOOP_CACHE_BYTES and AUTOOP_COMPRESSION environment variables and can
+    be changed with configure().
     """
     _instance = None
+    _config = {
+        "root": os.environ.get("AUTOOP_ROOT", "./assets"),
+        "storage": os.environ.get("AUTOOP_STORAGE", "local"),
+        "database": os.environ.get("AUTOOP_DATABASE", "local"),
+        "cache_bytes": os.environ.get("AUTOOP_CACHE_BYTES", "0"),
+        "compression": os.environ.get("AUTOOP_COMPRESSION", ""),
+    }
 
-    def __init__(self, storage: LocalStorage, database: Database) -> None:
+    def __init__(self, storage: Storage, database: Database) -> None:
         """
         Initialize the class AutoMLSystem.
         """
         self._storage = storage
         self._database = database
         self._registry = ArtifactRegistry(database, storage)
+        self._async_registry = None
+
+    @property
+    def storage(self) -> Storage:
+        """
+        Getter method for the private storage variable.
+
+        Returns:
+            Storage: Storage of the artifacts.
+        """
+        return self._storage
+
+    @staticmethod
+    def configure(**options: Union[str, int]) -> None:
+        """
+        Change the configuration used to create the instance. The current
+        instance is dropped, so the next get_instance() uses the new
+        configuration.
+
+        Args:
+            **options (Union[str, int]): The options to change. root is the
+            directory the assets are stored in, storage is either "local",
+            "sharded" or "sqlite", database is either "local", "sharded",
+            "journal" or "sqlite" and
+            cache_bytes is the budget of the in-memory cache of the storage,
+            which is disabled if it is 0. compression is a comma separated
+            list of codecs: a codec alone is the default codec, type=codec
+            the codec of artifacts of that type, e.g. "zlib,model=none".
+            Compression is disabled if it is empty.
+        """
+        unknown = set(options) - set(AutoMLSystem._config)
+        if unknown:
+            raise ValueError(f"Unknown options: {', '.join(sorted(unknown))}")
+        AutoMLSystem._config.update(options)
+        AutoMLSystem._instance = None
+
+    @staticmethod
+    def _create_storage(config: dict) -> Storage:
+        """
+        Private method that creates the storage of the artifacts, wrapped in
+        compression if it has codecs and in a cache if it has a budget.
+
+        Args:
+            config (dict): The configuration of the system.
+        Returns:
+            Storage: The storage of the configured kind.
+        """
+        root = config["root"]
+        if config["storage"] == "local":
+            storage = LocalStorage(os.path.join(root, "objects"))
+        elif config["storage"] == "sharded":
+            storage = ShardedStorage(os.path.join(root, "objects-sharded"))
+        elif config["storage"] == "sqlite":
+            storage = SQLiteStorage(os.path.join(root, "objects.sqlite"))
+        else:
+            raise ValueError(f"Unknown storage: {config['storage']}")
+        if config["compression"]:
+            codec, rules = AutoMLSystem._parse_compression(
+                config["compression"])
+            storage = CompressedStorage(storage, codec=codec, rules=rules)
+        cache_bytes = int(config["cache_bytes"])
+        if cache_bytes > 0:
+            storage = CachingStorage(storage, max_bytes=cache_bytes)
+        return storage
+
+    @staticmethod
+    def _parse_compression(option: str) -> Tuple[str, dict]:
+        """
+        Private method that parses the compression option.
+
+        Args:
+            option (str): Comma separated codecs, type=codec for a type.
+        Returns:
+            Tuple[str, dict]: The default codec and the codec per key prefix
+            of the blobs of each type.
+        """
+        codec = "none"
+        rules = {}
+        for part in option.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            if "=" in part:
+                type, name = (value.strip() for value in part.split("=", 1))
+                rules[ArtifactRegistry.blob_prefix(type)] = name
+            else:
+                codec = part
+        return codec, rules
+
+    @staticmethod
+    def _create_database(config: dict) -> Database:
+        """
+        Private method that creates the database of the artifact registry.
+
+        Args:
+            config (dict): The configuration of the system.
+        Returns:
+            Database: The database of the configured kind.
+        """
+        root = config["root"]
+        if config["database"] == "local":
+            return Database(LocalStorage(os.path.join(root, "dbo")))
+        if config["database"] == "journal":
+            return JournalDatabase(LocalStorage(os.path.join(root,
+                                                             "journal")))
+        if config["database"] == "sharded":
+            return Database(ShardedStorage(os.path.join(root, "dbo-sharded")))
+        if config["database"] == "sqlite":
+            return SQLiteDatabase(SQLiteStorage(os.path.join(root,
+                                                             "dbo.sqlite")))
+        raise ValueError(f"Unknown database: {config['database']}")
 
     @staticmethod
     def get_instance() -> "AutoMLSystem":
         """
-        Get an instance of AutoMLSystem.
+        Get an instance of AutoMLSystem. The database is refreshed, which
+        only reloads the entries that other processes changed since the last
+        call.
 
         Returns:
             AutoMLSystem: The automlsystem instance.
         """
         if AutoMLSystem._instance is None:
+            config = AutoMLSystem._config
             AutoMLSystem._instance = AutoMLSystem(
-                LocalStorage("./assets/objects"),
-                Database(
-                    LocalStorage("./assets/dbo")
-                )
+                AutoMLSystem._create_storage(config),
+                AutoMLSystem._create_database(config)
             )
         AutoMLSystem._instance._database.refresh()
         return AutoMLSystem._instance
@@ -155,3 +935,18 @@ class AutoMLSystem:
             ArtifactRegistry: Registry for handling artifacts.
         """
         return self._registry
+
+    @property
+    def async_registry(self) -> AsyncArtifactRegistry:
+        """
+        Getter method for the asynchronous interface to the registry, which
+        is created on first use.
+
+        Returns:
+            AsyncArtifactRegistry: Asynchronous registry for handling
+            artifacts.
+        """
+        if self._async_registry is None:
+            self._async_registry = AsyncArtifactRegistry(
+                self._registry, AsyncStorage(self._storage))
+        return self._async_registry
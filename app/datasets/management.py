@@ -1,26 +1,37 @@
 from autoop.core.ml.dataset import Dataset
 from app.core.system import AutoMLSystem
 
-import pandas as pd
+import os
+from typing import BinaryIO, Union
 
+# The maximum size in bytes of uploads that are converted to the columnar
+# format, larger files are parsed in memory once they are used
+COLUMNAR_LIMIT = 64 << 20
 
-def create(file: str) -> Dataset:
+
+def create(file: Union[str, BinaryIO]) -> Dataset:
     """
-    Creates a dataset from a UploadedFile class or a file location.
+    Creates a dataset from a UploadedFile class or a file location. Files up
+    to COLUMNAR_LIMIT bytes are stored in the columnar format, unless they
+    have columns that format does not support. Larger files are stored as
+    they are, streamed from the upload to the storage.
 
     Args:
-        file: The path the data is stored in, must be in csv format.
+        file: The path or file object of the data, must be in csv format.
     """
-    dataframe = pd.read_csv(file)
-
-    dataset: Dataset = Dataset.from_dataframe(
-        name=file.name,
-        asset_path=file.name,
-        data=dataframe,
-        version="1.0.0"
-    )
-
-    return dataset
+    name = file if isinstance(file, str) else file.name
+    if isinstance(file, str):
+        size = os.path.getsize(file)
+    else:
+        size = file.seek(0, os.SEEK_END)
+    if size <= COLUMNAR_LIMIT:
+        try:
+            return Dataset.from_file(file, name=name, asset_path=name,
+                                     version="1.0.0", format="columnar")
+        except TypeError:
+            pass
+    return Dataset.from_file(file, name=name, asset_path=name,
+                             version="1.0.0")
 
 
 def save(dataset: Dataset) -> None:
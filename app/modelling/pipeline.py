@@ -232,10 +232,13 @@ def save_pipeline(
                     name="metrics_list",
                     data=pkl.dumps(metrics)
                 )
+                # The dataset is referred to by the hash of its data
+                # instead of being pickled into every pipeline
+                dataset_reference = automl.registry.reference(dataset.id)
                 pipeline_artifacts = pipeline.artifacts
                 pipeline_artifacts.extend([
                     metrics_artifact,
-                    dataset
+                    dataset_reference
                 ])
                 pipelines_artifact = Artifact(
                     name=pipeline_name + ".pkl",
@@ -244,7 +247,8 @@ def save_pipeline(
                     asset_path=pipeline_name + ".pkl",
                     data=pkl.dumps({"artifacts": pipeline_artifacts})
                 )
-                automl.registry.register(pipelines_artifact)
+                automl.registry.register(pipelines_artifact,
+                                         references=[dataset_reference])
             except Exception as e:
                 st.error(e)
                 return False
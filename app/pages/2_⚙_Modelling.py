@@ -41,7 +41,7 @@ write_helper_text("In this section, you can design a machine learning "
 
 automl = AutoMLSystem.get_instance()
 
-available_datasets = automl.registry.list(type="dataset")
+available_datasets = automl.registry.list(type="dataset", lazy=True)
 
 
 def modelling_page(available_datasets: List[Dataset]) -> None:
@@ -1,3 +1,4 @@
+import pandas as pd
 import streamlit as st
 from typing import List, Dict
 
@@ -5,11 +6,15 @@ from app.core.system import AutoMLSystem
 from app.datasets.management import create, save
 from autoop.core.ml.dataset import Dataset
 
+# The number of rows shown of a saved dataset
+PREVIEW_ROWS = 100
+
 automl = AutoMLSystem.get_instance()
 
 st.title("Dataset manager")
 
-available_datasets: List[Dataset] = automl.registry.list(type="dataset")
+available_datasets: List[Dataset] = automl.registry.list(type="dataset",
+                                                         lazy=True)
 dataset_contents: Dict = {}
 for dataset in available_datasets:
     dataset_contents[dataset.name] = dataset
@@ -30,7 +35,7 @@ if isinstance(dataset, Dataset):
 
     download = st.download_button(
         label="Download Dataset as CSV",
-        data=dataset.data,
+        data=dataset.to_csv(),
         file_name="uploaded_dataset.csv",
         mime="text/csv"
     )
@@ -63,7 +68,14 @@ if selected_dataset_name is not None:
     st.subheader(f"Dataset: {selected_dataset_name}")
 
     selected_dataset = dataset_contents[selected_dataset_name]
-    st.dataframe(selected_dataset.read())
+    profile = selected_dataset.profile
+    st.write(f"{profile['rows']} rows, {len(profile['columns'])} columns, "
+             f"about {profile['memory'] / 2 ** 20:.1f} MB in memory.")
+    st.dataframe(pd.DataFrame(profile["columns"]).T.drop(
+        columns="sketches", errors="ignore"))
+    # Only the first batch of rows is read for the preview
+    st.dataframe(next(selected_dataset.iter_batches(PREVIEW_ROWS),
+                      pd.DataFrame()))
 
     delete_button = st.button("Delete dataset")
 
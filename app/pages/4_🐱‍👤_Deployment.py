@@ -1,6 +1,5 @@
 import streamlit as st
 import pickle as pkl
-import pandas as pd
 from typing import List
 
 from app.core.system import AutoMLSystem
@@ -15,7 +14,8 @@ from autoop.core.ml.model import get_model
 
 automl = AutoMLSystem.get_instance()
 
-available_pipelines: List[Artifact] = automl.registry.list(type="pipeline")
+available_pipelines: List[Artifact] = automl.registry.list(type="pipeline",
+                                                           lazy=True)
 
 
 def write_helper_text(text: str) -> None:
@@ -39,7 +39,9 @@ def deployment_page(available_pipelines: List[Artifact]) -> None:
     """
     pipeline_artifact = select_pipeline(available_pipelines)
 
-    pipeline_data: dict = pkl.loads(pipeline_artifact.data)
+    with pipeline_artifact.view() as view:
+        pipeline_data: dict = pkl.loads(view)
+    pipeline_artifact.release()
     pipeline_artifacts: List[Artifact] = pipeline_data["artifacts"]
 
     metrics = None
@@ -53,7 +55,9 @@ def deployment_page(available_pipelines: List[Artifact]) -> None:
         if artifact.name == "metrics_list":
             metrics: List[Metric] = pkl.loads(artifact.data)
         elif artifact.type == "dataset":
-            dataset: List[Metric] = artifact
+            dataset: Dataset = artifact
+        elif artifact.type == "reference":
+            dataset: Dataset = automl.registry.resolve(artifact)
         elif artifact.name == "pipeline_config":
             pipeline_data = pkl.loads(artifact.data)
             target_feature: Feature = pipeline_data["target_feature"]
@@ -85,9 +89,8 @@ def deployment_page(available_pipelines: List[Artifact]) -> None:
     st.write("Upload a CSV file for predictions:")
     uploaded_file = st.file_uploader("Choose a CSV file", type="csv")
     if uploaded_file:
-        dataframe = pd.read_csv(uploaded_file)
-        prediction_dataset = Dataset.from_dataframe(
-            dataframe,
+        prediction_dataset = Dataset.from_file(
+            uploaded_file,
             uploaded_file.name,
             uploaded_file.name
         )
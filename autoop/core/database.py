@@ -1,14 +1,134 @@
-from autoop.core.storage import Storage
+from autoop.core.storage import NotFoundError, SQLiteStorage, Storage
 
+from bisect import bisect_left, insort
+from contextlib import contextmanager
 import json
 import os
-from typing import Tuple, List, Union
+from typing import Dict, Iterator, Tuple, List, Set, Union
+
+# A value of a field in an entry, as it can be stored in JSON
+Value = Union[str, int, float, bool, list, dict, None]
+
+
+class ConflictError(Exception):
+    """
+    Custom error class that is raised when an entry was changed since the
+    revision a change was based on
+    """
+    def __init__(self, collection: str, id: str, expected: int,
+                 actual: int) -> None:
+        """
+        Initialize ConflictError class
+        Args:
+            collection (str): The collection of the entry
+            id (str): The id of the entry
+            expected (int): The revision the change was based on
+            actual (int): The current revision of the entry
+        """
+        super().__init__(f"Entry {collection}/{id} is at revision {actual}, "
+                         f"not {expected}")
+        self.expected = expected
+        self.actual = actual
+
+
+class _Index():
+    """
+    Secondary index on a field of the entries in a collection. It maps every
+    value of the field to the ids of the entries with that value, list values
+    are indexed per element. String values are also kept sorted, so entries
+    can be found by a prefix of the value.
+    """
+    def __init__(self) -> None:
+        """
+        Initializer method of the index.
+        """
+        self._ids: Dict[Value, Set[str]] = {}
+        self._sorted: List[str] = []
+
+    def add(self, id: str, value: Value) -> None:
+        """Add an entry to the index
+        Args:
+            id (str): The id of the entry
+            value (Value): The value of the field in the entry
+        """
+        for item in self._items(value):
+            if item not in self._ids:
+                self._ids[item] = set()
+                if isinstance(item, str):
+                    insort(self._sorted, item)
+            self._ids[item].add(id)
+
+    def remove(self, id: str, value: Value) -> None:
+        """Remove an entry from the index
+        Args:
+            id (str): The id of the entry
+            value (Value): The value of the field in the entry
+        """
+        for item in self._items(value):
+            ids = self._ids.get(item)
+            if ids is None:
+                continue
+            ids.discard(id)
+            if not ids:
+                del self._ids[item]
+                if isinstance(item, str):
+                    self._sorted.pop(bisect_left(self._sorted, item))
+
+    def equal(self, value: Value) -> Set[str]:
+        """Find the entries of which the field has or contains a value
+        Args:
+            value (Value): The value to look for
+        Returns:
+            Set[str]: The ids of the entries
+        """
+        return set(self._ids.get(value, ()))
+
+    def prefix(self, prefix: str) -> Set[str]:
+        """Find the entries of which the field starts with a prefix
+        Args:
+            prefix (str): The prefix to look for
+        Returns:
+            Set[str]: The ids of the entries
+        """
+        ids = set()
+        for item in self._sorted[bisect_left(self._sorted, prefix):]:
+            if not item.startswith(prefix):
+                break
+            ids |= self._ids[item]
+        return ids
+
+    @staticmethod
+    def _items(value: Value) -> List[Value]:
+        """Get the hashable values to index for a field value
+        Args:
+            value (Value): The value of the field
+        Returns:
+            List[Value]: The value itself or the elements of a list
+        """
+        items = value if isinstance(value, list) else [value]
+        return [item for item in items
+                if item is not None and not isinstance(item, (list, dict))]
 
 
 class Database():
     """
     Database class for saving data.
+
+    Every persist increases the generation in a small manifest in the
+    storage and records which entries changed, so refresh only has to
+    reload the entries that other databases changed.
+
+    Databases in several processes can share a storage. Changes are
+    persisted while holding the lock of the storage on the manifest, and
+    batches hold it from start to end. Every entry has a revision, stored in
+    its _revision field, which increases on every set. Passing the revision
+    a change is based on to set or delete raises a ConflictError if another
+    database changed the entry since.
     """
+    _MANIFEST_KEY = ".manifest"
+    _MANIFEST_HISTORY = 256
+    REVISION_FIELD = "_revision"
+
     def __init__(self, storage: Storage) -> None:
         """
         Initalizer method of database class.
@@ -18,24 +138,42 @@ class Database():
         """
         self._storage = storage
         self._data = {}
+        self._revisions: Dict[Tuple[str, str], int] = {}
+        self._dirty: Set[Tuple[str, str]] = set()
+        self._deleted: Set[Tuple[str, str]] = set()
+        self._batch_depth = 0
+        self._generation = 0
+        self._indexes: Dict[str, Dict[str, _Index]] = {}
         self._load()
 
-    def set(self, collection: str, id: str, entry: dict) -> dict:
+    def set(self, collection: str, id: str, entry: dict,
+            revision: int = None) -> dict:
         """Set a key in the database
         Args:
             collection (str): The collection to store the data in
             id (str): The id of the data
             entry (dict): The data to store
+            revision (int): The revision of the entry the data is based on,
+            0 if the entry must not exist yet. Not checked if None
         Returns:
             dict: The data that was stored
+        Raises:
+            ConflictError: If the entry is not at the given revision
         """
         assert isinstance(entry, dict), "Data must be a dictionary"
         assert isinstance(collection, str), "Collection must be a string"
         assert isinstance(id, str), "ID must be a string"
-        if not self._data.get(collection, None):
-            self._data[collection] = {}
-        self._data[collection][id] = entry
-        self._persist()
+        with self._storage.lock(self._MANIFEST_KEY):
+            current = self._check_revision(collection, id, revision)
+            self._revisions[(collection, id)] = current + 1
+            if not self._data.get(collection, None):
+                self._data[collection] = {}
+            self._update_indexes(collection, id,
+                                 self._data[collection].get(id), entry)
+            self._data[collection][id] = entry
+            self._dirty.add((collection, id))
+            self._deleted.discard((collection, id))
+            self._persist()
         return entry
 
     def get(self, collection: str, id: str) -> Union[dict, None]:
@@ -51,19 +189,53 @@ class Database():
             return None
         return self._data[collection].get(id, None)
 
-    def delete(self, collection: str, id: str) -> None:
+    def delete(self, collection: str, id: str, revision: int = None) -> None:
         """Delete a key from the database
         Args:
             collection (str): The collection to delete the data from
             id (str): The id of the data
+            revision (int): The revision of the entry the deletion is based
+            on. Not checked if None
         Returns:
             None
+        Raises:
+            ConflictError: If the entry is not at the given revision
         """
-        if not self._data.get(collection, None):
-            return
-        if self._data[collection].get(id, None):
-            del self._data[collection][id]
-        self._persist()
+        with self._storage.lock(self._MANIFEST_KEY):
+            self._check_revision(collection, id, revision)
+            if not self._data.get(collection, None):
+                return
+            if id in self._data[collection]:
+                self._update_indexes(collection, id,
+                                     self._data[collection].pop(id), None)
+                self._revisions.pop((collection, id), None)
+                self._deleted.add((collection, id))
+                self._dirty.discard((collection, id))
+            self._persist()
+
+    @contextmanager
+    def lock(self) -> Iterator["Database"]:
+        """Hold the lock of the storage that changes are persisted under, so
+        other processes cannot change the database meanwhile. Batches hold
+        it as well, use this to keep it while working outside the database.
+        Yields:
+            Database: The database itself
+        """
+        with self._storage.lock(self._MANIFEST_KEY):
+            yield self
+
+    def revision(self, collection: str, id: str) -> int:
+        """Get the revision of an entry, which increases on every set
+        Args:
+            collection (str): The collection of the entry
+            id (str): The id of the entry
+        Returns:
+            int: The revision, 0 if the entry does not exist
+        """
+        if self.get(collection, id) is None:
+            return 0
+        # Entries stored before revisions were introduced are at revision 1
+        return self._revisions.get((collection, id), 1)
 
     def list(self, collection: str) -> List[Tuple[str, dict]]:
         """Lists all data in a collection
@@ -77,33 +249,575 @@ class Database():
             return []
         return [(id, data) for id, data in self._data[collection].items()]
 
+    def create_index(self, collection: str, field: str) -> None:
+        """Declare a secondary index on a field of the entries in a
+        collection, so queries on the field do not scan the collection. The
+        index is kept in memory and maintained on every change.
+        Args:
+            collection (str): The collection to index
+            field (str): The field of the entries to index
+        """
+        indexes = self._indexes.setdefault(collection, {})
+        if field in indexes:
+            return
+        index = _Index()
+        for id, entry in self._data.get(collection, {}).items():
+            index.add(id, entry.get(field))
+        indexes[field] = index
+
+    def query(
+            self,
+            collection: str,
+            equal: Dict[str, Value] = None,
+            contains: Dict[str, Value] = None,
+            prefix: Dict[str, str] = None
+    ) -> List[Tuple[str, dict]]:
+        """Find the entries in a collection that match all conditions.
+        Conditions on indexed fields are answered by the index, others by
+        checking the entries.
+        Args:
+            collection (str): The collection to query
+            equal (Dict[str, Value]): Fields that must equal a value
+            contains (Dict[str, Value]): List fields that must contain a value,
+            such as a tag
+            prefix (Dict[str, str]): String fields that must start with a
+            prefix
+        Returns:
+            List[Tuple[str, dict]]: A list of tuples containing the id and
+            data for each matching item, sorted by id
+        """
+        entries = self._data.get(collection, {})
+        indexes = self._indexes.get(collection, {})
+        conditions = [
+            (field, value, kind) for kind, fields in
+            (("equal", equal), ("contains", contains), ("prefix", prefix))
+            for field, value in (fields or {}).items()
+        ]
+        ids = None
+        unindexed = []
+        for field, value, kind in conditions:
+            if field not in indexes or isinstance(value, (list, dict)):
+                unindexed.append((field, value, kind))
+                continue
+            index = indexes[field]
+            if kind == "prefix":
+                found = index.prefix(value)
+            else:
+                found = index.equal(value)
+                if kind == "equal":
+                    found = {id for id in found
+                             if entries[id].get(field) == value}
+            ids = found if ids is None else ids & found
+        if ids is None:
+            ids = entries.keys()
+        return [(id, entries[id]) for id in sorted(ids)
+                if all(self._matches(entries[id], *condition)
+                       for condition in unindexed)]
+
+    @staticmethod
+    def _matches(entry: dict, field: str, value: Value, kind: str) -> bool:
+        """Check whether an entry matches a query condition
+        Args:
+            entry (dict): The entry to check
+            field (str): The field of the condition
+            value (Value): The value of the condition
+            kind (str): Either equal, contains or prefix
+        Returns:
+            bool: Whether the entry matches
+        """
+        field_value = entry.get(field)
+        if kind == "equal":
+            return field_value == value
+        if kind == "contains":
+            return isinstance(field_value, list) and value in field_value
+        return isinstance(field_value, str) and field_value.startswith(value)
+
     def refresh(self) -> None:
-        """Refresh the database by loading the data from storage"""
-        self._load()
+        """Refresh the database by loading the data that was changed in the
+        storage since the last load or refresh. Nothing is loaded if the
+        generation in the manifest did not change."""
+        generation = self._current_generation()
+        if generation == self._generation:
+            return
+        keys = None
+        if generation > self._generation:
+            keys = self._changes_since(self._generation)
+        if keys is None:
+            self._load()
+            self._rebuild_indexes()
+        else:
+            self._generation = generation
+            self._reload(keys)
+
+    @contextmanager
+    def batch(self) -> Iterator["Database"]:
+        """Group changes, so they are persisted at once when the batch ends.
+        The batch holds the lock of the storage and starts from the latest
+        data, so other processes cannot change the database meanwhile.
+        If an exception is raised in the batch, its changes are discarded by
+        reloading the database. Batches can be nested, only the outermost
+        batch persists.
+
+        Example:
+            with database.batch():
+                for id, entry in entries:
+                    database.set("collection", id, entry)
+        Yields:
+            Database: The database itself
+        """
+        with self._storage.lock(self._MANIFEST_KEY):
+            if self._batch_depth == 0:
+                self.refresh()
+            self._batch_depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self._load()
+                    self._rebuild_indexes()
+                raise
+            self._batch_depth -= 1
+            self._persist()
+
+    def _stored_entry(self, collection: str, id: str) -> dict:
+        """Get an entry as it is stored, with its revision
+        Args:
+            collection (str): The collection of the entry
+            id (str): The id of the entry
+        Returns:
+            dict: The entry with the revision field
+        """
+        return {**self._data[collection][id],
+                self.REVISION_FIELD: self.revision(collection, id)}
+
+    def _loaded_entry(self, collection: str, id: str, entry: dict) -> dict:
+        """Take the revision out of an entry as it is stored
+        Args:
+            collection (str): The collection of the entry
+            id (str): The id of the entry
+            entry (dict): The entry with the revision field
+        Returns:
+            dict: The entry without the revision field
+        """
+        self._revisions[(collection, id)] = entry.pop(self.REVISION_FIELD, 1)
+        return entry
+
+    def _check_revision(self, collection: str, id: str,
+                        revision: Union[int, None]) -> int:
+        """Refresh the entries changed by other databases, unless in a batch
+        that already did, and check the revision of an entry. Must be called
+        holding the lock of the storage.
+        Args:
+            collection (str): The collection of the entry
+            id (str): The id of the entry
+            revision (Union[int, None]): The expected revision, or None
+        Returns:
+            int: The current revision of the entry
+        Raises:
+            ConflictError: If the entry is not at the expected revision
+        """
+        if self._batch_depth == 0:
+            self.refresh()
+        current = self.revision(collection, id)
+        if revision is not None and revision != current:
+            raise ConflictError(collection, id, revision, current)
+        return current
 
     def _persist(self) -> None:
-        """Persist the data to storage"""
-        for collection, data in self._data.items():
-            if not data:
-                continue
-            for id, item in data.items():
-                self._storage.save(json.dumps(item).encode(),
-                                   f"{collection}{os.sep}{id}")
+        """Persist the changed and deleted entries to storage"""
+        if self._batch_depth > 0 or not (self._dirty or self._deleted):
+            return
+        with self._storage.lock(self._MANIFEST_KEY):
+            self._write_changes()
+            self._write_manifest()
+        self._dirty.clear()
+        self._deleted.clear()
 
-        # for things that were deleted, we need to remove them from the storage
-        keys = self._storage.list("")
-        for key in keys:
-            collection, id = key.split(os.sep)[-2:]
-            if not self._data.get(collection, id):
+    def _write_changes(self) -> None:
+        """Write the changed and deleted entries to storage, one key per
+        entry"""
+        for collection, id in self._dirty:
+            item = self._stored_entry(collection, id)
+            self._storage.save(json.dumps(item).encode(),
+                               f"{collection}{os.sep}{id}")
+        for collection, id in self._deleted:
+            try:
                 self._storage.delete(f"{collection}{os.sep}{id}")
+            except NotFoundError:
+                pass
+
+    def _read_manifest(self) -> dict:
+        """Read the manifest from storage
+
+        Returns:
+            dict: The current generation and the most recent changes as
+            [generation, collection, id] lists
+        """
+        try:
+            return json.loads(self._storage.load(self._MANIFEST_KEY).decode())
+        except NotFoundError:
+            return {"generation": 0, "changes": []}
+
+    def _current_generation(self) -> int:
+        """Get the generation of the data in storage
+
+        Returns:
+            int: The generation, which increases on every persist
+        """
+        return self._read_manifest()["generation"]
+
+    def _changes_since(self, generation: int) -> Union[Set[Tuple[str, str]],
+                                                       None]:
+        """Get the entries that changed after a generation
+
+        Args:
+            generation (int): The generation that was last loaded
+        Returns:
+            Union[Set[Tuple[str, str]], None]: The collection and id of each
+            changed entry, None if the manifest no longer records all changes
+            since the generation
+        """
+        changes = self._read_manifest()["changes"]
+        if not changes or changes[0][0] > generation:
+            return None
+        return {(collection, id) for change_generation, collection, id
+                in changes if change_generation > generation}
+
+    def _write_manifest(self) -> None:
+        """Increase the generation in the manifest and record the changed and
+        deleted entries in it"""
+        manifest = self._read_manifest()
+        generation = manifest["generation"] + 1
+        changes = manifest["changes"] + [
+            [generation, collection, id] for collection, id
+            in sorted(self._dirty | self._deleted)
+        ]
+        manifest = {"generation": generation,
+                    "changes": changes[-self._MANIFEST_HISTORY:]}
+        self._storage.save(json.dumps(manifest).encode(), self._MANIFEST_KEY)
+        # Changes of other databases since our last load are still unseen
+        if self._generation == generation - 1:
+            self._generation = generation
+
+    def _reload(self, keys: Set[Tuple[str, str]]) -> None:
+        """Reload the given entries from storage
+
+        Args:
+            keys (Set[Tuple[str, str]]): The collection and id of each entry
+        """
+        for collection, id in keys:
+            entries = self._data.setdefault(collection, {})
+            try:
+                data = self._storage.load(f"{collection}{os.sep}{id}")
+            except NotFoundError:
+                self._update_indexes(collection, id, entries.pop(id, None),
+                                     None)
+                self._revisions.pop((collection, id), None)
+                continue
+            entry = self._loaded_entry(collection, id,
+                                       json.loads(data.decode()))
+            self._update_indexes(collection, id, entries.get(id), entry)
+            entries[id] = entry
+
+    def _update_indexes(self, collection: str, id: str, old: Union[dict, None],
+                        new: Union[dict, None]) -> None:
+        """Update the indexes of a collection for a changed entry
+        Args:
+            collection (str): The collection of the entry
+            id (str): The id of the entry
+            old (Union[dict, None]): The previous entry, None if it is new
+            new (Union[dict, None]): The new entry, None if it is deleted
+        """
+        for field, index in self._indexes.get(collection, {}).items():
+            if old is not None:
+                index.remove(id, old.get(field))
+            if new is not None:
+                index.add(id, new.get(field))
+
+    def _rebuild_indexes(self) -> None:
+        """Rebuild all indexes after the data was loaded"""
+        for collection, indexes in self._indexes.items():
+            for field in list(indexes):
+                del indexes[field]
+                self.create_index(collection, field)
 
     def _load(self) -> None:
         """Load the data from storage"""
         self._data = {}
+        self._revisions = {}
+        self._dirty.clear()
+        self._deleted.clear()
+        self._generation = self._current_generation()
         for key in self._storage.list(""):
+            if key == self._MANIFEST_KEY:
+                continue
             collection, id = key.split(os.sep)[-2:]
             data = self._storage.load(f"{collection}{os.sep}{id}")
             # Ensure the collection exists in the dictionary
             if collection not in self._data:
                 self._data[collection] = {}
-            self._data[collection][id] = json.loads(data.decode())
+            self._data[collection][id] = self._loaded_entry(
+                collection, id, json.loads(data.decode()))
+
+
+class JournalDatabase(Database):
+    """
+    Database that appends every change to a journal in the storage, instead
+    of saving one key per entry. The data is loaded by reading the snapshot
+    and replaying the journal on top of it. Once the journal holds enough
+    changes it is compacted into a new snapshot.
+    """
+    _JOURNAL_KEY = "journal"
+    _SNAPSHOT_KEY = "snapshot"
+
+    def __init__(self, storage: Storage, compact_every: int = 1000) -> None:
+        """
+        Initializer method of the JournalDatabase class.
+
+        Args:
+            storage (Storage): The storage of the database.
+            compact_every (int): The amount of changes in the journal after
+            which it is compacted into a snapshot.
+        """
+        self._compact_every = compact_every
+        self._journal_size = 0
+        super().__init__(storage)
+
+    def compact(self) -> None:
+        """Write all data to a new snapshot and empty the journal. The journal
+        is replayed idempotently, so a crash between both writes loses
+        nothing."""
+        with self._storage.lock(self._MANIFEST_KEY):
+            # Other databases may have appended changes not loaded here
+            data, _ = self._read()
+            snapshot = {collection: entries for collection, entries
+                        in data.items() if entries}
+            self._storage.save(json.dumps(snapshot).encode(),
+                               self._SNAPSHOT_KEY)
+            self._storage.save(b"", self._JOURNAL_KEY)
+        self._journal_size = 0
+
+    def _write_changes(self) -> None:
+        """Append the changed and deleted entries to the journal"""
+        lines = []
+        for collection, id in sorted(self._dirty):
+            lines.append(json.dumps({
+                "op": "set", "collection": collection, "id": id,
+                "entry": self._stored_entry(collection, id)}))
+        for collection, id in sorted(self._deleted):
+            lines.append(json.dumps({"op": "delete",
+                                     "collection": collection, "id": id}))
+        # An interrupted append may have left an incomplete last line, which
+        # is ended first so the changes are not joined to it
+        prefix = "" if self._journal_complete() else "\n"
+        self._storage.append((prefix + "\n".join(lines) + "\n").encode(),
+                             self._JOURNAL_KEY)
+        self._journal_size += len(lines)
+        if self._journal_size >= self._compact_every:
+            self.compact()
+
+    def _journal_complete(self) -> bool:
+        """Check whether the journal ends with a whole line
+
+        Returns:
+            bool: False if the last line of the journal is incomplete
+        """
+        try:
+            with self._storage.load_view(self._JOURNAL_KEY) as view:
+                return len(view) == 0 or bytes(view[-1:]) == b"\n"
+        except NotFoundError:
+            return True
+
+    def _changes_since(self, generation: int) -> None:
+        """Report the changes as unknown, as the journal has to be replayed
+        anyway
+
+        Args:
+            generation (int): The generation that was last loaded
+        """
+        return None
+
+    def _load(self) -> None:
+        """Load the snapshot and replay the journal"""
+        self._dirty.clear()
+        self._deleted.clear()
+        self._generation = self._current_generation()
+        self._data, self._journal_size = self._read()
+        self._revisions = {}
+        for collection, entries in self._data.items():
+            for id, entry in entries.items():
+                self._loaded_entry(collection, id, entry)
+
+    def _read(self) -> Tuple[dict, int]:
+        """Read the snapshot and replay the journal on it
+
+        Returns:
+            Tuple[dict, int]: The data and the amount of changes in the
+            journal
+        """
+        try:
+            data = json.loads(self._storage.load(self._SNAPSHOT_KEY).decode())
+        except NotFoundError:
+            data = {}
+        try:
+            journal = self._storage.load(self._JOURNAL_KEY)
+        except NotFoundError:
+            journal = b""
+        size = 0
+        for line in journal.decode().splitlines():
+            if not line:
+                continue
+            try:
+                change = json.loads(line)
+            except json.JSONDecodeError:
+                # An interrupted append leaves an incomplete last line
+                continue
+            self._replay(data, change)
+            size += 1
+        return data, size
+
+    @staticmethod
+    def _replay(data: dict, change: dict) -> None:
+        """Apply a change from the journal to the data
+
+        Args:
+            data (dict): The data per collection
+            change (dict): The change as written to the journal
+        """
+        collection = data.setdefault(change["collection"], {})
+        if change["op"] == "set":
+            collection[change["id"]] = change["entry"]
+        else:
+            collection.pop(change["id"], None)
+
+
+class SQLiteDatabase(Database):
+    """
+    Database that keeps its entries in tables of the SQLite file of a
+    SQLiteStorage. Changes are written in a single transaction and entries
+    are looked up by their primary key.
+    """
+    _SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS entries ("
+        "collection TEXT NOT NULL, id TEXT NOT NULL, entry TEXT NOT NULL, "
+        "PRIMARY KEY (collection, id))",
+        "CREATE TABLE IF NOT EXISTS generations ("
+        "generation INTEGER NOT NULL, collection TEXT NOT NULL, "
+        "id TEXT NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS generations_generation "
+        "ON generations (generation)",
+    )
+
+    def __init__(self, storage: SQLiteStorage) -> None:
+        """
+        Initializer method of the SQLiteDatabase class.
+
+        Args:
+            storage (SQLiteStorage): The storage of which the SQLite file
+            holds the tables of the database.
+        """
+        with storage.transaction() as connection:
+            for statement in self._SCHEMA:
+                connection.execute(statement)
+        super().__init__(storage)
+
+    def _persist(self) -> None:
+        """Persist the changes and the new generation in one transaction"""
+        with self._storage.transaction():
+            super()._persist()
+
+    def _write_changes(self) -> None:
+        """Write the changed and deleted entries to the entries table"""
+        connection = self._storage.connection()
+        connection.executemany(
+            "INSERT OR REPLACE INTO entries (collection, id, entry) "
+            "VALUES (?, ?, ?)",
+            [(collection, id, json.dumps(self._stored_entry(collection, id)))
+             for collection, id in self._dirty])
+        connection.executemany(
+            "DELETE FROM entries WHERE collection = ? AND id = ?",
+            list(self._deleted))
+
+    def _current_generation(self) -> int:
+        """Get the most recent generation in the generations table
+
+        Returns:
+            int: The generation, which increases on every persist
+        """
+        row = self._storage.connection().execute(
+            "SELECT MAX(generation) FROM generations").fetchone()
+        return row[0] or 0
+
+    def _changes_since(self, generation: int) -> Union[Set[Tuple[str, str]],
+                                                       None]:
+        """Get the entries that changed after a generation from the
+        generations table
+
+        Args:
+            generation (int): The generation that was last loaded
+        Returns:
+            Union[Set[Tuple[str, str]], None]: The collection and id of each
+            changed entry, None if the table no longer holds all changes since
+            the generation
+        """
+        connection = self._storage.connection()
+        row = connection.execute(
+            "SELECT MIN(generation) FROM generations").fetchone()
+        if row[0] is None or row[0] > generation:
+            return None
+        return {(collection, id) for collection, id in connection.execute(
+            "SELECT collection, id FROM generations WHERE generation > ?",
+            (generation,))}
+
+    def _write_manifest(self) -> None:
+        """Record the changed and deleted entries under a new generation and
+        forget the generations that are too old"""
+        connection = self._storage.connection()
+        generation = self._current_generation() + 1
+        connection.executemany(
+            "INSERT INTO generations (generation, collection, id) "
+            "VALUES (?, ?, ?)",
+            [(generation, collection, id) for collection, id
+             in sorted(self._dirty | self._deleted)])
+        connection.execute(
+            "DELETE FROM generations WHERE generation <= ?",
+            (generation - self._MANIFEST_HISTORY,))
+        if self._generation == generation - 1:
+            self._generation = generation
+
+    def _reload(self, keys: Set[Tuple[str, str]]) -> None:
+        """Reload the given entries from the entries table
+
+        Args:
+            keys (Set[Tuple[str, str]]): The collection and id of each entry
+        """
+        connection = self._storage.connection()
+        for collection, id in keys:
+            entries = self._data.setdefault(collection, {})
+            row = connection.execute(
+                "SELECT entry FROM entries WHERE collection = ? AND id = ?",
+                (collection, id)).fetchone()
+            entry = None
+            if row is not None:
+                entry = self._loaded_entry(collection, id, json.loads(row[0]))
+            self._update_indexes(collection, id, entries.get(id), entry)
+            if entry is None:
+                entries.pop(id, None)
+                self._revisions.pop((collection, id), None)
+            else:
+                entries[id] = entry
+
+    def _load(self) -> None:
+        """Load all entries from the entries table"""
+        self._data = {}
+        self._revisions = {}
+        self._dirty.clear()
+        self._deleted.clear()
+        with self._storage.transaction() as connection:
+            self._generation = self._current_generation()
+            rows = connection.execute(
+                "SELECT collection, id, entry FROM entries").fetchall()
+        for collection, id, entry in rows:
+            self._data.setdefault(collection, {})[id] = self._loaded_entry(
+                collection, id, json.loads(entry))
@@ -0,0 +1,137 @@
+import os
+import threading
+import time
+from types import TracebackType
+from typing import Dict, Type
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock():
+    """
+    Advisory lock on a file, held by one process at a time. Within a process
+    the lock is reentrant and held by one thread at a time. Use
+    FileLock.get to share one lock per path in the process, as the locks of
+    the operating system do not exclude two handles of the same process.
+
+    Example:
+        with FileLock.get("./assets/.lock"):
+            ...
+    """
+    _locks: Dict[str, "FileLock"] = {}
+    _locks_lock = threading.Lock()
+
+    def __init__(self, path: str) -> None:
+        """
+        Initialize FileLock class
+        Args:
+            path (str): The path of the lock file, created if it is missing
+        """
+        self._path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    @classmethod
+    def get(cls, path: str) -> "FileLock":
+        """
+        Get the lock of a path shared in the process.
+        Args:
+            path (str): The path of the lock file
+        Returns:
+            FileLock: The lock of the path
+        """
+        path = os.path.abspath(path)
+        with cls._locks_lock:
+            if path not in cls._locks:
+                cls._locks[path] = cls(path)
+            return cls._locks[path]
+
+    @property
+    def path(self) -> str:
+        """
+        Getter method for the path of the lock file.
+        Returns:
+            str: The path of the lock file
+        """
+        return self._path
+
+    def acquire(self) -> None:
+        """
+        Acquire the lock, waiting until other processes and threads release
+        it.
+        """
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                self._lock_file()
+            except BaseException:
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+
+    def release(self) -> None:
+        """
+        Release the lock.
+        """
+        self._depth -= 1
+        if self._depth == 0:
+            self._unlock_file()
+        self._thread_lock.release()
+
+    def __enter__(self) -> "FileLock":
+        """
+        Acquire the lock in a with statement.
+        Returns:
+            FileLock: The lock itself
+        """
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type: Type[BaseException],
+                 exc_value: BaseException, traceback: TracebackType) -> None:
+        """
+        Release the lock at the end of a with statement.
+        """
+        self.release()
+
+    def _lock_file(self) -> None:
+        """
+        Private method that opens the lock file and locks it.
+        """
+        os.makedirs(os.path.dirname(self._path), exist_ok=True)
+        self._file = open(self._path, "a+b")
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+                return
+            # Lock the first byte, msvcrt gives up after 10 attempts
+            self._file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                    return
+                except OSError:
+                    time.sleep(0.01)
+        except BaseException:
+            self._file.close()
+            self._file = None
+            raise
+
+    def _unlock_file(self) -> None:
+        """
+        Private method that unlocks the lock file and closes it.
+        """
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
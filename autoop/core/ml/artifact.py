@@ -1,6 +1,154 @@
-from typing import List
+from autoop.core.storage import CHUNK_SIZE, Storage, iter_chunks
+
+from typing import BinaryIO, Callable, Iterator, List, Optional, Union
 from copy import deepcopy
 import base64
+import mmap
+import os
+
+
+class StorageLoader():
+    """
+    Deferred loader of the data of an artifact, bound to a key in a storage.
+    The data is only fetched from the storage when the loader is called.
+    """
+    def __init__(self, storage: Storage, key: str) -> None:
+        """
+        Initializer method of the StorageLoader class.
+
+        Args:
+            storage (Storage): The storage the data is saved in.
+            key (str): The key the data is saved under in the storage.
+        """
+        self._storage = storage
+        self._key = key
+
+    @property
+    def storage(self) -> Storage:
+        """
+        Getter method for the private storage attribute.
+
+        Returns:
+            Storage: The storage the data is loaded from.
+        """
+        return self._storage
+
+    @property
+    def key(self) -> str:
+        """
+        Getter method for the private key attribute.
+
+        Returns:
+            str: The key the data is loaded from.
+        """
+        return self._key
+
+    def __call__(self) -> bytes:
+        """
+        Loads the data from the storage.
+
+        Returns:
+            bytes: The data saved under the key.
+        """
+        return self._storage.load(self._key)
+
+    def view(self) -> memoryview:
+        """
+        Loads the data from the storage as a read-only memoryview, which
+        avoids copying it where the storage supports that.
+
+        Returns:
+            memoryview: View of the data saved under the key.
+        """
+        return self._storage.load_view(self._key)
+
+    def stream(self, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        Loads the data from the storage in chunks.
+
+        Args:
+            chunk_size (int): The maximum size of the chunks.
+
+        Returns:
+            Iterator[bytes]: The chunks of the data saved under the key.
+        """
+        return self._storage.load_stream(self._key, chunk_size)
+
+
+class FileLoader():
+    """
+    Deferred loader of the data of an artifact from a file, given by its
+    path or as a binary file object such as an upload. The data is read
+    from the file every time the loader is called.
+    """
+    def __init__(self, file: Union[str, BinaryIO]) -> None:
+        """
+        Initializer method of the FileLoader class.
+
+        Args:
+            file (Union[str, BinaryIO]): The path of the file or a seekable
+            binary file object.
+        """
+        self._file = file
+
+    @property
+    def file(self) -> Union[str, BinaryIO]:
+        """
+        Getter method for the private file attribute.
+
+        Returns:
+            Union[str, BinaryIO]: The path or file object data is read from.
+        """
+        return self._file
+
+    def __call__(self) -> bytes:
+        """
+        Reads the data from the file.
+
+        Returns:
+            bytes: The data in the file.
+        """
+        if isinstance(self._file, str):
+            with open(self._file, "rb") as f:
+                return f.read()
+        self._file.seek(0)
+        return self._file.read()
+
+    def view(self) -> memoryview:
+        """
+        Reads the data from the file as a read-only memoryview. Files on
+        disk are mapped into memory and in-memory files are viewed directly,
+        so the data is not copied.
+
+        Returns:
+            memoryview: View of the data in the file.
+        """
+        if isinstance(self._file, str):
+            with open(self._file, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return memoryview(b"")
+                return memoryview(mmap.mmap(f.fileno(), 0,
+                                            access=mmap.ACCESS_READ))
+        if hasattr(self._file, "getbuffer"):
+            return self._file.getbuffer().toreadonly()
+        return memoryview(self())
+
+    def stream(self, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        Reads the data from the file in chunks.
+
+        Args:
+            chunk_size (int): The maximum size of the chunks.
+
+        Returns:
+            Iterator[bytes]: The chunks of the data in the file.
+        """
+        if isinstance(self._file, str):
+            with open(self._file, "rb") as f:
+                yield from iter_chunks(f, chunk_size)
+            return
+        self._file.seek(0)
+        yield from iter_chunks(self._file, chunk_size)
 
 
 class Artifact():
@@ -41,6 +189,15 @@ class Artifact():
 
     :param version: The version of the asset the artifat is refering to.
     :type version: Optional[str]
+
+    :param loader: Callable that returns the contents of the asset, such as
+    a StorageLoader. When given, data must be left out and is only loaded the
+    first time it is read.
+    :type loader: Optional[Callable[[], bytes]]
+
+    :param keep_data: Whether data fetched by the loader is kept in memory.
+    If False the data is fetched again every time it is read.
+    :type keep_data: Optional[bool]
     """
     _tags: List[str]
 
@@ -52,16 +209,20 @@ class Artifact():
     _metadata: dict
     _data: bytes
     _version: str
+    _loader: Optional[Callable[[], bytes]]
+    _keep_data: bool
 
     def __init__(
             self,
             name: str,
-            data: bytes,
+            data: bytes = None,
             type: str = "",
             asset_path: str = "placeholder",
             metadata: dict = {},
             version: str = "1.0.0",
-            tags: list = []
+            tags: list = [],
+            loader: Callable[[], bytes] = None,
+            keep_data: bool = True
     ) -> None:
         """
         Initializer method of artifact class
@@ -74,9 +235,16 @@ class Artifact():
         self._metadata = None
         self._data = None
         self._version = None
+        self._loader = None
+        self._keep_data = keep_data
 
         self.name = name
-        self.data = data
+        if loader is None:
+            self.data = data
+        elif data is not None:
+            raise ValueError("Provide either data or a loader, not both.")
+        else:
+            self._loader = loader
         self.type = type
         self.asset_path = asset_path
         self.metadata = metadata
@@ -87,6 +255,25 @@ class Artifact():
         path = f"{encoded_path}_{self.version}"
         self.id = path.replace("=", "")
 
+    @classmethod
+    def from_storage(cls, storage: Storage, key: str, *args,
+                     **kwargs) -> "Artifact":
+        """
+        Creates an artifact of which the data is loaded from a storage the
+        first time it is read.
+
+        Args:
+            storage (Storage): The storage the data is saved in.
+            key (str): The key the data is saved under in the storage.
+            *args (list): The arguments given for the artifact.
+            **kwargs (dict): The keyword arguments given for the artifact.
+
+        Returns:
+            Artifact: The artifact, or a subclass when called on one.
+        """
+        kwargs.setdefault("asset_path", key)
+        return cls(*args, loader=StorageLoader(storage, key), **kwargs)
+
     @property
     def id(self) -> str:
         """
@@ -232,7 +419,12 @@ class Artifact():
         Returns:
             bytes: Data in bytes.
         """
-        return self._data
+        if self._data is not None or self._loader is None:
+            return self._data
+        data = self._loader()
+        if self._keep_data:
+            self._data = data
+        return data
 
     @data.setter
     def data(self, value: bytes) -> None:
@@ -243,7 +435,7 @@ class Artifact():
         Args:
             value (bytes): The value data has to set to in bytes.
         """
-        if self._data is not None:
+        if self._data is not None or self._loader is not None:
             raise AttributeError("Artifact class is immutable. data can "
                                  "only be set once.")
         if isinstance(value, bytes):
@@ -341,9 +533,81 @@ class Artifact():
                 f"tags={self._tags}, "
                 f"data={self._data})")
 
+    @property
+    def is_loaded(self) -> bool:
+        """
+        Whether the data of the artifact is held in memory.
+
+        Returns:
+            bool: False if the data still has to be fetched by the loader.
+        """
+        return self._data is not None
+
+    def view(self) -> memoryview:
+        """
+        Get a read-only memoryview of the data. If the data is not in memory
+        and the loader supports views, the view is taken directly from the
+        storage without keeping or copying the data.
+
+        Returns:
+            memoryview: View of the data.
+        """
+        if self._data is None and hasattr(self._loader, "view"):
+            return self._loader.view()
+        return memoryview(self.data)
+
+    def stream(self, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        Iterate over the data in chunks. If the data is not in memory and the
+        loader supports streaming, the chunks come directly from the loader,
+        so the data is never in memory at once.
+
+        Args:
+            chunk_size (int): The maximum size of the chunks.
+
+        Returns:
+            Iterator[bytes]: The bytes-like chunks of the data.
+        """
+        if self._data is None and hasattr(self._loader, "stream"):
+            yield from self._loader.stream(chunk_size)
+            return
+        view = memoryview(self.data)
+        for start in range(0, len(view), chunk_size):
+            yield view[start:start + chunk_size]
+
+    def release(self) -> None:
+        """
+        Drops the data from memory if it can be fetched again by the loader.
+        """
+        if self._loader is not None:
+            self._data = None
+
+    def __getstate__(self) -> dict:
+        """
+        Loads the data before pickling, so the artifact does not depend on
+        its loader after unpickling.
+
+        Returns:
+            dict: The state of the artifact.
+        """
+        state = self.__dict__.copy()
+        state["_data"] = self.data
+        state["_loader"] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        """
+        Restores the artifact from its state. Artifacts pickled before they
+        had a loader get the defaults of the missing attributes.
+
+        Args:
+            state (dict): The state of the artifact.
+        """
+        self.__dict__.update({"_loader": None, "_keep_data": True, **state})
+
     def read(self) -> bytes:
         """
         Returns:
             bytes: the data in bytes.
         """
-        return self._data
+        return self.data
@@ -0,0 +1,383 @@
+import json
+import struct
+from typing import Callable, Iterator, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import ExtensionArray
+
+# The first bytes of data in the columnar format
+MAGIC = b"AOCOL\x00\x01\n"
+# The alignment in bytes of the buffers of the columns
+ALIGNMENT = 64
+
+# The rows to read, a slice with a start and a stop or an array of indices
+Rows = Union[slice, np.ndarray]
+
+# The nullable arrays of pandas, by the kind of their NumPy values
+_MASKED_ARRAYS = {"b": pd.arrays.BooleanArray, "f": pd.arrays.FloatingArray,
+                  "i": pd.arrays.IntegerArray, "u": pd.arrays.IntegerArray}
+
+
+def is_columnar(data: Union[bytes, memoryview]) -> bool:
+    """
+    Check whether data is in the columnar format.
+
+    Args:
+        data (Union[bytes, memoryview]): The data to check.
+    Returns:
+        bool: Whether the data starts with the magic number of the format.
+    """
+    return bytes(data[:len(MAGIC)]) == MAGIC
+
+
+def encode(frame: pd.DataFrame) -> bytes:
+    """
+    Encode a dataframe in the columnar format. The data starts with a magic
+    number and a JSON header describing every column, followed by the
+    buffers of the columns, each aligned to 64 bytes. Numeric, boolean and
+    datetime columns are stored as the raw bytes of their NumPy array, so
+    decoding only wraps the buffer. Nullable columns add a mask, string
+    columns are stored as codes into their unique values and categorical
+    columns as codes into their categories. The index is not stored.
+
+    Args:
+        frame (pd.DataFrame): The dataframe to encode.
+    Returns:
+        bytes: The encoded dataframe.
+    Raises:
+        TypeError: If a column has a type the format does not support.
+    """
+    buffers = []
+    columns = []
+    for position in range(frame.shape[1]):
+        column = _encode_column(frame.iloc[:, position], buffers)
+        column["name"] = str(frame.columns[position])
+        columns.append(column)
+    # Offsets of the buffers are relative to the end of the header, as the
+    # size of the header is only known once they are all placed
+    offset = 0
+    for buffer, spec in buffers:
+        offset = _align(offset)
+        spec[:] = [offset, buffer.nbytes]
+        offset += buffer.nbytes
+    header = json.dumps({"rows": len(frame), "columns": columns}).encode()
+    start = _align(len(MAGIC) + 8 + len(header))
+    header += b" " * (start - len(MAGIC) - 8 - len(header))
+    chunks = [MAGIC, struct.pack("<Q", len(header)), header]
+    position = start
+    for buffer, (offset, size) in buffers:
+        chunks.append(b"\x00" * (start + offset - position))
+        chunks.append(buffer)
+        position = start + offset + size
+    return b"".join(chunks)
+
+
+def decode(data: Union[bytes, memoryview], copy: bool = True,
+           columns: List[str] = None) -> pd.DataFrame:
+    """
+    Decode a dataframe from the columnar format.
+
+    Args:
+        data (Union[bytes, memoryview]): The encoded dataframe.
+        copy (bool): Whether the buffers are copied. If False, numeric
+        columns are read-only views of the data, which is kept alive by the
+        dataframe, and changing them in place raises a ValueError.
+        columns (List[str]): The columns to decode, in this order. All
+        columns if None, the buffers of other columns are not touched.
+    Returns:
+        pd.DataFrame: The decoded dataframe.
+    Raises:
+        ValueError: If a column is not in the data.
+    """
+    rows, selected, readers = _open(data, copy, columns)
+    return _frame(selected, readers, slice(0, rows))
+
+
+def iter_batches(data: Union[bytes, memoryview], batch_size: int,
+                 columns: List[str] = None, copy: bool = True
+                 ) -> Iterator[pd.DataFrame]:
+    """
+    Decode a dataframe from the columnar format in batches of rows. Every
+    batch only takes its rows from the buffers, so the whole dataframe is
+    never in memory at once if the data is a view of a mapped file.
+
+    Args:
+        data (Union[bytes, memoryview]): The encoded dataframe.
+        batch_size (int): The maximum number of rows of a batch.
+        columns (List[str]): The columns to decode, in this order. All
+        columns if None.
+        copy (bool): Whether the buffers are copied, see decode.
+    Returns:
+        Iterator[pd.DataFrame]: The batches, indexed by their rows in the
+        dataframe. An empty dataframe is one empty batch.
+    Raises:
+        ValueError: If a column is not in the data or the batch size is not
+        positive.
+    """
+    if batch_size < 1:
+        raise ValueError("Batch size must be positive.")
+    rows, selected, readers = _open(data, copy, columns)
+    if rows == 0:
+        # An empty dataframe still has its columns
+        yield _frame(selected, readers, slice(0, 0))
+    for first in range(0, rows, batch_size):
+        yield _frame(selected, readers,
+                     slice(first, min(first + batch_size, rows)))
+
+
+def take(data: Union[bytes, memoryview], rows: np.ndarray,
+         columns: List[str] = None) -> pd.DataFrame:
+    """
+    Decode rows of a dataframe from the columnar format, given their
+    positions. Only the buffers of the rows are read, so taking a sample of
+    a dataframe does not depend on its size.
+
+    Args:
+        data (Union[bytes, memoryview]): The encoded dataframe.
+        rows (np.ndarray): The positions of the rows, in the order they are
+        taken in.
+        columns (List[str]): The columns to decode, in this order. All
+        columns if None.
+    Returns:
+        pd.DataFrame: The rows, indexed by their positions.
+    Raises:
+        ValueError: If a column is not in the data.
+        IndexError: If a position is out of range.
+    """
+    count, selected, readers = _open(data, True, columns)
+    rows = np.asarray(rows, dtype=np.int64)
+    if len(rows) and (rows.min() < 0 or rows.max() >= count):
+        raise IndexError("Row positions out of range.")
+    return _frame(selected, readers, rows)
+
+
+def row_count(data: Union[bytes, memoryview]) -> int:
+    """
+    Get the number of rows of a dataframe in the columnar format, from its
+    header.
+
+    Args:
+        data (Union[bytes, memoryview]): The encoded dataframe.
+    Returns:
+        int: The number of rows.
+    """
+    return _open(data, False, [])[0]
+
+
+def _open(data: Union[bytes, memoryview], copy: bool,
+          columns: List[str] = None
+          ) -> Tuple[int, List[dict], List[Callable[[Rows], object]]]:
+    """
+    Read the header of the data and prepare the reading of the columns.
+
+    Args:
+        data (Union[bytes, memoryview]): The encoded dataframe.
+        copy (bool): Whether the buffers are copied.
+        columns (List[str]): The columns to decode, None for all.
+    Returns:
+        Tuple[int, List[dict], List[Callable[[Rows], object]]]: The number
+        of rows, the descriptions of the selected columns and a reader of
+        the values of every selected column, given the rows.
+    Raises:
+        ValueError: If the data is not columnar or a column is not in it.
+    """
+    if not is_columnar(data):
+        raise ValueError("Data is not in the columnar format.")
+    (size,) = struct.unpack_from("<Q", data, len(MAGIC))
+    header_start = len(MAGIC) + 8
+    header = json.loads(bytes(data[header_start:header_start + size]))
+    start = header_start + size
+    selected = header["columns"]
+    if columns is not None:
+        by_name = {}
+        for column in reversed(selected):
+            by_name[column["name"]] = column
+        missing = [name for name in columns if name not in by_name]
+        if missing:
+            raise ValueError(f"Columns not found: {missing}")
+        selected = [by_name[name] for name in columns]
+    readers = [_column_reader(column, data, start, copy)
+               for column in selected]
+    return header["rows"], selected, readers
+
+
+def _frame(selected: List[dict], readers: List[Callable[[Rows], object]],
+           rows: Rows) -> pd.DataFrame:
+    """
+    Build a dataframe of rows of the selected columns.
+
+    Args:
+        selected (List[dict]): The descriptions of the selected columns.
+        readers (List[Callable[[Rows], object]]): The readers of the
+        columns.
+        rows (Rows): The rows.
+    Returns:
+        pd.DataFrame: The dataframe, indexed by the rows.
+    """
+    if isinstance(rows, slice):
+        index = pd.RangeIndex(rows.start, rows.stop)
+    else:
+        index = pd.Index(rows)
+    values = {}
+    for position, reader in enumerate(readers):
+        values[position] = reader(rows)
+        if isinstance(values[position], pd.Series):
+            # Series are aligned on their index
+            values[position].index = index
+    frame = pd.DataFrame(values, index=index, copy=False)
+    frame.columns = [column["name"] for column in selected]
+    return frame
+
+
+def _align(offset: int) -> int:
+    """
+    Round an offset up to the alignment of the buffers.
+
+    Args:
+        offset (int): The offset.
+    Returns:
+        int: The next multiple of the alignment.
+    """
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _add_buffer(array: np.ndarray, buffers: List[Tuple[memoryview, list]]
+                ) -> list:
+    """
+    Add the buffer of an array to the buffers to write.
+
+    Args:
+        array (np.ndarray): The array.
+        buffers (List[Tuple[memoryview, list]]): The buffers to write, with
+        the offset and size each will be placed at.
+    Returns:
+        list: The offset and size of the buffer, filled in when the buffers
+        are placed.
+    """
+    spec = [0, 0]
+    buffers.append((memoryview(np.ascontiguousarray(array).view(np.uint8)),
+                    spec))
+    return spec
+
+
+def _encode_column(series: pd.Series,
+                   buffers: List[Tuple[memoryview, list]]) -> dict:
+    """
+    Encode a column, adding its buffers to the buffers to write.
+
+    Args:
+        series (pd.Series): The column.
+        buffers (List[Tuple[memoryview, list]]): The buffers to write.
+    Returns:
+        dict: The description of the column in the header.
+    """
+    dtype = series.dtype
+    if isinstance(dtype, np.dtype) and dtype.kind in "biufcmM":
+        return {"encoding": "numpy", "dtype": dtype.str,
+                "data": _add_buffer(series.to_numpy(), buffers)}
+    if isinstance(series.array, tuple(_MASKED_ARRAYS.values())):
+        fill = False if dtype.kind == "b" else 0
+        values = series.array.to_numpy(dtype=dtype.numpy_dtype,
+                                       na_value=fill)
+        return {"encoding": "masked", "dtype": dtype.name,
+                "numpy": dtype.numpy_dtype.str,
+                "data": _add_buffer(values, buffers),
+                "mask": _add_buffer(series.isna().to_numpy(), buffers)}
+    if isinstance(dtype, pd.CategoricalDtype):
+        categories = _encode_column(pd.Series(dtype.categories), buffers)
+        codes = series.cat.codes.to_numpy()
+        return {"encoding": "category", "ordered": bool(dtype.ordered),
+                "codes_dtype": codes.dtype.str,
+                "codes": _add_buffer(codes, buffers),
+                "categories": categories}
+    if dtype == object or pd.api.types.is_string_dtype(dtype):
+        codes, uniques = pd.factorize(series)
+        uniques = list(uniques)
+        if not all(isinstance(value, str) for value in uniques):
+            raise TypeError(f"Column {series.name} holds values that are "
+                            "not strings.")
+        encoded = [value.encode() for value in uniques]
+        offsets = np.cumsum([0] + [len(value) for value in encoded])
+        return {"encoding": "dictionary",
+                "dtype": "object" if dtype == object else str(dtype),
+                "codes": _add_buffer(codes.astype(np.int32), buffers),
+                "values": _add_buffer(
+                    np.frombuffer(b"".join(encoded), dtype=np.uint8),
+                    buffers),
+                "offsets": _add_buffer(offsets.astype(np.int64), buffers)}
+    raise TypeError(f"Column {series.name} has unsupported type {dtype}.")
+
+
+def _decode_buffer(data: Union[bytes, memoryview], start: int, spec: list,
+                   dtype: np.dtype) -> np.ndarray:
+    """
+    Wrap a buffer of the data in an array.
+
+    Args:
+        data (Union[bytes, memoryview]): The encoded dataframe.
+        start (int): The position of the first buffer in the data.
+        spec (list): The offset and size of the buffer.
+        dtype (np.dtype): The type of the array.
+    Returns:
+        np.ndarray: Read-only array over the buffer.
+    """
+    offset, size = spec
+    dtype = np.dtype(dtype)
+    return np.frombuffer(data, dtype=dtype, count=size // dtype.itemsize,
+                         offset=start + offset)
+
+
+def _column_reader(column: dict, data: Union[bytes, memoryview],
+                   start: int, copy: bool) -> Callable[[Rows], object]:
+    """
+    Prepare the reading of a column. The unique values of string and
+    categorical columns are decoded once, rows are taken from the buffers
+    when the reader is called.
+
+    Args:
+        column (dict): The description of the column in the header.
+        data (Union[bytes, memoryview]): The encoded dataframe.
+        start (int): The position of the first buffer in the data.
+        copy (bool): Whether the buffers are copied.
+    Returns:
+        Callable[[Rows], object]: Reader of the values of the column,
+        given the rows, as an array or a series.
+    """
+    def take(spec: list, dtype: np.dtype) -> Callable[[Rows], np.ndarray]:
+        buffer = _decode_buffer(data, start, spec, dtype)
+        if copy:
+            return lambda rows: buffer[rows].copy()
+        return lambda rows: buffer[rows]
+
+    encoding = column["encoding"]
+    if encoding == "numpy":
+        return take(column["data"], column["dtype"])
+    if encoding == "masked":
+        values = take(column["data"], column["numpy"])
+        mask = take(column["mask"], np.bool_)
+        array = _MASKED_ARRAYS[np.dtype(column["numpy"]).kind]
+        return lambda rows: array(values(rows), mask(rows))
+    if encoding == "category":
+        categories = _column_reader(column["categories"], data, start,
+                                    copy)(slice(None))
+        codes = take(column["codes"], column["codes_dtype"])
+        return lambda rows: pd.Categorical.from_codes(
+            codes(rows), categories=categories, ordered=column["ordered"])
+    codes = _decode_buffer(data, start, column["codes"], np.int32)
+    values = _decode_buffer(data, start, column["values"], np.uint8)
+    offsets = _decode_buffer(data, start, column["offsets"], np.int64)
+    raw = values.tobytes()
+    # The last element is taken for the missing values, coded as -1
+    uniques = np.array([raw[offsets[i]:offsets[i + 1]].decode()
+                        for i in range(len(offsets) - 1)] + [np.nan],
+                       dtype=object)
+
+    def strings(rows: Rows) -> Union[ExtensionArray, pd.Series]:
+        taken = uniques.take(codes[rows])
+        if column["dtype"] == "object":
+            # Arrays of objects would be inferred as strings
+            return pd.Series(taken, dtype=object)
+        return pd.array(taken, dtype=column["dtype"])
+
+    return strings
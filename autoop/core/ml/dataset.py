@@ -1,15 +1,45 @@
-from autoop.core.ml.artifact import Artifact
+from autoop.core.ml import columnar
+from autoop.core.ml.artifact import Artifact, FileLoader
+from autoop.core.ml.frame_cache import FrameCache, copy_frame
+from autoop.core.storage import MemoryViewReader, StreamReader
+from autoop.functional.profile import profile_batches
 
+import hashlib
 import io
-
+import itertools
+import numpy as np
 import pandas as pd
+from typing import BinaryIO, Dict, Iterator, List, Tuple, Union
 
 
 class Dataset(Artifact):
     """
     Dataset class which inherits from Artifact. The dataset class handles
     data.
+
+    The data is stored in one of the FORMATS, recorded in the "format" key of
+    the metadata: "csv" text, or the "columnar" binary format, which keeps
+    the types of the columns and is read without parsing.
+
+    Parsed dataframes are kept in the frame_cache shared by all datasets, by
+    the id, version and a fingerprint of the data, so repeated reads of the
+    same data are not parsed again. Selected columns are cached one by one,
+    so reads of other selections only parse the columns not read before.
+
+    The profile of a dataset, with its dtypes and column statistics, is
+    computed once and stored in the "profile" key of the metadata when the
+    dataset is registered, so it is known without reading the data. The
+    sketches of the columns are stored apart, see
+    ArtifactRegistry.load_profile.
     """
+    FORMATS = ("csv", "columnar")
+    # The amount of bytes of a file parsed to validate it
+    SAMPLE_SIZE = 1 << 20
+    # The number of rows of the batches the data is scanned in, to compute
+    # the profile or take a sample
+    BATCH_SIZE = 1 << 16
+    frame_cache = FrameCache()
+
     def __init__(self, *args, **kwargs) -> None:
         """
         Dataset class which inherits from Artifact. The dataset class handles
@@ -19,10 +49,23 @@ class Dataset(Artifact):
         **kwargs (dict): The keywords arguments given for the dataset.
         """
         super().__init__(type="dataset", *args, **kwargs)
+        self._fingerprint = None
+        self._profile = None
+
+    def __setstate__(self, state: dict) -> None:
+        """
+        Restores the dataset from its state. Datasets pickled before their
+        fingerprint and profile were kept compute them again when needed.
+
+        Args:
+            state (dict): The state of the dataset.
+        """
+        super().__setstate__({"_fingerprint": None, "_profile": None,
+                              **state})
 
     @staticmethod
     def from_dataframe(data: pd.DataFrame, name: str, asset_path: str,
-                       version: str = "1.0.0"
+                       version: str = "1.0.0", format: str = "csv"
                        ) -> "Dataset":
         """
         Static method of Dataset that from a dataframe creates it to a Dataset.
@@ -33,6 +76,7 @@ class Dataset(Artifact):
             name (str): The name of the dataset.
             asset_path (str): The OS path the dataset is saved in.
             version (str): The version of the dataset.
+            format (str): The format the data is stored in, one of FORMATS.
 
         Returns:
             Dataset: The dataset that is created from the dataframe.
@@ -40,21 +84,458 @@ class Dataset(Artifact):
         return Dataset(
             name=name,
             asset_path=asset_path,
-            data=data.to_csv(index=False).encode(),
+            data=Dataset._encode(data, format),
             version=version,
+            metadata={"format": format},
         )
 
-    def read(self) -> pd.DataFrame:
+    @staticmethod
+    def from_file(file: Union[str, BinaryIO], name: str, asset_path: str,
+                  version: str = "1.0.0", format: str = "csv"
+                  ) -> "Dataset":
+        """
+        Static method of Dataset that creates a Dataset from a CSV file,
+        given by its path or as a binary file object such as an upload. The
+        file is validated by parsing its first SAMPLE_SIZE bytes. In the
+        "csv" format the data is then read from the file when it is needed,
+        so registering the dataset streams the file to the storage without
+        parsing or copying it. In the "columnar" format the file is parsed
+        once and converted.
+
+        Args:
+            file (Union[str, BinaryIO]): The path of the file or a seekable
+            binary file object.
+            name (str): The name of the dataset.
+            asset_path (str): The OS path the dataset is saved in.
+            version (str): The version of the dataset.
+            format (str): The format the data is stored in, one of FORMATS.
+
+        Returns:
+            Dataset: The dataset of the file.
+        Raises:
+            ValueError: If the sample of the file is not valid CSV.
+            TypeError: If the data has columns the format does not support.
+        """
+        loader = FileLoader(file)
+        sample = Dataset._sample(loader)
+        if format == "columnar":
+            with loader.view() as view:
+                frame = pd.read_csv(MemoryViewReader(view))
+            return Dataset.from_dataframe(frame, name, asset_path, version,
+                                          format)
+        if format != "csv":
+            raise ValueError(f"Unknown format: {format}")
+        if sample.shape[1] == 0:
+            raise ValueError("The file has no columns.")
+        return Dataset(name=name, asset_path=asset_path, version=version,
+                       metadata={"format": format}, loader=loader,
+                       keep_data=False)
+
+    @staticmethod
+    def _sample(loader: FileLoader) -> pd.DataFrame:
+        """
+        Private method that parses the complete records in the first
+        SAMPLE_SIZE bytes of a file, read in chunks of that size.
+
+        Args:
+            loader (FileLoader): The loader of the file.
+        Returns:
+            pd.DataFrame: The parsed rows.
+        Raises:
+            ValueError: If the sample is not valid CSV.
+        """
+        chunks = []
+        size = 0
+        complete = True
+        for chunk in loader.stream(Dataset.SAMPLE_SIZE):
+            chunks.append(bytes(chunk))
+            size += len(chunk)
+            if size >= Dataset.SAMPLE_SIZE:
+                complete = False
+                break
+        sample = b"".join(chunks)
+        if not complete:
+            # The last record may be cut off. Newlines in quoted values do
+            # not end a record: they follow an odd number of quotes, as
+            # quotes in quoted values are escaped by doubling them
+            codes = np.frombuffer(sample, dtype=np.uint8)
+            quoted = np.cumsum(codes == ord('"')) % 2 == 1
+            ends = np.flatnonzero((codes == ord("\n")) & ~quoted)
+            if len(ends):
+                sample = sample[:ends[-1] + 1]
+        return pd.read_csv(io.BytesIO(sample))
+
+    @property
+    def format(self) -> str:
+        """
+        Getter method for the format the data is stored in.
+
+        Returns:
+            str: One of FORMATS, "csv" for datasets without a format.
+        """
+        return self.metadata.get("format", "csv")
+
+    @property
+    def profile(self) -> dict:
+        """
+        Getter method for the profile of the dataset, from the metadata if
+        it is stored there, else computed from batches of the data once.
+
+        Returns:
+            dict: The number of rows, the memory in bytes of the data as a
+            dataframe and the dtype, null count, distinct count and min, max
+            and mean or most frequent values of every column by name, see
+            autoop.functional.profile.
+        """
+        if self._profile is None:
+            self._profile = self.metadata.get("profile")
+        if self._profile is None:
+            self._profile = profile_batches(
+                self.iter_batches(self.BATCH_SIZE))
+        return self._profile
+
+    def read(self, columns: List[str] = None, cache: bool = True,
+             compact: bool = False, allow_float32: bool = False
+             ) -> pd.DataFrame:
         """
         Reads the data from the dataset in streams of bytes. Returns
-        pandas dataframe of the data.
+        pandas dataframe of the data. The CSV is parsed directly from a view
+        of the data, without decoding a copy of it first. Columnar data is
+        recognized by its header and only has its columns copied.
+
+        In compact mode the dtypes come from the profile of the dataset:
+        integers get the smallest signed type that holds their range and
+        strings with repeated values become categoricals. CSV data is parsed
+        into these types directly. The bytes saved compared to the profiled
+        dtypes are in attrs["memory_saved"] of the dataframe.
+
+        Args:
+            columns (List[str]): The columns to read, in this order. Other
+            columns are skipped while parsing or loading. All columns if
+            None.
+            cache (bool): Whether the frame is taken from and added to the
+            frame_cache. Cached frames are shared, the returned frame copies
+            the data once it is changed.
+            compact (bool): Whether to read the columns in compact dtypes.
+            allow_float32 (bool): Whether compact mode reads floats as
+            float32, which loses precision.
+        Returns:
+            pd.DataFrame: Pandas dataframe made from the data.
+        Raises:
+            ValueError: If a column is not in the dataset.
+        """
+        dtypes = self._compact_dtypes(allow_float32) if compact else None
+        frame = self._read(columns, cache, dtypes)
+        if compact:
+            columns = self.profile["columns"]
+            profiled = sum(columns[str(name)]["memory"]
+                           for name in frame.columns if str(name) in columns)
+            frame.attrs["memory_saved"] = profiled - int(
+                frame.memory_usage(index=False, deep=True).sum())
+        return frame
+
+    def _read(self, columns: List[str] = None, cache: bool = True,
+              dtypes: Dict[str, str] = None) -> pd.DataFrame:
+        """
+        Private method that reads the data, from the frame_cache if cached.
+
+        Args:
+            columns (List[str]): The columns to read, None for all.
+            cache (bool): Whether the frame_cache is used.
+            dtypes (Dict[str, str]): The dtypes of columns, None for the
+            inferred dtypes.
+        Returns:
+            pd.DataFrame: Pandas dataframe made from the data.
+        """
+        if not cache:
+            with self.view() as view:
+                return self._parse(view, columns, dtypes)
+        if self._fingerprint is not None:
+            frame = self._cached(columns, dtypes)
+            if frame is not None:
+                return frame
+        with self.view() as view:
+            if self._fingerprint is None:
+                self._fingerprint = hashlib.blake2b(
+                    view, digest_size=16).hexdigest()
+                frame = self._cached(columns, dtypes)
+                if frame is not None:
+                    return frame
+            if columns is None:
+                frame = self._parse(view, None, dtypes)
+                self.frame_cache.put(self._cache_key(None, dtypes), frame)
+                return copy_frame(frame)
+            # Only the columns that are not cached are parsed
+            cached = self._cached_columns(columns, dtypes)
+            missing = [name for name in dict.fromkeys(columns)
+                       if name not in cached]
+            frame = self._parse(view, missing, dtypes)
+        for name in missing:
+            cached[name] = frame[[name]]
+            self.frame_cache.put(self._column_key(name, dtypes),
+                                 cached[name])
+        return pd.concat([cached[name] for name in columns], axis=1)
+
+    def _compact_dtypes(self, allow_float32: bool = False) -> Dict[str, str]:
+        """
+        Private method that chooses compact dtypes for the columns from the
+        profile of the dataset.
+
+        Args:
+            allow_float32 (bool): Whether floats become float32.
+        Returns:
+            Dict[str, str]: The compact dtype of the columns that have one.
+        """
+        profile = self.profile
+        dtypes = {}
+        for name, column in profile["columns"].items():
+            if column["dtype"] == "int64" and column["min"] is not None:
+                for dtype in ("int8", "int16", "int32"):
+                    info = np.iinfo(dtype)
+                    if info.min <= column["min"] and column["max"] <= info.max:
+                        dtypes[name] = dtype
+                        break
+            elif column["dtype"] == "float64" and allow_float32:
+                dtypes[name] = "float32"
+            elif column["dtype"] in ("str", "object") and (
+                    column["distinct"] <= profile["rows"] // 2):
+                # Categoricals store every distinct value once
+                dtypes[name] = "category"
+        return dtypes
+
+    def iter_batches(self, batch_size: int, columns: List[str] = None,
+                     as_numpy: bool = False
+                     ) -> Iterator[Union[pd.DataFrame, np.ndarray]]:
+        """
+        Reads the data from the dataset in batches of rows, without the
+        whole dataset in memory at once. CSV data is parsed while it is
+        streamed from the storage, columnar data takes the rows of every
+        batch from a view of the data.
+
+        Args:
+            batch_size (int): The maximum number of rows of a batch.
+            columns (List[str]): The columns to read, in this order. All
+            columns if None.
+            as_numpy (bool): Whether the batches are NumPy arrays instead of
+            dataframes.
+        Returns:
+            Iterator[Union[pd.DataFrame, np.ndarray]]: The batches, as
+            dataframes indexed by their rows in the dataset or as arrays.
+        Raises:
+            ValueError: If a column is not in the dataset or the batch size
+            is not positive.
+        """
+        for frame in self._iter_frames(batch_size, columns):
+            yield frame.to_numpy() if as_numpy else frame
+
+    def sample(self, size: int, columns: List[str] = None,
+               seed: int = None) -> pd.DataFrame:
+        """
+        Take a uniform random sample of the rows of the dataset, without
+        replacement. Columnar data is sampled by reading only the sampled
+        rows. CSV data is scanned once in batches, keeping a bounded
+        reservoir of the rows with the smallest random keys.
+
+        Args:
+            size (int): The number of rows to sample, all rows if the
+            dataset has fewer.
+            columns (List[str]): The columns to read, in this order. All
+            columns if None.
+            seed (int): The seed of the random generator.
+        Returns:
+            pd.DataFrame: The sampled rows in the order of the dataset,
+            indexed by their positions. The number of rows of the dataset is
+            in attrs["rows"].
+        Raises:
+            ValueError: If a column is not in the dataset or the size is
+            negative.
+        """
+        if size < 0:
+            raise ValueError("Sample size must not be negative.")
+        generator = np.random.default_rng(seed)
+        if self._is_columnar():
+            with self.view() as view:
+                count = columnar.row_count(view)
+                rows = generator.choice(count, min(size, count),
+                                        replace=False)
+                sample = columnar.take(view, np.sort(rows), columns)
+            sample.attrs["rows"] = count
+            return sample
+        count = 0
+        sample = sample_keys = None
+        for batch in self.iter_batches(self.BATCH_SIZE, columns):
+            count += len(batch)
+            keys = generator.random(len(batch))
+            if sample is not None:
+                batch = pd.concat([sample, batch])
+                keys = np.concatenate([sample_keys, keys])
+            if len(batch) > size:
+                kept = np.argpartition(keys, size)[:size]
+                batch = batch.iloc[kept]
+                keys = keys[kept]
+            sample, sample_keys = batch, keys
+        sample = sample.sort_index()
+        sample.attrs["rows"] = count
+        return sample
+
+    def _is_columnar(self) -> bool:
+        """
+        Private method that checks whether the data is in the columnar
+        format, from its first chunk.
+
+        Returns:
+            bool: Whether the data is columnar.
+        """
+        stream = self.stream()
+        try:
+            return columnar.is_columnar(next(stream, b""))
+        finally:
+            stream.close()
+
+    def _iter_frames(self, batch_size: int, columns: List[str] = None
+                     ) -> Iterator[pd.DataFrame]:
+        """
+        Private method that reads the data in batches of rows.
+
+        Args:
+            batch_size (int): The maximum number of rows of a batch.
+            columns (List[str]): The columns to read, None for all.
+        Returns:
+            Iterator[pd.DataFrame]: The batches as dataframes.
+        """
+        if batch_size < 1:
+            raise ValueError("Batch size must be positive.")
+        stream = self.stream()
+        first = next(stream, b"")
+        if columnar.is_columnar(first):
+            stream.close()
+            with self.view() as view:
+                yield from columnar.iter_batches(view, batch_size, columns)
+            return
+        reader = io.BufferedReader(
+            StreamReader(itertools.chain([first], stream)))
+        with pd.read_csv(reader, usecols=columns,
+                         chunksize=batch_size) as batches:
+            for frame in batches:
+                # The columns are parsed in the order of the file
+                yield frame if columns is None else frame[list(columns)]
+
+    def _cache_key(self, columns: List[str] = None,
+                   dtypes: Dict[str, str] = None) -> Tuple:
+        """
+        Private method that gives the key of a frame in the frame_cache.
+
+        Args:
+            columns (List[str]): The columns of the frame, None for all.
+            dtypes (Dict[str, str]): The dtypes the frame is read in.
+        Returns:
+            Tuple: The id, version and fingerprint of the dataset, the
+            columns and the dtypes.
+        """
+        return (self.id, self.version, self._fingerprint,
+                None if columns is None else tuple(columns),
+                None if dtypes is None else tuple(sorted(dtypes.items())))
+
+    def _column_key(self, name: str,
+                    dtypes: Dict[str, str] = None) -> Tuple:
+        """
+        Private method that gives the key of a column in the frame_cache.
+
+        Args:
+            name (str): The name of the column.
+            dtypes (Dict[str, str]): The dtypes the column is read in.
+        Returns:
+            Tuple: The key of the frame of the column, which only depends on
+            its own dtype.
+        """
+        if dtypes is None or name not in dtypes:
+            return self._cache_key([name])
+        return self._cache_key([name], {name: dtypes[name]})
+
+    def _cached(self, columns: List[str] = None,
+                dtypes: Dict[str, str] = None) -> pd.DataFrame:
+        """
+        Private method that gets a frame from the frame_cache. Columns are
+        cached one by one, and also taken from the frame of all columns if
+        that is cached.
+
+        Args:
+            columns (List[str]): The columns to read, None for all.
+            dtypes (Dict[str, str]): The dtypes the frame is read in.
+        Returns:
+            pd.DataFrame: The cached frame, None if it is not cached.
+        """
+        if columns is None:
+            return self.frame_cache.get(self._cache_key(None, dtypes))
+        cached = self._cached_columns(columns, dtypes)
+        if not set(columns).issubset(cached):
+            return None
+        return pd.concat([cached[name] for name in columns], axis=1)
+
+    def _cached_columns(self, columns: List[str],
+                        dtypes: Dict[str, str] = None
+                        ) -> Dict[str, pd.DataFrame]:
+        """
+        Private method that gets the columns of a frame that are cached.
+
+        Args:
+            columns (List[str]): The columns to read.
+            dtypes (Dict[str, str]): The dtypes the frame is read in.
+        Returns:
+            Dict[str, pd.DataFrame]: The frame of every cached column by
+            name.
+        """
+        cached = {}
+        for name in dict.fromkeys(columns):
+            frame = self.frame_cache.get(self._column_key(name, dtypes))
+            if frame is not None:
+                cached[name] = frame
+        if len(cached) == len(set(columns)):
+            return cached
+        frame = self.frame_cache.get(self._cache_key(None, dtypes))
+        if frame is None:
+            return cached
+        return {**{name: frame[[name]] for name in columns
+                   if name in frame.columns}, **cached}
+
+    @staticmethod
+    def _parse(view: memoryview, columns: List[str] = None,
+               dtypes: Dict[str, str] = None) -> pd.DataFrame:
+        """
+        Private method that parses a dataframe from the data.
 
+        Args:
+            view (memoryview): View of the data.
+            columns (List[str]): The columns to read, None for all.
+            dtypes (Dict[str, str]): The dtypes of columns, None for the
+            inferred dtypes.
         Returns:
             pd.DataFrame: Pandas dataframe made from the data.
         """
-        bytes = super().read()
-        csv = bytes.decode()
-        return pd.read_csv(io.StringIO(csv))
+        if columnar.is_columnar(view):
+            frame = columnar.decode(view, columns=columns)
+            if dtypes:
+                frame = frame.astype({name: dtype for name, dtype
+                                      in dtypes.items()
+                                      if name in frame.columns})
+            return frame
+        frame = pd.read_csv(MemoryViewReader(view), usecols=columns,
+                            dtype=dtypes)
+        if columns is not None:
+            # The columns are parsed in the order of the file
+            frame = frame[list(columns)]
+        return frame
+
+    def to_csv(self) -> bytes:
+        """
+        Get the data as CSV, e.g. to download it.
+
+        Returns:
+            bytes: The data in CSV format.
+        """
+        if self.format == "csv":
+            return self.data
+        return self.read().to_csv(index=False).encode()
 
     def save(self, data: pd.DataFrame) -> bytes:
         """
@@ -63,5 +544,22 @@ class Dataset(Artifact):
         Returns:
             bytes: The data saved in bytes.
         """
-        bytes = data.to_csv(index=False).encode()
+        bytes = self._encode(data, self.format)
         return super().save(bytes)
+
+    @staticmethod
+    def _encode(data: pd.DataFrame, format: str) -> bytes:
+        """
+        Private method that encodes a dataframe in a format.
+
+        Args:
+            data (pd.DataFrame): The dataframe to encode.
+            format (str): One of FORMATS.
+        Returns:
+            bytes: The encoded data.
+        """
+        if format == "csv":
+            return data.to_csv(index=False).encode()
+        if format == "columnar":
+            return columnar.encode(data)
+        raise ValueError(f"Unknown format: {format}")
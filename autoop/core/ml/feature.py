@@ -1,3 +1,6 @@
+from typing import Optional
+
+
 class Feature(object):
     """
     Feature class that handles the name and the type of a feature column.
@@ -46,7 +49,31 @@ class Feature(object):
         else:
             self._type = value
 
-    def __init__(self, type: str, name: str) -> None:
+    @property
+    def cardinality(self) -> Optional[int]:
+        """
+        Getter for the private cardinality attribute
+
+        Returns:
+            Optional[int]: The estimated number of distinct values of the
+            feature column, None if it is not known.
+        """
+        return self._cardinality
+
+    @property
+    def confidence(self) -> Optional[float]:
+        """
+        Getter for the private confidence attribute
+
+        Returns:
+            Optional[float]: How certain the type detected from a sample of
+            the rows is, from 0 to 1, None if the type was not detected
+            from a sample.
+        """
+        return self._confidence
+
+    def __init__(self, type: str, name: str, cardinality: int = None,
+                 confidence: float = None) -> None:
         """
         Initializer for the Feature class
 
@@ -57,12 +84,18 @@ class Feature(object):
             limited amount of values.
             name (str): The name of the feature column the Feature class is
             refering to.
+            cardinality (int): The estimated number of distinct values of the
+            feature column, if it is known.
+            confidence (float): How certain the type detected from a
+            sample of the rows is, from 0 to 1, if it was.
 
         Returns:
             None
         """
         self.type = type
         self._name = name
+        self._cardinality = cardinality
+        self._confidence = confidence
 
     def __str__(self) -> str:
         """
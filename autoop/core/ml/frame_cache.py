@@ -0,0 +1,128 @@
+from collections import OrderedDict
+import threading
+from typing import Dict, Hashable, Optional
+
+import pandas as pd
+
+
+class FrameCache():
+    """
+    In-memory cache of parsed dataframes, shared by the datasets of a
+    process. The least recently used frames are evicted once the cached
+    frames exceed a budget in bytes. Frames are never handed out directly:
+    every get returns a shallow copy, which copies the data on write, so
+    changes by a caller do not reach the cached frame or other callers.
+    Versions of pandas without copy-on-write get a deep copy instead.
+    """
+    def __init__(self, max_bytes: int = 256 << 20) -> None:
+        """
+        Initialize FrameCache class
+        Args:
+            max_bytes (int): The maximum amount of bytes of frames kept in
+            memory
+        """
+        self._max_bytes = max_bytes
+        self._cache: OrderedDict[Hashable, pd.DataFrame] = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    @property
+    def max_bytes(self) -> int:
+        """
+        Getter method for the budget of the cache.
+        Returns:
+            int: The maximum amount of bytes kept in memory
+        """
+        return self._max_bytes
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """
+        Getter method for the statistics of the cache.
+        Returns:
+            Dict[str, int]: The hits, misses and evictions so far and the
+            amount of bytes and entries in the cache
+        """
+        with self._lock:
+            return {"hits": self._hits, "misses": self._misses,
+                    "evictions": self._evictions, "bytes": self._size,
+                    "entries": len(self._cache)}
+
+    def get(self, key: Hashable) -> Optional[pd.DataFrame]:
+        """
+        Get a frame given a key.
+        Args:
+            key (Hashable): The key the frame is cached under.
+        Returns:
+            Optional[pd.DataFrame]: A copy of the frame, None if the cache
+            does not hold the key.
+        """
+        with self._lock:
+            frame = self._cache.get(key)
+            if frame is None:
+                self._misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self._hits += 1
+        return copy_frame(frame)
+
+    def put(self, key: Hashable, frame: pd.DataFrame) -> None:
+        """
+        Add a frame to the cache and evict the least recently used frames
+        until the cache fits its budget. Frames larger than the budget are
+        not cached. The frame must not be changed afterwards by the caller.
+        Args:
+            key (Hashable): The key to cache the frame under.
+            frame (pd.DataFrame): The frame to cache.
+        """
+        size = int(frame.memory_usage(index=True, deep=True).sum())
+        if size > self._max_bytes:
+            return
+        with self._lock:
+            if key in self._cache:
+                del self._cache[key]
+                self._size -= self._sizes.pop(key)
+            self._cache[key] = frame
+            self._sizes[key] = size
+            self._size += size
+            while self._size > self._max_bytes:
+                evicted, _ = self._cache.popitem(last=False)
+                self._size -= self._sizes.pop(evicted)
+                self._evictions += 1
+
+    def clear(self) -> None:
+        """
+        Drop all frames from the cache.
+        """
+        with self._lock:
+            self._cache.clear()
+            self._sizes.clear()
+            self._size = 0
+
+
+def copy_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Copy a frame so changes to the copy do not reach the frame: a shallow
+    copy if pandas copies on write, else a deep copy.
+    Args:
+        frame (pd.DataFrame): The frame to copy
+    Returns:
+        pd.DataFrame: The copy
+    """
+    return frame.copy(deep=not _copy_on_write())
+
+
+def _copy_on_write() -> bool:
+    """
+    Private function that checks whether pandas copies the data of a shallow
+    copy when it is changed, which is always the case from pandas 3.
+    Returns:
+        bool: Whether copy-on-write is enabled
+    """
+    if int(pd.__version__.split(".")[0]) >= 3:
+        return True
+    return pd.get_option("mode.copy_on_write") is True
@@ -1,7 +1,88 @@
+from autoop.core.lock import FileLock
+
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
 from glob import glob
+import asyncio
+import bisect
+import bz2
+import hashlib
+import io
+import itertools
+import lzma
+import mmap
 import os
-from typing import List
+import sqlite3
+import tempfile
+import threading
+from typing import (
+    BinaryIO, Callable, Dict, Iterable, Iterator, List, MutableMapping,
+    Optional, Sequence, Union
+)
+from urllib.parse import quote, unquote
+import weakref
+import zlib
+
+# The default size in bytes of the chunks data is streamed in
+CHUNK_SIZE = 1 << 20
+
+# Data to stream, either a binary file object or an iterable of chunks
+Stream = Union[BinaryIO, Iterable[bytes]]
+
+# The default number of threads of bulk operations
+MAX_WORKERS = 8
+
+# Lock of storages that do not lock paths across processes
+_thread_lock = threading.RLock()
+
+
+def iter_chunks(stream: Stream, chunk_size: int = CHUNK_SIZE
+                ) -> Iterator[bytes]:
+    """
+    Iterate over the chunks of a stream.
+    Args:
+        stream (Stream): A binary file object, which is read in chunks of
+        chunk_size, or an iterable of bytes-like chunks
+        chunk_size (int): The size of the chunks read from a file object
+    Returns:
+        Iterator[bytes]: The non-empty chunks of the stream
+    """
+    if hasattr(stream, "read"):
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    for chunk in stream:
+        if len(chunk):
+            yield chunk
+
+
+def map_threads(function: Callable, items: Sequence,
+                max_workers: int = MAX_WORKERS) -> list:
+    """
+    Call a function on every item, over a bounded pool of threads.
+    Args:
+        function (Callable): The function to call with an item
+        items (Sequence): The items
+        max_workers (int): The maximum number of threads
+    Returns:
+        list: The result of every item in order, or the exception raised
+        by the call for the item
+    """
+    def call(item: object) -> object:
+        try:
+            return function(item)
+        except Exception as e:
+            return e
+
+    if len(items) <= 1 or max_workers <= 1:
+        return [call(item) for item in items]
+    with ThreadPoolExecutor(min(max_workers, len(items))) as executor:
+        return list(executor.map(call, items))
 
 
 class NotFoundError(Exception):
@@ -17,6 +98,131 @@ class NotFoundError(Exception):
         super().__init__(f"Path not found: {path}")
 
 
+class MemoryViewReader(io.RawIOBase):
+    """
+    Read-only binary file object over a memoryview, such as one returned by
+    Storage.load_view. Reading copies only the requested part of the view,
+    so parsers can consume stored data without a copy of the whole data.
+    """
+    def __init__(self, view: memoryview) -> None:
+        """
+        Initialize MemoryViewReader class
+        Args:
+            view (memoryview): The data to read
+        """
+        super().__init__()
+        self._view = view.cast("B") if view.format != "B" else view
+        self._position = 0
+
+    def readable(self) -> bool:
+        """
+        Returns:
+            bool: True, the reader is readable
+        """
+        return True
+
+    def seekable(self) -> bool:
+        """
+        Returns:
+            bool: True, the reader is seekable
+        """
+        return True
+
+    def readinto(self, buffer: bytearray) -> int:
+        """
+        Read data from the view into a buffer.
+        Args:
+            buffer (bytearray): The writable buffer to read into
+        Returns:
+            int: The amount of bytes read, 0 at the end of the view
+        """
+        size = min(len(buffer), len(self._view) - self._position)
+        memoryview(buffer).cast("B")[:size] = self._view[
+            self._position:self._position + size]
+        self._position += size
+        return size
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        """
+        Change the position of the reader.
+        Args:
+            offset (int): The offset relative to whence
+            whence (int): SEEK_SET, SEEK_CUR or SEEK_END
+        Returns:
+            int: The new position
+        """
+        start = {io.SEEK_SET: 0, io.SEEK_CUR: self._position,
+                 io.SEEK_END: len(self._view)}[whence]
+        self._position = max(0, start + offset)
+        return self._position
+
+    def tell(self) -> int:
+        """
+        Returns:
+            int: The position of the reader
+        """
+        return self._position
+
+
+class StreamReader(io.RawIOBase):
+    """
+    Read-only binary file object over a stream, such as one returned by
+    Storage.load_stream. Chunks are pulled from the stream as they are read,
+    so parsers can consume stored data without all of it in memory.
+    """
+    def __init__(self, stream: Stream) -> None:
+        """
+        Initialize StreamReader class
+        Args:
+            stream (Stream): A binary file object or an iterable of chunks
+        """
+        super().__init__()
+        self._chunks = iter_chunks(stream)
+        self._chunk = memoryview(b"")
+        self._position = 0
+
+    def readable(self) -> bool:
+        """
+        Returns:
+            bool: True, the reader is readable
+        """
+        return True
+
+    def readinto(self, buffer: bytearray) -> int:
+        """
+        Read data from the stream into a buffer.
+        Args:
+            buffer (bytearray): The writable buffer to read into
+        Returns:
+            int: The amount of bytes read, 0 at the end of the stream
+        """
+        if not len(self._chunk):
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._chunk = memoryview(chunk).cast("B")
+        size = min(len(buffer), len(self._chunk))
+        memoryview(buffer).cast("B")[:size] = self._chunk[:size]
+        self._chunk = self._chunk[size:]
+        self._position += size
+        return size
+
+    def tell(self) -> int:
+        """
+        Returns:
+            int: The position of the reader
+        """
+        return self._position
+
+    def close(self) -> None:
+        """
+        Close the reader and the stream.
+        """
+        if hasattr(self._chunks, "close"):
+            self._chunks.close()
+        super().close()
+
+
 class Storage(ABC):
     """
     Abstract or interface class for classes that store data on a framework.
@@ -62,6 +268,100 @@ class Storage(ABC):
         """
         pass
 
+    def load_view(self, path: str) -> memoryview:
+        """
+        Load data from a given path as a read-only memoryview. Storages that
+        can map stored data into memory should override this method to avoid
+        copying the data.
+        Args:
+            path (str): Path to load data
+        Returns:
+            memoryview: Read-only view of the loaded data
+        """
+        return memoryview(self.load(path))
+
+    def save_stream(self, stream: Stream, path: str) -> None:
+        """
+        Save streamed data to a given path. Storages that can write chunks
+        one by one should override this method, so the data never has to be
+        in memory at once.
+        Args:
+            stream (Stream): A binary file object or an iterable of chunks
+            path (str): Path to save data
+        """
+        self.save(b"".join(iter_chunks(stream)), path)
+
+    def save_many(self, data: Sequence[bytes], paths: Sequence[str],
+                  max_workers: int = MAX_WORKERS) -> List[Exception]:
+        """
+        Save data to many paths, in parallel over a pool of threads.
+        Args:
+            data (Sequence[bytes]): The data to save at each path
+            paths (Sequence[str]): The paths to save the data
+            max_workers (int): The maximum number of threads
+        Returns:
+            List[Exception]: For every path the exception raised while saving
+            its data, None if it was saved
+        """
+        return map_threads(lambda item: self.save(*item),
+                           list(zip(data, paths)), max_workers)
+
+    def load_many(self, paths: Sequence[str],
+                  max_workers: int = MAX_WORKERS
+                  ) -> List[Union[bytes, Exception]]:
+        """
+        Load the data of many paths, in parallel over a pool of threads.
+        Args:
+            paths (Sequence[str]): The paths to load data from
+            max_workers (int): The maximum number of threads
+        Returns:
+            List[Union[bytes, Exception]]: For every path its data, or the
+            exception raised while loading it
+        """
+        return map_threads(self.load, list(paths), max_workers)
+
+    def load_stream(self, path: str, chunk_size: int = CHUNK_SIZE
+                    ) -> Iterator[bytes]:
+        """
+        Load data from a given path in chunks.
+        Args:
+            path (str): Path to load data
+            chunk_size (int): The maximum size of the chunks
+        Returns:
+            Iterator[bytes]: The chunks of the loaded data
+        """
+        with self.load_view(path) as view:
+            for start in range(0, len(view), chunk_size):
+                yield bytes(view[start:start + chunk_size])
+
+    def append(self, data: bytes, path: str) -> None:
+        """
+        Append data to the data at a given path, the data is saved if there
+        is no data at the path yet. Storages that can append in place should
+        override this method.
+        Args:
+            data (bytes): Data to append
+            path (str): Path to append data to
+        """
+        with self.lock(path):
+            try:
+                existing = self.load(path)
+            except NotFoundError:
+                existing = b""
+            self.save(existing + data, path)
+
+    @contextmanager
+    def lock(self, path: str) -> Iterator[None]:
+        """
+        Hold an exclusive lock on a path while reading and changing its data.
+        The lock is reentrant. This default only excludes other threads of
+        the process, storages that are shared between processes override it.
+        Args:
+            path (str): Path to lock
+        """
+        with _thread_lock:
+            yield
+
 
 class LocalStorage(Storage):
     """
@@ -85,12 +385,71 @@ class LocalStorage(Storage):
             data (bytes): The data to save
             key (str): The dictonary and file to save the data in.
         """
+        self.save_stream([data], key)
+
+    def save_stream(self, stream: Stream, key: str) -> None:
+        """
+        Save streamed data given a key, writing it to the file chunk by
+        chunk.
+        Args:
+            stream (Stream): A binary file object or an iterable of chunks
+            key (str): The dictonary and file to save the data in.
+        """
         path = self._join_path(key)
         # Ensure parent directories are created
         os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, 'wb') as f:
+        # Replace the file instead of truncating it, as a memory map of the
+        # old file may still be in use by load_view
+        descriptor, temp_path = tempfile.mkstemp(
+            dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(descriptor, 'wb') as f:
+                for chunk in iter_chunks(stream):
+                    f.write(chunk)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    def load_stream(self, key: str, chunk_size: int = CHUNK_SIZE
+                    ) -> Iterator[bytes]:
+        """
+        Load data given a key by reading the file chunk by chunk.
+        Args:
+            key (str): The dictonary and file to save the data in.
+            chunk_size (int): The maximum size of the chunks
+        Returns:
+            Iterator[bytes]: The chunks of the data.
+        """
+        path = self._join_path(key)
+        self._assert_path_exists(path)
+        with open(path, 'rb') as f:
+            yield from iter_chunks(f, chunk_size)
+
+    def append(self, data: bytes, key: str) -> None:
+        """
+        Append data to the file of a key, without rewriting the file.
+        Args:
+            data (bytes): The data to append
+            key (str): The dictonary and file to append the data to.
+        """
+        path = self._join_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'ab') as f:
             f.write(data)
 
+    @contextmanager
+    def lock(self, key: str) -> Iterator[None]:
+        """
+        Hold an exclusive lock on a key, shared by all processes using the
+        directory, with an advisory lock on a hidden lock file.
+        Args:
+            key (str): The key to lock.
+        """
+        name = quote(os.path.normpath(key).strip(os.sep), safe="")
+        with FileLock.get(os.path.join(self._base_path, f".lock-{name}")):
+            yield
+
     def load(self, key: str) -> bytes:
         """
         Load data given a key.
@@ -104,6 +463,23 @@ class LocalStorage(Storage):
         with open(path, 'rb') as f:
             return f.read()
 
+    def load_view(self, key: str) -> memoryview:
+        """
+        Load data given a key as a read-only memoryview over a memory map of
+        the file, so the data is not copied into memory.
+        Args:
+            key (str): The dictonary and file to save the data in.
+        Returns:
+            memoryview: Read-only view of the data.
+        """
+        path = self._join_path(key)
+        self._assert_path_exists(path)
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return memoryview(b"")
+            return memoryview(mmap.mmap(f.fileno(), 0,
+                                        access=mmap.ACCESS_READ))
+
     def delete(self, key: str = "/") -> None:
         """
         Delete data given a key.
@@ -149,3 +525,1085 @@ class LocalStorage(Storage):
             str: The joined path
         """
         return os.path.normpath(os.path.join(self._base_path, path))
+
+
+class ShardedStorage(LocalStorage):
+    """
+    Local storage class that spreads the files over nested directories named
+    after the hash of their key, so no directory holds more than a fraction
+    of the files. The keys are kept in an index file, an append-only log of
+    added and removed keys, so listing a prefix does not walk the directory
+    tree. Other processes sharing the directory are picked up by reading
+    the lines they appended to the index.
+    """
+    _INDEX = ".index"
+
+    def __init__(self, base_path: str = "./assets", levels: int = 2,
+                 compact_every: int = 1024) -> None:
+        """
+        Initalize ShardedStorage class
+        Args:
+            base_path: The OS path where the data is stored
+            levels: The number of nested directories, 256 per level
+            compact_every: The number of obsolete lines after which the index
+            file is rewritten
+        """
+        super().__init__(base_path)
+        self._levels = levels
+        self._compact_every = compact_every
+        self._index_path = os.path.join(self._base_path, self._INDEX)
+        self._keys: List[str] = []
+        self._key_set = set()
+        self._index_id = None
+        self._offset = 0
+        self._lines = 0
+        self._lock = threading.RLock()
+
+    def save_stream(self, stream: Stream, key: str) -> None:
+        """
+        Save streamed data given a key and add the key to the index.
+        Args:
+            stream (Stream): A binary file object or an iterable of chunks
+            key (str): The key to save the data under.
+        """
+        super().save_stream(stream, key)
+        self._add(key)
+
+    def append(self, data: bytes, key: str) -> None:
+        """
+        Append data to the file of a key and add the key to the index.
+        Args:
+            data (bytes): The data to append
+            key (str): The key to append the data to.
+        """
+        super().append(data, key)
+        self._add(key)
+
+    def delete(self, key: str = "/") -> None:
+        """
+        Delete data given a key and remove the key from the index.
+        Args:
+            key (str): The key the data is saved under.
+        """
+        super().delete(key)
+        with self._lock:
+            self._sync()
+            key = self._normalize(key)
+            if key in self._key_set:
+                self._write_index(f"-{quote(key)}\n")
+
+    def list(self, prefix: str = "/") -> List[str]:
+        """
+        List all keys under a given prefix using the index.
+        Args:
+            prefix (str): Prefix to list.
+        Returns:
+            List[str]: The keys under the given prefix.
+        Raises:
+            NotFoundError: If nothing is stored under the prefix.
+        """
+        with self._lock:
+            self._sync()
+            prefix = self._normalize(prefix)
+            if not prefix:
+                return list(self._keys)
+            start = bisect.bisect_left(self._keys, prefix + os.sep)
+            end = bisect.bisect_left(self._keys,
+                                     prefix + chr(ord(os.sep) + 1))
+            if start == end and prefix not in self._key_set:
+                raise NotFoundError(self._join_path(prefix))
+            return self._keys[start:end]
+
+    def rebuild_index(self) -> None:
+        """
+        Rebuild the index file from the files in the directory tree.
+        """
+        keys = []
+        pattern = os.path.join(self._base_path, *["*"] * self._levels)
+        for folder in glob(pattern):
+            for root, _, names in os.walk(folder):
+                keys += [os.path.relpath(os.path.join(root, name), folder)
+                         for name in names if not name.startswith(".tmp-")]
+        with self._lock:
+            self._rewrite_index(sorted(keys))
+
+    def _add(self, key: str) -> None:
+        """
+        Private method that adds a key to the index if it is new.
+        Args:
+            key (str): The key.
+        """
+        with self._lock:
+            self._sync()
+            key = self._normalize(key)
+            if key not in self._key_set:
+                self._write_index(f"+{quote(key)}\n")
+
+    def _write_index(self, line: str) -> None:
+        """
+        Private method that appends a line to the index file, and rewrites
+        the file once it holds too many obsolete lines.
+        Args:
+            line (str): The line with the added or removed key.
+        """
+        with self.lock(self._INDEX):
+            with open(self._index_path, "ab") as f:
+                f.write(line.encode())
+            self._sync()
+            if self._lines - len(self._keys) > self._compact_every:
+                self._rewrite_index(self._keys)
+
+    def _rewrite_index(self, keys: List[str]) -> None:
+        """
+        Private method that replaces the index file by one with the keys.
+        Args:
+            keys (List[str]): The keys in the index.
+        """
+        with self.lock(self._INDEX):
+            descriptor, temp_path = tempfile.mkstemp(
+                dir=self._base_path, prefix=".tmp-")
+            with os.fdopen(descriptor, "wb") as f:
+                f.write("".join(f"+{quote(key)}\n" for key in keys).encode())
+            os.replace(temp_path, self._index_path)
+            self._index_id = None
+            self._sync()
+
+    def _sync(self) -> None:
+        """
+        Private method that reads the lines appended to the index file since
+        the last sync, or the whole file if it was replaced. The index is
+        built from the directory tree if there is no index file.
+        """
+        try:
+            stat = os.stat(self._index_path)
+        except FileNotFoundError:
+            self.rebuild_index()
+            return
+        index_id = (stat.st_dev, stat.st_ino)
+        if index_id != self._index_id or stat.st_size < self._offset:
+            self._index_id = index_id
+            self._keys = []
+            self._key_set = set()
+            self._offset = 0
+            self._lines = 0
+        if stat.st_size == self._offset:
+            return
+        with open(self._index_path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read()
+        # Skip a line that is still being written
+        data = data[:data.rfind(b"\n") + 1]
+        self._offset += len(data)
+        lines = data.decode().splitlines()
+        self._lines += len(lines)
+        # Insert few keys in place, but sort once when reading many
+        in_place = len(lines) < 64
+        for line in lines:
+            key = unquote(line[1:])
+            if line[0] == "+" and key not in self._key_set:
+                self._key_set.add(key)
+                if in_place:
+                    bisect.insort(self._keys, key)
+            elif line[0] == "-" and key in self._key_set:
+                self._key_set.remove(key)
+                if in_place:
+                    del self._keys[bisect.bisect_left(self._keys, key)]
+        if not in_place:
+            self._keys = sorted(self._key_set)
+
+    @staticmethod
+    def _normalize(key: str) -> str:
+        """
+        Private method that normalizes a key as stored in the index.
+        Args:
+            key (str): The key.
+        Returns:
+            str: The normalized key, empty for the root.
+        """
+        key = os.path.normpath(key).strip(os.sep)
+        return "" if key == "." else key
+
+    def _join_path(self, path: str) -> str:
+        """
+        Private method that gets the path of the file of a key, in the
+        directories named after the hash of the key. Like in LocalStorage,
+        the segments of the key are directories, so no file name is longer
+        than a segment.
+        Args:
+            path (str): The key.
+        Returns:
+            str: The path of the file.
+        """
+        key = self._normalize(path)
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        folders = [digest[2 * level:2 * level + 2]
+                   for level in range(self._levels)]
+        return os.path.join(self._base_path, *folders, key)
+
+
+class CachingStorage(Storage):
+    """
+    Storage class that wraps another storage and keeps recently loaded data
+    in memory. The least recently used data is evicted once the cached data
+    exceeds a budget in bytes. Data is dropped from the cache when its key
+    is saved or deleted through this storage, and data loaded while its key
+    is saved or deleted is not cached.
+    """
+    def __init__(self, storage: Storage, max_bytes: int = 256 << 20) -> None:
+        """
+        Initialize CachingStorage class
+        Args:
+            storage (Storage): The storage to cache
+            max_bytes (int): The maximum amount of bytes kept in memory
+        """
+        self._storage = storage
+        self._max_bytes = max_bytes
+        self._cache: OrderedDict[str, bytes] = OrderedDict()
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        # The number of loads from the storage in progress and the number of
+        # invalidations since they started, by key
+        self._loading: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def storage(self) -> Storage:
+        """
+        Getter method for the wrapped storage.
+        Returns:
+            Storage: The storage that is cached
+        """
+        return self._storage
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """
+        Getter method for the statistics of the cache.
+        Returns:
+            Dict[str, int]: The hits, misses and evictions so far and the
+            amount of bytes and entries in the cache
+        """
+        with self._lock:
+            return {"hits": self._hits, "misses": self._misses,
+                    "evictions": self._evictions, "bytes": self._size,
+                    "entries": len(self._cache)}
+
+    def save(self, data: bytes, key: str) -> None:
+        """
+        Save data given a key and drop the key from the cache.
+        Args:
+            data (bytes): The data to save
+            key (str): The key to save the data under.
+        """
+        try:
+            self._storage.save(data, key)
+        finally:
+            self._invalidate(key)
+
+    def save_stream(self, stream: Stream, key: str) -> None:
+        """
+        Save streamed data given a key and drop the key from the cache.
+        Args:
+            stream (Stream): A binary file object or an iterable of chunks
+            key (str): The key to save the data under.
+        """
+        try:
+            self._storage.save_stream(stream, key)
+        finally:
+            self._invalidate(key)
+
+    def append(self, data: bytes, key: str) -> None:
+        """
+        Append data to the data of a key and drop the key from the cache.
+        Args:
+            data (bytes): The data to append
+            key (str): The key to append the data to.
+        """
+        try:
+            self._storage.append(data, key)
+        finally:
+            self._invalidate(key)
+
+    def load(self, key: str) -> bytes:
+        """
+        Load data given a key, from the cache if it holds the key.
+        Args:
+            key (str): The key the data is saved under.
+        Returns:
+            bytes: The data that is loaded.
+        """
+        normalized = os.path.normpath(key)
+        with self._lock:
+            data = self._cache.get(normalized)
+            if data is not None:
+                self._cache.move_to_end(normalized)
+                self._hits += 1
+                return data
+            self._misses += 1
+            loading = self._loading.setdefault(normalized, [0, 0])
+            loading[0] += 1
+            generation = loading[1]
+        try:
+            data = self._storage.load(key)
+        except BaseException:
+            self._put(normalized, None, generation)
+            raise
+        self._put(normalized, data, generation)
+        return data
+
+    def load_view(self, key: str) -> memoryview:
+        """
+        Load data given a key as a read-only memoryview of the cached data.
+        Args:
+            key (str): The key the data is saved under.
+        Returns:
+            memoryview: Read-only view of the data.
+        """
+        return memoryview(self.load(key))
+
+    def load_stream(self, key: str, chunk_size: int = CHUNK_SIZE
+                    ) -> Iterator[bytes]:
+        """
+        Load data given a key in chunks. Streamed data is not cached, as it
+        may not fit in memory.
+        Args:
+            key (str): The key the data is saved under.
+            chunk_size (int): The maximum size of the chunks
+        Returns:
+            Iterator[bytes]: The chunks of the data.
+        """
+        with self._lock:
+            data = self._cache.get(os.path.normpath(key))
+        if data is None:
+            return self._storage.load_stream(key, chunk_size)
+        return (data[start:start + chunk_size]
+                for start in range(0, len(data), chunk_size))
+
+    @contextmanager
+    def lock(self, key: str) -> Iterator[None]:
+        """
+        Hold an exclusive lock on a key of the wrapped storage.
+        Args:
+            key (str): The key to lock.
+        """
+        with self._storage.lock(key):
+            yield
+
+    def delete(self, key: str = "/") -> None:
+        """
+        Delete data given a key and drop the key from the cache.
+        Args:
+            key (str): The key the data is saved under.
+        """
+        try:
+            self._storage.delete(key)
+        finally:
+            self._invalidate(key)
+
+    def list(self, prefix: str = "/") -> List[str]:
+        """
+        List all keys under a given prefix in the wrapped storage.
+        Args:
+            prefix (str): Prefix to list.
+        Returns:
+            List[str]: The keys under the given prefix.
+        """
+        return self._storage.list(prefix)
+
+    def clear(self) -> None:
+        """
+        Drop all data from the cache.
+        """
+        with self._lock:
+            self._cache.clear()
+            self._size = 0
+
+    def _put(self, key: str, data: Optional[bytes],
+             generation: int) -> None:
+        """
+        Private method that ends a load from the storage and adds the loaded
+        data to the cache, unless the key was saved or deleted since the
+        load started, as the data may be outdated. The least recently used
+        data is evicted until the cache fits its budget.
+        Args:
+            key (str): The normalized key.
+            data (Optional[bytes]): The loaded data, None if the load failed.
+            generation (int): The number of invalidations of the key when
+            the load started.
+        """
+        with self._lock:
+            loading = self._loading[key]
+            loading[0] -= 1
+            if loading[0] == 0:
+                del self._loading[key]
+            if data is None or loading[1] != generation:
+                return
+            if len(data) > self._max_bytes:
+                return
+            if key in self._cache:
+                self._size -= len(self._cache.pop(key))
+            self._cache[key] = data
+            self._size += len(data)
+            while self._size > self._max_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._size -= len(evicted)
+                self._evictions += 1
+
+    def _invalidate(self, key: str) -> None:
+        """
+        Private method that drops a key from the cache, and from the loads
+        of the key in progress.
+        Args:
+            key (str): The key.
+        """
+        key = os.path.normpath(key)
+        with self._lock:
+            data = self._cache.pop(key, None)
+            if data is not None:
+                self._size -= len(data)
+            if key in self._loading:
+                self._loading[key][1] += 1
+
+
+class _Uncompressed():
+    """
+    Compressor and decompressor of the "none" codec, which returns the data
+    as is.
+    """
+    def compress(self, data: bytes) -> bytes:
+        """
+        Returns:
+            bytes: The data itself
+        """
+        return data
+
+    def decompress(self, data: bytes) -> bytes:
+        """
+        Returns:
+            bytes: The data itself
+        """
+        return data
+
+    def flush(self) -> bytes:
+        """
+        Returns:
+            bytes: No remaining data
+        """
+        return b""
+
+
+class CompressedStorage(Storage):
+    """
+    Storage class that wraps another storage and compresses data with a
+    codec from the standard library: "zlib", "bz2", "lzma" or "none". The
+    codec is chosen by the longest matching key prefix in the rules, e.g.
+    {"blobs/dataset": "zlib"} for datasets registered in the artifact
+    registry. Stored data starts with a header naming the codec, so loading
+    detects it. Data without a header, saved before the storage was
+    wrapped, is loaded as is.
+    """
+    MAGIC = b"\x89AOC"
+    CODECS = {"none": 0, "zlib": 1, "bz2": 2, "lzma": 3}
+
+    def __init__(self, storage: Storage, codec: str = "zlib",
+                 rules: Dict[str, str] = None, level: int = None) -> None:
+        """
+        Initialize CompressedStorage class
+        Args:
+            storage (Storage): The storage to compress the data in
+            codec (str): The codec of keys that match no rule
+            rules (Dict[str, str]): The codec per key prefix
+            level (int): The compression level, the default of each codec
+            if None
+        """
+        rules = rules or {}
+        for name in [codec, *rules.values()]:
+            if name not in self.CODECS:
+                raise ValueError(f"Unknown codec: {name}")
+        self._storage = storage
+        self._codec = codec
+        self._rules = {os.path.normpath(prefix): name
+                       for prefix, name in rules.items()}
+        self._level = level
+
+    @property
+    def storage(self) -> Storage:
+        """
+        Getter method for the wrapped storage.
+        Returns:
+            Storage: The storage the data is compressed in
+        """
+        return self._storage
+
+    def codec_for(self, key: str) -> str:
+        """
+        Get the codec that data saved under a key is compressed with.
+        Args:
+            key (str): The key.
+        Returns:
+            str: The codec of the longest matching prefix rule, or the
+            default codec.
+        """
+        key = os.path.normpath(key)
+        matches = [prefix for prefix in self._rules
+                   if key == prefix or key.startswith(prefix + os.sep)]
+        if not matches:
+            return self._codec
+        return self._rules[max(matches, key=len)]
+
+    def save(self, data: bytes, key: str) -> None:
+        """
+        Compress and save data given a key.
+        Args:
+            data (bytes): The data to save
+            key (str): The key to save the data under.
+        """
+        self.save_stream([data], key)
+
+    def save_stream(self, stream: Stream, key: str) -> None:
+        """
+        Compress and save streamed data given a key, chunk by chunk.
+        Args:
+            stream (Stream): A binary file object or an iterable of chunks
+            key (str): The key to save the data under.
+        """
+        codec = self.codec_for(key)
+        self._storage.save_stream(
+            self._compress(iter_chunks(stream), codec), key)
+
+    def load(self, key: str) -> bytes:
+        """
+        Load and decompress data given a key.
+        Args:
+            key (str): The key the data is saved under.
+        Returns:
+            bytes: The decompressed data.
+        """
+        with self._storage.load_view(key) as view:
+            codec = self._read_header(view)
+            if codec is None:
+                return bytes(view)
+            data = view[len(self.MAGIC) + 1:]
+            if codec == "zlib":
+                return zlib.decompress(data)
+            if codec == "bz2":
+                return bz2.decompress(data)
+            if codec == "lzma":
+                return lzma.decompress(data)
+            return bytes(data)
+
+    def load_view(self, key: str) -> memoryview:
+        """
+        Load data given a key as a read-only memoryview. Uncompressed data
+        is a view of the wrapped storage, so it is not copied.
+        Args:
+            key (str): The key the data is saved under.
+        Returns:
+            memoryview: Read-only view of the decompressed data.
+        """
+        view = self._storage.load_view(key)
+        codec = self._read_header(view)
+        if codec is None:
+            return view
+        if codec == "none":
+            return view[len(self.MAGIC) + 1:]
+        view.release()
+        return memoryview(self.load(key))
+
+    def load_stream(self, key: str, chunk_size: int = CHUNK_SIZE
+                    ) -> Iterator[bytes]:
+        """
+        Load and decompress data given a key chunk by chunk.
+        Args:
+            key (str): The key the data is saved under.
+            chunk_size (int): The size of the chunks read from the wrapped
+            storage
+        Returns:
+            Iterator[bytes]: The chunks of the decompressed data.
+        """
+        chunks = self._storage.load_stream(key, chunk_size)
+        # Gather enough data to read the header
+        head = b""
+        for chunk in chunks:
+            head += chunk
+            if len(head) > len(self.MAGIC):
+                break
+        codec = self._read_header(memoryview(head))
+        if codec is None:
+            decompressor = _Uncompressed()
+        else:
+            head = head[len(self.MAGIC) + 1:]
+            decompressor = self._decompressor(codec)
+        for chunk in itertools.chain([head], chunks):
+            output = decompressor.decompress(chunk)
+            # Decompressed chunks are larger, so split them up again
+            for start in range(0, len(output), chunk_size):
+                yield output[start:start + chunk_size]
+
+    @contextmanager
+    def lock(self, key: str) -> Iterator[None]:
+        """
+        Hold an exclusive lock on a key of the wrapped storage.
+        Args:
+            key (str): The key to lock.
+        """
+        with self._storage.lock(key):
+            yield
+
+    def delete(self, key: str = "/") -> None:
+        """
+        Delete data given a key.
+        Args:
+            key (str): The key the data is saved under.
+        """
+        self._storage.delete(key)
+
+    def list(self, prefix: str = "/") -> List[str]:
+        """
+        List all keys under a given prefix in the wrapped storage.
+        Args:
+            prefix (str): Prefix to list.
+        Returns:
+            List[str]: The keys under the given prefix.
+        """
+        return self._storage.list(prefix)
+
+    def _compress(self, chunks: Iterator[bytes], codec: str
+                  ) -> Iterator[bytes]:
+        """
+        Private method that compresses chunks and prepends the header.
+        Args:
+            chunks (Iterator[bytes]): The chunks of the data
+            codec (str): The codec to compress with
+        Returns:
+            Iterator[bytes]: The header and the compressed chunks
+        """
+        yield self.MAGIC + bytes([self.CODECS[codec]])
+        compressor = self._compressor(codec)
+        for chunk in chunks:
+            output = compressor.compress(chunk)
+            if output:
+                yield output
+        yield compressor.flush()
+
+    def _compressor(self, codec: str) -> "_Uncompressed":
+        """
+        Private method that creates an incremental compressor.
+        Args:
+            codec (str): The codec to compress with
+        Returns:
+            _Uncompressed: An object with compress and flush methods, like
+            the compressor objects of the codec modules
+        """
+        if codec == "zlib":
+            return zlib.compressobj(
+                self._level if self._level is not None else -1)
+        if codec == "bz2":
+            return bz2.BZ2Compressor(
+                self._level if self._level is not None else 9)
+        if codec == "lzma":
+            return lzma.LZMACompressor(preset=self._level)
+        return _Uncompressed()
+
+    @staticmethod
+    def _decompressor(codec: str) -> "_Uncompressed":
+        """
+        Private method that creates an incremental decompressor.
+        Args:
+            codec (str): The codec to decompress with
+        Returns:
+            _Uncompressed: An object with a decompress method, like the
+            decompressor objects of the codec modules
+        """
+        if codec == "zlib":
+            return zlib.decompressobj()
+        if codec == "bz2":
+            return bz2.BZ2Decompressor()
+        if codec == "lzma":
+            return lzma.LZMADecompressor()
+        return _Uncompressed()
+
+    def _read_header(self, view: memoryview) -> Union[str, None]:
+        """
+        Private method that reads the codec from the header of stored data.
+        Args:
+            view (memoryview): The stored data
+        Returns:
+            Union[str, None]: The codec, None if the data has no header
+        """
+        size = len(self.MAGIC)
+        if len(view) <= size or view[:size] != self.MAGIC:
+            return None
+        for name, number in self.CODECS.items():
+            if view[size] == number:
+                return name
+        return None
+
+
+class SQLiteStorage(Storage):
+    """
+    Storage class which stores all data in a single SQLite file. The data of
+    a key is stored in chunks and the keys are kept in an indexed table, so
+    looking up and listing keys does not touch the file system.
+    """
+    _SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS blobs ("
+        "key TEXT PRIMARY KEY, size INTEGER NOT NULL, "
+        "chunks INTEGER NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS chunks ("
+        "key TEXT NOT NULL, idx INTEGER NOT NULL, data BLOB NOT NULL, "
+        "PRIMARY KEY (key, idx))",
+    )
+
+    def __init__(self, path: str = "./assets/objects.sqlite",
+                 chunk_size: int = 1 << 20) -> None:
+        """
+        Initialize SQLiteStorage class
+        Args:
+            path (str): The OS path of the SQLite file
+            chunk_size (int): The maximum size in bytes of a stored chunk
+        """
+        self._path = os.path.normpath(path)
+        self._chunk_size = chunk_size
+        directory = os.path.dirname(self._path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._local = threading.local()
+        with self.transaction() as connection:
+            for statement in self._SCHEMA:
+                connection.execute(statement)
+
+    def connection(self) -> sqlite3.Connection:
+        """
+        Get the connection to the SQLite file of the current thread.
+        Returns:
+            sqlite3.Connection: The connection, in autocommit mode
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self._path, isolation_level=None,
+                                         timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+            self._local.depth = 0
+        return connection
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Run statements in a transaction, which is committed when the
+        outermost transaction of the thread ends and rolled back on an
+        exception.
+        Yields:
+            sqlite3.Connection: The connection to run the statements on
+        """
+        connection = self.connection()
+        if self._local.depth == 0:
+            connection.execute("BEGIN IMMEDIATE")
+        self._local.depth += 1
+        try:
+            yield connection
+        except BaseException:
+            self._local.depth -= 1
+            if self._local.depth == 0:
+                connection.execute("ROLLBACK")
+            raise
+        self._local.depth -= 1
+        if self._local.depth == 0:
+            connection.execute("COMMIT")
+
+    def save(self, data: bytes, key: str) -> None:
+        """
+        Save data given a key, replacing the data saved under the key.
+        Args:
+            data (bytes): The data to save
+            key (str): The key to save the data under.
+        """
+        self.save_stream([data], key)
+
+    def save_stream(self, stream: Stream, key: str) -> None:
+        """
+        Save streamed data given a key, inserting it chunk by chunk in one
+        transaction.
+        Args:
+            stream (Stream): A binary file object or an iterable of chunks
+            key (str): The key to save the data under.
+        """
+        key = self._normalize(key)
+        with self.transaction() as connection:
+            connection.execute("DELETE FROM chunks WHERE key = ?", (key,))
+            connection.execute("DELETE FROM blobs WHERE key = ?", (key,))
+            connection.execute(
+                "INSERT INTO blobs (key, size, chunks) VALUES (?, 0, 0)",
+                (key,))
+            for chunk in iter_chunks(stream, self._chunk_size):
+                self._insert_chunks(connection, key, chunk)
+
+    def append(self, data: bytes, key: str) -> None:
+        """
+        Append data to the data of a key by adding chunks.
+        Args:
+            data (bytes): The data to append
+            key (str): The key to append the data to.
+        """
+        key = self._normalize(key)
+        with self.transaction() as connection:
+            connection.execute(
+                "INSERT OR IGNORE INTO blobs (key, size, chunks) "
+                "VALUES (?, 0, 0)", (key,))
+            self._insert_chunks(connection, key, data)
+
+    def save_many(self, data: Sequence[bytes], keys: Sequence[str],
+                  max_workers: int = MAX_WORKERS) -> List[Exception]:
+        """
+        Save data under many keys in one transaction. Writes to the SQLite
+        file cannot run in parallel, so no threads are used.
+        Args:
+            data (Sequence[bytes]): The data to save under each key
+            keys (Sequence[str]): The keys to save the data under
+            max_workers (int): Ignored
+        Returns:
+            List[Exception]: For every key the exception raised while saving
+            its data, None if it was saved
+        """
+        with self.transaction():
+            return map_threads(lambda item: self.save(*item),
+                               list(zip(data, keys)), max_workers=1)
+
+    def load(self, key: str) -> bytes:
+        """
+        Load data given a key.
+        Args:
+            key (str): The key the data is saved under.
+        Returns:
+            bytes: The data that is loaded.
+        """
+        key = self._normalize(key)
+        self._assert_key_exists(key)
+        rows = self.connection().execute(
+            "SELECT data FROM chunks WHERE key = ? ORDER BY idx", (key,))
+        return b"".join(row[0] for row in rows)
+
+    def load_stream(self, key: str, chunk_size: int = CHUNK_SIZE
+                    ) -> Iterator[bytes]:
+        """
+        Load data given a key chunk by chunk, fetching one stored chunk at a
+        time.
+        Args:
+            key (str): The key the data is saved under.
+            chunk_size (int): The maximum size of the chunks
+        Returns:
+            Iterator[bytes]: The chunks of the data.
+        """
+        key = self._normalize(key)
+        self._assert_key_exists(key)
+        # A separate connection keeps the cursor valid while the caller
+        # uses the storage between chunks
+        connection = sqlite3.connect(self._path, timeout=30)
+        try:
+            rows = connection.execute(
+                "SELECT data FROM chunks WHERE key = ? ORDER BY idx", (key,))
+            for row in rows:
+                for start in range(0, len(row[0]), chunk_size):
+                    yield row[0][start:start + chunk_size]
+        finally:
+            connection.close()
+
+    @contextmanager
+    def lock(self, key: str) -> Iterator[None]:
+        """
+        Hold an exclusive lock on the database file, by running a
+        transaction. Other processes cannot write until it ends.
+        Args:
+            key (str): The key to lock, the whole database is locked.
+        """
+        with self.transaction():
+            yield
+
+    def delete(self, key: str = "/") -> None:
+        """
+        Delete data given a key.
+        Args:
+            key (str): The key the data is saved under.
+        """
+        key = self._normalize(key)
+        with self.transaction() as connection:
+            self._assert_key_exists(key)
+            connection.execute("DELETE FROM chunks WHERE key = ?", (key,))
+            connection.execute("DELETE FROM blobs WHERE key = ?", (key,))
+
+    def list(self, prefix: str = "/") -> List[str]:
+        """
+        List all keys under a given prefix, using the index on the keys.
+        Args:
+            prefix (str): Prefix to list.
+        Returns:
+            List[str]: The keys under the given prefix.
+        """
+        prefix = self._normalize(prefix)
+        if not prefix:
+            rows = self.connection().execute(
+                "SELECT key FROM blobs ORDER BY key")
+            return [row[0] for row in rows]
+        # All keys in the directory prefix sort between prefix/ and prefix0
+        rows = self.connection().execute(
+            "SELECT key FROM blobs WHERE key = ? OR (key >= ? AND key < ?) "
+            "ORDER BY key",
+            (prefix, prefix + os.sep, prefix + chr(ord(os.sep) + 1)))
+        keys = [row[0] for row in rows]
+        if not keys:
+            raise NotFoundError(prefix)
+        return keys
+
+    def _insert_chunks(self, connection: sqlite3.Connection, key: str,
+                       data: bytes) -> None:
+        """
+        Private method that stores data as chunks after the existing chunks
+        of a key.
+        Args:
+            connection (sqlite3.Connection): The connection in a transaction
+            key (str): The normalized key.
+            data (bytes): The data to store.
+        """
+        size, chunks = connection.execute(
+            "SELECT size, chunks FROM blobs WHERE key = ?", (key,)).fetchone()
+        view = memoryview(data)
+        for start in range(0, len(data), self._chunk_size):
+            connection.execute(
+                "INSERT INTO chunks (key, idx, data) VALUES (?, ?, ?)",
+                (key, chunks, view[start:start + self._chunk_size]))
+            chunks += 1
+        connection.execute(
+            "UPDATE blobs SET size = ?, chunks = ? WHERE key = ?",
+            (size + len(data), chunks, key))
+
+    def _assert_key_exists(self, key: str) -> None:
+        """
+        Private method to look whether data is saved under a key
+        Args:
+            key (str): The normalized key.
+        Raises:
+            NotFoundError
+        """
+        row = self.connection().execute(
+            "SELECT 1 FROM blobs WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            raise NotFoundError(key)
+
+    @staticmethod
+    def _normalize(key: str) -> str:
+        """
+        Private method that normalizes a key like a relative OS path.
+        Args:
+            key (str): The key.
+        Returns:
+            str: The normalized key, empty for the root.
+        """
+        key = os.path.normpath(key).strip(os.sep)
+        return "" if key == "." else key
+
+
+class AsyncStorage():
+    """
+    Asynchronous interface to a storage. Every call runs in a thread pool,
+    so the event loop is not blocked while waiting for the storage, and at
+    most max_concurrency calls run at once.
+
+    Example:
+        storage = AsyncStorage(LocalStorage())
+        data = await asyncio.gather(*(storage.load(key) for key in keys))
+    """
+    def __init__(self, storage: Storage,
+                 max_concurrency: int = MAX_WORKERS) -> None:
+        """
+        Initialize AsyncStorage class
+        Args:
+            storage (Storage): The storage to call
+            max_concurrency (int): The maximum number of calls at once
+        """
+        self._storage = storage
+        self._max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_concurrency)
+        # asyncio primitives can only be used by one event loop, so every
+        # loop gets its own semaphore
+        self._semaphores: MutableMapping[
+            asyncio.AbstractEventLoop, asyncio.Semaphore
+        ] = weakref.WeakKeyDictionary()
+
+    @property
+    def storage(self) -> Storage:
+        """
+        Getter method for the storage that is called.
+        Returns:
+            Storage: The synchronous storage
+        """
+        return self._storage
+
+    async def run(self, function: Callable, *args: object) -> object:
+        """
+        Run a blocking function in the thread pool, waiting while
+        max_concurrency calls are running.
+        Args:
+            function (Callable): The function to run
+            *args (object): The arguments of the function
+        Returns:
+            object: The result of the function
+        """
+        loop = asyncio.get_running_loop()
+        if loop not in self._semaphores:
+            self._semaphores[loop] = asyncio.Semaphore(self._max_concurrency)
+        async with self._semaphores[loop]:
+            return await loop.run_in_executor(self._executor,
+                                              partial(function, *args))
+
+    async def save(self, data: bytes, key: str) -> None:
+        """
+        Save data given a key.
+        Args:
+            data (bytes): The data to save
+            key (str): The key to save the data under.
+        """
+        await self.run(self._storage.save, data, key)
+
+    async def load(self, key: str) -> bytes:
+        """
+        Load data given a key.
+        Args:
+            key (str): The key the data is saved under.
+        Returns:
+            bytes: The data that is loaded.
+        """
+        return await self.run(self._storage.load, key)
+
+    async def load_many(self, keys: Sequence[str]
+                        ) -> List[Union[bytes, Exception]]:
+        """
+        Load the data of many keys concurrently.
+        Args:
+            keys (Sequence[str]): The keys to load data from
+        Returns:
+            List[Union[bytes, Exception]]: For every key its data, or the
+            exception raised while loading it
+        """
+        return await asyncio.gather(*(self.load(key) for key in keys),
+                                    return_exceptions=True)
+
+    async def delete(self, key: str) -> None:
+        """
+        Delete data given a key.
+        Args:
+            key (str): The key the data is saved under.
+        """
+        await self.run(self._storage.delete, key)
+
+    async def list(self, prefix: str = "/") -> List[str]:
+        """
+        List all keys under a given prefix.
+        Args:
+            prefix (str): Prefix to list.
+        Returns:
+            List[str]: The keys under the given prefix.
+        """
+        return await self.run(self._storage.list, prefix)
@@ -1,27 +1,124 @@
 from autoop.core.ml.dataset import Dataset
 from autoop.core.ml.feature import Feature
 
+import numpy as np
 import pandas as pd
 from typing import List
 
+# Integer columns with at most this many distinct values are categorical
+# when the types are detected from a sample
+MAX_CATEGORIES = 20
 
-def detect_feature_types(dataset: Dataset) -> List[Feature]:
+
+def detect_feature_types(dataset: Dataset,
+                         sample_size: int = None) -> List[Feature]:
     """Assumption: only categorical and numerical features and no NaN values.
+    The types are taken from the dtypes in the profile of the dataset, so a
+    registered dataset is not read, and the features get the distinct count
+    of the profile as their cardinality.
+
+    With a sample size the types are detected from a random sample of the
+    rows instead, and integer columns with at most MAX_CATEGORIES distinct
+    values, such as ratings or codes, are categorical. The features then
+    get the estimated number of distinct values in the dataset and the
+    confidence of their type, see _type_confidence.
 
     Args:
         dataset: Dataset
+        sample_size: The number of rows to sample, None to use the profile.
     Returns:
         List[Feature]: List of features with their types.
     """
-    data_frame: pd.DataFrame = dataset.read()
     feature_types_list: List[Feature] = []
 
-    for col in data_frame.head(0).columns:
-        if data_frame[col].dtype in ['int64', 'float64']:
-            feature_types_list.append(Feature("numerical",
-                                              data_frame[col].name))
+    if sample_size is not None:
+        sample = dataset.sample(sample_size)
+        for position in range(sample.shape[1]):
+            column = sample.iloc[:, position]
+            cardinality = _estimate_cardinality(column, sample.attrs["rows"])
+            if _is_integral(column):
+                numerical = cardinality > MAX_CATEGORIES
+            else:
+                numerical = column.dtype == "float64"
+            feature_types_list.append(Feature(
+                "numerical" if numerical else "categorical",
+                str(sample.columns[position]), cardinality,
+                _type_confidence(column, cardinality,
+                                 sample.attrs["rows"])))
+        return feature_types_list
+
+    for name, column in dataset.profile["columns"].items():
+        if column["dtype"] in ['int64', 'float64']:
+            feature_types_list.append(Feature("numerical", name,
+                                              column.get("distinct")))
         else:
-            feature_types_list.append(Feature("categorical",
-                                              data_frame[col].name))
+            feature_types_list.append(Feature("categorical", name,
+                                              column.get("distinct")))
 
     return feature_types_list
+
+
+def _is_integral(column: pd.Series) -> bool:
+    """
+    Private function that checks whether a column holds integers, also when
+    missing values turned it into floats.
+
+    Args:
+        column (pd.Series): The sampled values of the column.
+    Returns:
+        bool: Whether the column is int64, or float64 with integer values.
+    """
+    if column.dtype == "int64":
+        return True
+    if column.dtype != "float64":
+        return False
+    values = column.dropna().to_numpy()
+    return bool(np.all(values == np.floor(values)))
+
+
+def _estimate_cardinality(column: pd.Series, rows: int) -> int:
+    """
+    Private function that estimates the number of distinct values of a
+    column from a sample, with the Chao1 estimator: the values not seen in
+    the sample are estimated from the number of values seen once and twice.
+
+    Args:
+        column (pd.Series): The sampled values of the column.
+        rows (int): The number of rows of the dataset.
+    Returns:
+        int: The estimated number of distinct values.
+    """
+    counts = column.value_counts(dropna=True).to_numpy()
+    if len(column) >= rows:
+        return len(counts)
+    once = int(np.sum(counts == 1))
+    twice = int(np.sum(counts == 2))
+    if twice:
+        unseen = once * once / (2 * twice)
+    else:
+        unseen = once * (once - 1) / 2
+    return int(round(min(len(counts) + unseen, rows)))
+
+
+def _type_confidence(column: pd.Series, cardinality: int,
+                     rows: int) -> float:
+    """
+    Private function that gives how certain the type detected from a sample
+    is. The type is certain if it follows from the dtype, if the sample
+    holds all rows or if it holds more than MAX_CATEGORIES distinct values.
+    Else it follows from the estimated cardinality, and the confidence is
+    the margin of the estimate from MAX_CATEGORIES, relative to
+    MAX_CATEGORIES.
+
+    Args:
+        column (pd.Series): The sampled values of the column.
+        cardinality (int): The estimated number of distinct values.
+        rows (int): The number of rows of the dataset.
+    Returns:
+        float: The confidence, from 0 to 1.
+    """
+    if not _is_integral(column) or len(column) >= rows:
+        return 1.0
+    if column.nunique() > MAX_CATEGORIES:
+        return 1.0
+    return min(abs(cardinality - MAX_CATEGORIES) / MAX_CATEGORIES, 1.0)
@@ -3,38 +3,51 @@ from autoop.core.ml.feature import Feature
 
 from typing import List, Tuple
 import numpy as np
+import pandas as pd
 
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 
 
 def preprocess_features(
-        features: List[Feature], dataset: Dataset
+        features: List[Feature], dataset: Dataset, compact: bool = False
 ) -> List[Tuple[str, np.ndarray, dict]]:
     """
     Preprocess features.
     Args:
         features (List[Feature]): List of features.
         dataset (Dataset): Dataset object.
+        compact (bool): Whether the dataset is read in compact dtypes, see
+        Dataset.read. Numerical features are then scaled in float32.
     Returns:
         List[str, Tuple[np.ndarray, dict]]: List of preprocessed features.
         Each ndarray of shape (N, ...)
     """
     results = []
-    raw = dataset.read()
+    # Only the columns of the features are parsed or loaded
+    raw = dataset.read(
+        columns=list(dict.fromkeys(feature.name for feature in features)),
+        compact=compact)
     for feature in features:
+        column = raw[feature.name]
         if feature.type == "categorical":
             encoder = OneHotEncoder()
-            data = encoder.fit_transform(
-                raw[feature.name].values.reshape(-1, 1)
-            ).toarray()
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                # The codes are ordered like the sorted categories, so they
+                # encode to the same columns without converting the values
+                values = column.cat.codes.to_numpy()
+            else:
+                values = column.to_numpy()
+            data = encoder.fit_transform(values.reshape(-1, 1)).toarray()
             artifact = {"type": "OneHotEncoder",
                         "encoder": encoder.get_params()}
             results.append((feature.name, data, artifact))
         if feature.type == "numerical":
             scaler = StandardScaler()
-            data = scaler.fit_transform(
-                raw[feature.name].values.reshape(-1, 1)
-            )
+            values = column.to_numpy()
+            if values.dtype.itemsize < 8:
+                # Compact columns are scaled in float32, not float64
+                values = values.astype(np.float32)
+            data = scaler.fit_transform(values.reshape(-1, 1))
             artifact = {"type": "StandardScaler",
                         "scaler": scaler.get_params()}
             results.append((feature.name, data, artifact))
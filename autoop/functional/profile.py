@@ -0,0 +1,255 @@
+from autoop.functional.sketch import (
+    HyperLogLog, KLLSketch, TopK, hash_values, sketch_from_dict
+)
+
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+import pandas as pd
+
+# The quantiles stored of numerical columns
+QUANTILES = (0.01, 0.25, 0.5, 0.75, 0.99)
+# The number of most frequent values stored of other columns
+TOP_CATEGORIES = 10
+
+
+class _ColumnProfile():
+    """
+    Statistics of a column, updated batch by batch. Distinct counts,
+    quantiles and frequent values come from sketches, which are stored with
+    the statistics so profiles can be merged.
+    """
+    def __init__(self) -> None:
+        """
+        Initializer method of the _ColumnProfile class.
+        """
+        self._dtype = None
+        self._nulls = 0
+        self._count = 0
+        self._memory = 0
+        self._sum = 0.0
+        self._distinct = HyperLogLog()
+        self._quantiles = KLLSketch(seed=0)
+        self._top = TopK()
+
+    @classmethod
+    def from_dict(cls, column: dict) -> "_ColumnProfile":
+        """
+        Restore the statistics of a column from its profile.
+
+        Args:
+            column (dict): The profile of the column, see result.
+        Returns:
+            _ColumnProfile: The statistics.
+        """
+        profile = cls()
+        profile._dtype = column["dtype"]
+        profile._nulls = column["nulls"]
+        profile._memory = column["memory"]
+        sketches = column["sketches"]
+        profile._distinct = sketch_from_dict(sketches["distinct"])
+        profile._quantiles = sketch_from_dict(sketches["quantiles"])
+        profile._top = sketch_from_dict(sketches["top"])
+        profile._count = profile._quantiles.count + profile._top.total
+        profile._sum = (column.get("mean") or 0.0) * profile._quantiles.count
+        return profile
+
+    def update(self, series: pd.Series) -> None:
+        """
+        Add the values of a batch to the statistics.
+
+        Args:
+            series (pd.Series): The values of the column in the batch.
+        """
+        self._dtype = _merge_dtypes(self._dtype, str(series.dtype))
+        self._nulls += int(series.isna().sum())
+        self._memory += int(series.memory_usage(index=False, deep=True))
+        values = series.dropna()
+        self._count += len(values)
+        if _is_numerical(str(series.dtype)):
+            # Integers and floats of the same value count as one value
+            values = values.astype(np.float64)
+            self._sum += float(values.sum())
+            self._quantiles.update(values.to_numpy())
+        else:
+            self._top.update(values)
+        self._distinct.update_hashes(hash_values(values))
+
+    def merge(self, other: "_ColumnProfile") -> None:
+        """
+        Add the statistics of the same column in other rows.
+
+        Args:
+            other (_ColumnProfile): The statistics of the other rows.
+        """
+        self._dtype = _merge_dtypes(self._dtype, other._dtype)
+        self._nulls += other._nulls
+        self._count += other._count
+        self._memory += other._memory
+        self._sum += other._sum
+        self._distinct.merge(other._distinct)
+        self._quantiles.merge(other._quantiles)
+        self._top.merge(other._top)
+
+    def result(self) -> dict:
+        """
+        Get the statistics of the column.
+
+        Returns:
+            dict: The dtype, null count, memory in bytes and estimated
+            distinct count, at most the number of values, with the min,
+            max, mean and QUANTILES of numerical columns or the most
+            frequent values and their counts of other columns, and the
+            sketches.
+        """
+        profile = {"dtype": self._dtype, "nulls": self._nulls,
+                   "memory": self._memory,
+                   "distinct": min(self._distinct.count(), self._count)}
+        if _is_numerical(self._dtype):
+            count = self._quantiles.count
+            profile["min"], profile["max"] = self._quantiles.quantiles([0, 1])
+            profile["mean"] = self._sum / count if count else None
+            profile["quantiles"] = dict(zip(
+                map(str, QUANTILES), self._quantiles.quantiles(QUANTILES)))
+        else:
+            profile["top"] = [[value, count] for value, count in
+                              self._top.most_common(TOP_CATEGORIES)]
+        profile["sketches"] = {"distinct": self._distinct.to_dict(),
+                               "quantiles": self._quantiles.to_dict(),
+                               "top": self._top.to_dict()}
+        return profile
+
+
+def profile_batches(batches: Iterable[pd.DataFrame]) -> dict:
+    """
+    Compute the profile of a dataset from its batches of rows, so it never
+    has to be in memory at once.
+
+    Args:
+        batches (Iterable[pd.DataFrame]): The batches of the dataset.
+    Returns:
+        dict: The number of rows, the memory in bytes of the dataset as a
+        dataframe and the statistics of every column by name.
+    """
+    rows = 0
+    columns: Dict[str, _ColumnProfile] = {}
+    for batch in batches:
+        rows += len(batch)
+        for position in range(batch.shape[1]):
+            name = str(batch.columns[position])
+            if name not in columns:
+                columns[name] = _ColumnProfile()
+            columns[name].update(batch.iloc[:, position])
+    results = {name: column.result() for name, column in columns.items()}
+    return {"rows": rows,
+            "memory": sum(column["memory"] for column in results.values()),
+            "columns": results}
+
+
+def merge_profiles(first: dict, second: dict) -> dict:
+    """
+    Merge the profiles of two parts of a dataset, e.g. of a dataset and the
+    rows appended to it in a new version, as if the parts were profiled
+    together. A column missing from one part counts as missing values.
+
+    Args:
+        first (dict): The profile of the first rows.
+        second (dict): The profile of the other rows.
+    Returns:
+        dict: The profile of all rows.
+    """
+    columns: Dict[str, _ColumnProfile] = {}
+    for profile, other in ((first, second), (second, first)):
+        for name, column in profile["columns"].items():
+            restored = _ColumnProfile.from_dict(column)
+            if name in columns:
+                columns[name].merge(restored)
+                continue
+            if name not in other["columns"]:
+                restored._nulls += other["rows"]
+            columns[name] = restored
+    results = {name: column.result() for name, column in columns.items()}
+    return {"rows": first["rows"] + second["rows"],
+            "memory": sum(column["memory"] for column in results.values()),
+            "columns": results}
+
+
+def split_sketches(profile: dict) -> Tuple[dict, Dict[str, dict]]:
+    """
+    Split the sketches off the columns of a profile, e.g. to store them
+    apart from the other statistics, which are much smaller.
+
+    Args:
+        profile (dict): The profile of a dataset.
+    Returns:
+        Tuple[dict, Dict[str, dict]]: The profile without the sketches and
+        the sketches of every column by name.
+    """
+    columns = {name: {key: value for key, value in column.items()
+                      if key != "sketches"}
+               for name, column in profile["columns"].items()}
+    sketches = {name: column["sketches"]
+                for name, column in profile["columns"].items()}
+    return {**profile, "columns": columns}, sketches
+
+
+def join_sketches(profile: dict, sketches: Dict[str, dict]) -> dict:
+    """
+    Add the sketches split off with split_sketches back to a profile, so it
+    can be merged.
+
+    Args:
+        profile (dict): The profile without the sketches.
+        sketches (Dict[str, dict]): The sketches of every column by name.
+    Returns:
+        dict: The profile with the sketches.
+    """
+    columns = {name: {**column, "sketches": sketches[name]}
+               for name, column in profile["columns"].items()}
+    return {key: value for key, value in profile.items()
+            if key != "sketches"} | {"columns": columns}
+
+
+def profile_frame(frame: pd.DataFrame) -> dict:
+    """
+    Compute the profile of a dataframe, see profile_batches.
+
+    Args:
+        frame (pd.DataFrame): The dataframe.
+    Returns:
+        dict: The profile of the dataframe.
+    """
+    return profile_batches([frame])
+
+
+def _is_numerical(dtype: str) -> bool:
+    """
+    Check whether a dtype is a numeric NumPy dtype.
+
+    Args:
+        dtype (str): The name of the dtype.
+    Returns:
+        bool: Whether the dtype holds integers or floats.
+    """
+    try:
+        return np.dtype(dtype).kind in "iuf"
+    except TypeError:
+        return False
+
+
+def _merge_dtypes(first: str, second: str) -> str:
+    """
+    Get the dtype a column gets when batches of two dtypes are parsed
+    together.
+
+    Args:
+        first (str): The dtype of the earlier batches, None for no batches.
+        second (str): The dtype of the batch.
+    Returns:
+        str: The common dtype, "object" for dtypes that do not mix.
+    """
+    if first is None or first == second:
+        return second
+    if _is_numerical(first) and _is_numerical(second):
+        return str(np.result_type(first, second))
+    return "object"
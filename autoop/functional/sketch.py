@@ -0,0 +1,710 @@
+from abc import ABC, abstractmethod
+import base64
+from typing import Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+# Values a sketch is updated with
+Values = Union[pd.Series, np.ndarray, Sequence]
+
+
+def hash_values(values: Values) -> np.ndarray:
+    """
+    Hash values to 64 bits, the same way for every batch and process.
+
+    Args:
+        values (Values): The values.
+    Returns:
+        np.ndarray: The uint64 hash of every value.
+    """
+    if not isinstance(values, pd.Series):
+        values = pd.Series(values)
+    return pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+
+class Sketch(ABC):
+    """
+    A sketch is a small summary of a stream of values, updated batch by
+    batch in a single pass. Sketches of the same kind and parameters can be
+    merged, e.g. across the batches of a dataset or across its versions,
+    and converted to and from a JSON serializable dict to store them in the
+    metadata of an artifact.
+    """
+    @abstractmethod
+    def update(self, values: Values) -> None:
+        """
+        Add a batch of values to the sketch. Missing values are skipped.
+        Args:
+            values (Values): The values.
+        """
+        pass
+
+    @abstractmethod
+    def merge(self, other: "Sketch") -> None:
+        """
+        Add the values of another sketch to the sketch.
+        Args:
+            other (Sketch): A sketch of the same kind and parameters.
+        Raises:
+            ValueError: If the sketches can not be merged.
+        """
+        pass
+
+    @abstractmethod
+    def to_dict(self) -> dict:
+        """
+        Convert the sketch to a JSON serializable dict.
+        Returns:
+            dict: The kind of the sketch in "type" and its state.
+        """
+        pass
+
+    @classmethod
+    @abstractmethod
+    def from_dict(cls, data: dict) -> "Sketch":
+        """
+        Create a sketch from the dict of to_dict.
+        Args:
+            data (dict): The converted sketch.
+        Returns:
+            Sketch: The sketch.
+        """
+        pass
+
+    def _check_mergeable(self, other: "Sketch", *attributes: str) -> None:
+        """
+        Private method that checks that another sketch is of the same kind
+        and has the same parameters.
+        Args:
+            other (Sketch): The other sketch.
+            *attributes (str): The names of the parameters.
+        Raises:
+            ValueError: If the sketches differ.
+        """
+        if type(other) is not type(self) or any(
+                getattr(self, name) != getattr(other, name)
+                for name in attributes):
+            raise ValueError(f"Can not merge {other!r} into {self!r}.")
+
+
+class HyperLogLog(Sketch):
+    """
+    HyperLogLog sketch, which estimates the number of distinct values in
+    2 ** precision bytes, with a relative error of about
+    1.04 / sqrt(2 ** precision), 2.3% for the default precision. Small
+    counts are estimated by linear counting and are close to exact.
+    """
+    def __init__(self, precision: int = 11) -> None:
+        """
+        Initialize HyperLogLog class
+        Args:
+            precision (int): The number of bits of the hash that select a
+            register, from 4 to 16
+        """
+        if not 4 <= precision <= 16:
+            raise ValueError("Precision must be from 4 to 16.")
+        self._precision = precision
+        self._registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @property
+    def precision(self) -> int:
+        """
+        Getter method for the precision of the sketch.
+        Returns:
+            int: The number of bits that select a register
+        """
+        return self._precision
+
+    def __repr__(self) -> str:
+        """
+        Returns:
+            str: Representation of the sketch
+        """
+        return f"HyperLogLog(precision={self._precision})"
+
+    def update(self, values: Values) -> None:
+        """
+        Add a batch of values to the sketch. Missing values are skipped.
+        Args:
+            values (Values): The values.
+        """
+        values = pd.Series(values).dropna()
+        self.update_hashes(hash_values(values))
+
+    def update_hashes(self, hashes: np.ndarray) -> None:
+        """
+        Add a batch of hashed values to the sketch.
+        Args:
+            hashes (np.ndarray): The uint64 hashes of the values.
+        """
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        bits = 64 - self._precision
+        registers = (hashes >> np.uint64(bits)).astype(np.int64)
+        rest = hashes & np.uint64((1 << bits) - 1)
+        # The position of the first 1 bit in the rest of the hash
+        ranks = (bits + 1 - _bit_length(rest)).astype(np.uint8)
+        np.maximum.at(self._registers, registers, ranks)
+
+    def count(self) -> int:
+        """
+        Estimate the number of distinct values.
+        Returns:
+            int: The estimated number of distinct values.
+        """
+        size = len(self._registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / np.sum(
+            np.exp2(-self._registers.astype(np.float64)))
+        zeros = int(np.sum(self._registers == 0))
+        if estimate <= 2.5 * size and zeros:
+            estimate = size * np.log(size / zeros)
+        return int(round(estimate))
+
+    def merge(self, other: "HyperLogLog") -> None:
+        """
+        Add the values of another sketch to the sketch.
+        Args:
+            other (HyperLogLog): A sketch with the same precision.
+        Raises:
+            ValueError: If the sketches can not be merged.
+        """
+        self._check_mergeable(other, "precision")
+        np.maximum(self._registers, other._registers, out=self._registers)
+
+    def to_dict(self) -> dict:
+        """
+        Convert the sketch to a JSON serializable dict.
+        Returns:
+            dict: The precision and the registers of the sketch.
+        """
+        return {"type": "hyperloglog", "precision": self._precision,
+                "registers": _encode_array(self._registers)}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "HyperLogLog":
+        """
+        Create a sketch from the dict of to_dict.
+        Args:
+            data (dict): The converted sketch.
+        Returns:
+            HyperLogLog: The sketch.
+        """
+        sketch = cls(data["precision"])
+        sketch._registers = _decode_array(data["registers"], np.uint8)
+        return sketch
+
+
+class KLLSketch(Sketch):
+    """
+    KLL quantile sketch of numbers. Values are kept in levels, where a value
+    at level h stands for 2 ** h values. A full level is sorted and every
+    other value, from a random start, is promoted to the next level. The
+    rank error is about 1.7 / k, with about 3 * k values kept.
+    """
+    def __init__(self, k: int = 200, seed: int = None) -> None:
+        """
+        Initialize KLLSketch class
+        Args:
+            k (int): The size of the highest level, which sets the accuracy
+            seed (int): The seed of the random generator of the compactions
+        """
+        if k < 8:
+            raise ValueError("k must be at least 8.")
+        self._k = k
+        self._levels: List[np.ndarray] = [np.empty(0)]
+        self._count = 0
+        self._min = None
+        self._max = None
+        self._generator = np.random.default_rng(seed)
+
+    @property
+    def k(self) -> int:
+        """
+        Getter method for the accuracy parameter of the sketch.
+        Returns:
+            int: The size of the highest level
+        """
+        return self._k
+
+    @property
+    def count(self) -> int:
+        """
+        Getter method for the number of values added to the sketch.
+        Returns:
+            int: The number of values
+        """
+        return self._count
+
+    def __repr__(self) -> str:
+        """
+        Returns:
+            str: Representation of the sketch
+        """
+        return f"KLLSketch(k={self._k})"
+
+    def update(self, values: Values) -> None:
+        """
+        Add a batch of numbers to the sketch. Missing values are skipped.
+        Args:
+            values (Values): The numbers.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self._count += len(values)
+        low, high = float(values.min()), float(values.max())
+        self._min = low if self._min is None else min(self._min, low)
+        self._max = high if self._max is None else max(self._max, high)
+        self._levels[0] = np.concatenate([self._levels[0], values])
+        self._compress()
+
+    def quantiles(self, fractions: Sequence[float]) -> List[float]:
+        """
+        Estimate quantiles of the numbers.
+        Args:
+            fractions (Sequence[float]): The fractions of the quantiles,
+            from 0 for the minimum to 1 for the maximum.
+        Returns:
+            List[float]: The estimated quantiles, None if the sketch is
+            empty.
+        """
+        if not self._count:
+            return [None for _ in fractions]
+        values = np.concatenate(self._levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** height)
+                                  for height, level in
+                                  enumerate(self._levels)])
+        order = np.argsort(values, kind="stable")
+        values = values[order]
+        cumulative = np.cumsum(weights[order])
+        results = []
+        for fraction in fractions:
+            if fraction <= 0:
+                results.append(self._min)
+            elif fraction >= 1:
+                results.append(self._max)
+            else:
+                position = np.searchsorted(cumulative,
+                                           fraction * cumulative[-1])
+                results.append(float(values[min(position,
+                                                len(values) - 1)]))
+        return results
+
+    def merge(self, other: "KLLSketch") -> None:
+        """
+        Add the numbers of another sketch to the sketch.
+        Args:
+            other (KLLSketch): A sketch with the same k.
+        Raises:
+            ValueError: If the sketches can not be merged.
+        """
+        self._check_mergeable(other, "k")
+        if not other._count:
+            return
+        while len(self._levels) < len(other._levels):
+            self._levels.append(np.empty(0))
+        for height, level in enumerate(other._levels):
+            self._levels[height] = np.concatenate([self._levels[height],
+                                                   level])
+        self._count += other._count
+        self._min = (other._min if self._min is None
+                     else min(self._min, other._min))
+        self._max = (other._max if self._max is None
+                     else max(self._max, other._max))
+        self._compress()
+
+    def to_dict(self) -> dict:
+        """
+        Convert the sketch to a JSON serializable dict.
+        Returns:
+            dict: The k, count, minimum, maximum and levels of the sketch.
+        """
+        return {"type": "kll", "k": self._k, "count": self._count,
+                "min": self._min, "max": self._max,
+                "levels": [_encode_array(level) for level in self._levels]}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "KLLSketch":
+        """
+        Create a sketch from the dict of to_dict.
+        Args:
+            data (dict): The converted sketch.
+        Returns:
+            KLLSketch: The sketch.
+        """
+        sketch = cls(data["k"])
+        sketch._count = data["count"]
+        sketch._min = data["min"]
+        sketch._max = data["max"]
+        sketch._levels = [_decode_array(level, np.float64)
+                          for level in data["levels"]]
+        return sketch
+
+    def _capacity(self, height: int) -> int:
+        """
+        Private method that gives the number of values a level holds before
+        it is compacted, shrinking by 2/3 per level below the highest.
+        Args:
+            height (int): The level.
+        Returns:
+            int: The capacity of the level.
+        """
+        depth = len(self._levels) - 1 - height
+        return max(2, int(np.ceil(self._k * (2 / 3) ** depth)))
+
+    def _compress(self) -> None:
+        """
+        Private method that compacts the levels that are over capacity,
+        from the lowest up.
+        """
+        height = 0
+        while height < len(self._levels):
+            level = self._levels[height]
+            if len(level) > self._capacity(height):
+                if height + 1 == len(self._levels):
+                    self._levels.append(np.empty(0))
+                level = np.sort(level)
+                # With an odd count, the largest value stays at the level
+                kept = level[len(level) - len(level) % 2:]
+                start = int(self._generator.integers(2))
+                promoted = level[start:len(level) - len(kept):2]
+                self._levels[height + 1] = np.concatenate(
+                    [self._levels[height + 1], promoted])
+                self._levels[height] = kept
+            height += 1
+
+
+class CountMinSketch(Sketch):
+    """
+    Count-min sketch, which estimates how often values occur in a table of
+    depth rows of width counters. Every row counts the values in a counter
+    selected by a hash, an estimate is the smallest counter of a value. It
+    never underestimates, and overestimates by at most e / width of the
+    total count with probability 1 - exp(-depth).
+    """
+    def __init__(self, width: int = 2048, depth: int = 4) -> None:
+        """
+        Initialize CountMinSketch class
+        Args:
+            width (int): The number of counters per row
+            depth (int): The number of rows
+        """
+        if width < 1 or depth < 1:
+            raise ValueError("Width and depth must be positive.")
+        self._width = width
+        self._depth = depth
+        self._table = np.zeros((depth, width), dtype=np.int64)
+
+    @property
+    def width(self) -> int:
+        """
+        Getter method for the width of the sketch.
+        Returns:
+            int: The number of counters per row
+        """
+        return self._width
+
+    @property
+    def depth(self) -> int:
+        """
+        Getter method for the depth of the sketch.
+        Returns:
+            int: The number of rows
+        """
+        return self._depth
+
+    @property
+    def total(self) -> int:
+        """
+        Getter method for the number of values added to the sketch.
+        Returns:
+            int: The number of values
+        """
+        return int(self._table[0].sum())
+
+    def __repr__(self) -> str:
+        """
+        Returns:
+            str: Representation of the sketch
+        """
+        return f"CountMinSketch(width={self._width}, depth={self._depth})"
+
+    def update(self, values: Values) -> None:
+        """
+        Add a batch of values to the sketch. Missing values are skipped.
+        Args:
+            values (Values): The values.
+        """
+        hashes = hash_values(pd.Series(values).dropna())
+        for row, counters in enumerate(self._counters(hashes)):
+            self._table[row] += np.bincount(counters, minlength=self._width)
+
+    def estimate(self, values: Values) -> np.ndarray:
+        """
+        Estimate how often values occur.
+        Args:
+            values (Values): The values.
+        Returns:
+            np.ndarray: The estimated count of every value.
+        """
+        hashes = hash_values(values)
+        return np.min([self._table[row][counters] for row, counters in
+                       enumerate(self._counters(hashes))], axis=0)
+
+    def merge(self, other: "CountMinSketch") -> None:
+        """
+        Add the values of another sketch to the sketch.
+        Args:
+            other (CountMinSketch): A sketch with the same width and depth.
+        Raises:
+            ValueError: If the sketches can not be merged.
+        """
+        self._check_mergeable(other, "width", "depth")
+        self._table += other._table
+
+    def to_dict(self) -> dict:
+        """
+        Convert the sketch to a JSON serializable dict.
+        Returns:
+            dict: The width, depth and counters of the sketch.
+        """
+        return {"type": "countmin", "width": self._width,
+                "depth": self._depth, "table": _encode_array(self._table)}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CountMinSketch":
+        """
+        Create a sketch from the dict of to_dict.
+        Args:
+            data (dict): The converted sketch.
+        Returns:
+            CountMinSketch: The sketch.
+        """
+        sketch = cls(data["width"], data["depth"])
+        sketch._table = _decode_array(data["table"], np.int64).reshape(
+            data["depth"], data["width"])
+        return sketch
+
+    def _counters(self, hashes: np.ndarray) -> List[np.ndarray]:
+        """
+        Private method that selects the counter of every hash in every row,
+        from two halves of the hash.
+        Args:
+            hashes (np.ndarray): The uint64 hashes of the values.
+        Returns:
+            List[np.ndarray]: The counters of every row.
+        """
+        low = hashes & np.uint64(0xFFFFFFFF)
+        high = hashes >> np.uint64(32)
+        return [((low + np.uint64(row) * high) % np.uint64(self._width)
+                 ).astype(np.int64) for row in range(self._depth)]
+
+
+class TopK(Sketch):
+    """
+    Misra-Gries heavy hitters sketch, which keeps the counts of at most k
+    values. When more values are counted, the (k + 1)-th largest count is
+    subtracted from all counts and values without a count are dropped. Any
+    value occurring more than total / (k + 1) times is kept, and its count
+    is at most total / (k + 1) too low. Counts are exact while there are
+    no more than k distinct values.
+    """
+    def __init__(self, k: int = 100) -> None:
+        """
+        Initialize TopK class
+        Args:
+            k (int): The maximum number of values counted
+        """
+        if k < 1:
+            raise ValueError("k must be positive.")
+        self._k = k
+        self._counts: Dict[object, int] = {}
+        self._total = 0
+
+    @property
+    def k(self) -> int:
+        """
+        Getter method for the number of values counted.
+        Returns:
+            int: The maximum number of values counted
+        """
+        return self._k
+
+    @property
+    def total(self) -> int:
+        """
+        Getter method for the number of values added to the sketch.
+        Returns:
+            int: The number of values
+        """
+        return self._total
+
+    def __repr__(self) -> str:
+        """
+        Returns:
+            str: Representation of the sketch
+        """
+        return f"TopK(k={self._k})"
+
+    def update(self, values: Values) -> None:
+        """
+        Add a batch of values to the sketch. Missing values are skipped.
+        Args:
+            values (Values): The values.
+        """
+        counts = pd.Series(values).value_counts(dropna=True)
+        self._add({_to_json(value): int(count)
+                   for value, count in counts.items()})
+
+    def most_common(self, n: int = None) -> List[Tuple[object, int]]:
+        """
+        Get the most frequent values.
+        Args:
+            n (int): The number of values, all counted values if None.
+        Returns:
+            List[Tuple[object, int]]: The values and their counts, most
+            frequent first.
+        """
+        ranked = sorted(self._counts.items(), key=lambda item: -item[1])
+        return ranked if n is None else ranked[:n]
+
+    def merge(self, other: "TopK") -> None:
+        """
+        Add the values of another sketch to the sketch.
+        Args:
+            other (TopK): A sketch with the same k.
+        Raises:
+            ValueError: If the sketches can not be merged.
+        """
+        self._check_mergeable(other, "k")
+        self._add(other._counts)
+        # The values other dropped are part of its total, not its counts
+        self._total += other._total - sum(other._counts.values())
+
+    def to_dict(self) -> dict:
+        """
+        Convert the sketch to a JSON serializable dict.
+        Returns:
+            dict: The k, total and counts of the sketch.
+        """
+        return {"type": "topk", "k": self._k, "total": self._total,
+                "counts": [[value, count]
+                           for value, count in self.most_common()]}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TopK":
+        """
+        Create a sketch from the dict of to_dict.
+        Args:
+            data (dict): The converted sketch.
+        Returns:
+            TopK: The sketch.
+        """
+        sketch = cls(data["k"])
+        sketch._counts = {value: count for value, count in data["counts"]}
+        sketch._total = data["total"]
+        return sketch
+
+    def _add(self, counts: Dict[object, int]) -> None:
+        """
+        Private method that adds counts of values and drops the counts over
+        k.
+        Args:
+            counts (Dict[object, int]): The counts of the values.
+        """
+        for value, count in counts.items():
+            self._counts[value] = self._counts.get(value, 0) + count
+            self._total += count
+        if len(self._counts) > self._k:
+            ranked = self.most_common()
+            threshold = ranked[self._k][1]
+            self._counts = {value: count - threshold
+                            for value, count in ranked[:self._k]
+                            if count > threshold}
+
+
+# The sketch classes by the type in their dicts
+SKETCHES = {"hyperloglog": HyperLogLog, "kll": KLLSketch,
+            "countmin": CountMinSketch, "topk": TopK}
+
+
+def sketch_from_dict(data: dict) -> Sketch:
+    """
+    Create a sketch of any kind from the dict of its to_dict.
+
+    Args:
+        data (dict): The converted sketch.
+    Returns:
+        Sketch: The sketch.
+    Raises:
+        ValueError: If the type of the sketch is unknown.
+    """
+    if data.get("type") not in SKETCHES:
+        raise ValueError(f"Unknown sketch type: {data.get('type')}")
+    return SKETCHES[data["type"]].from_dict(data)
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """
+    Get the number of bits of unsigned 64 bit integers, without the leading
+    zeros. The halves are converted to floats, which hold 32 bits exactly.
+
+    Args:
+        values (np.ndarray): The uint64 integers.
+    Returns:
+        np.ndarray: The number of bits of every integer, 0 for 0.
+    """
+    lengths = np.zeros(len(values), dtype=np.int64)
+    for shift in (0, 32):
+        part = (values >> np.uint64(shift)) & np.uint64(0xFFFFFFFF)
+        nonzero = part > 0
+        lengths[nonzero] = shift + 1 + np.floor(
+            np.log2(part[nonzero].astype(np.float64))).astype(np.int64)
+    return lengths
+
+
+def _encode_array(array: np.ndarray) -> str:
+    """
+    Encode an array as base64 text of its little-endian bytes.
+
+    Args:
+        array (np.ndarray): The array.
+    Returns:
+        str: The encoded array.
+    """
+    array = np.ascontiguousarray(array)
+    return base64.b64encode(
+        array.astype(array.dtype.newbyteorder("<")).tobytes()).decode()
+
+
+def _decode_array(text: str, dtype: np.dtype) -> np.ndarray:
+    """
+    Decode an array from the text of _encode_array.
+
+    Args:
+        text (str): The encoded array.
+        dtype (np.dtype): The type of the array.
+    Returns:
+        np.ndarray: A writable copy of the array.
+    """
+    dtype = np.dtype(dtype).newbyteorder("<")
+    return np.frombuffer(base64.b64decode(text), dtype=dtype).astype(
+        dtype.newbyteorder("="))
+
+
+def _to_json(value: object) -> object:
+    """
+    Convert a value to a value JSON can store.
+
+    Args:
+        value (object): The value.
+    Returns:
+        object: The value as a Python bool, int, float or str.
+    """
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
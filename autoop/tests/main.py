@@ -1,8 +1,23 @@
 from autoop.tests.test_database import TestDatabase  # noqa: F401
+from autoop.tests.test_database import TestJournalDatabase  # noqa: F401
+from autoop.tests.test_database import TestShardedDatabase  # noqa: F401
+from autoop.tests.test_database import TestConcurrency  # noqa: F401
+from autoop.tests.test_database import TestSQLiteDatabase  # noqa: F401
 from autoop.tests.test_storage import TestStorage  # noqa: F401
+from autoop.tests.test_storage import TestSQLiteStorage  # noqa: F401
+from autoop.tests.test_storage import TestCachingStorage  # noqa: F401
+from autoop.tests.test_storage import TestCompressedStorage  # noqa: F401
+from autoop.tests.test_storage import TestShardedStorage  # noqa: F401
+from autoop.tests.test_storage import TestAsyncStorage  # noqa: F401
 from autoop.tests.test_features import TestFeatures  # noqa: F401
 from autoop.tests.test_pipeline import TestPipeline  # noqa: F401
 from autoop.tests.test_metric import TestMetric  # noqa: F401
+from autoop.tests.test_registry import TestRegistry  # noqa: F401
+from autoop.tests.test_registry import TestAsyncRegistry  # noqa: F401
+from autoop.tests.test_artifact import TestArtifact  # noqa: F401
+from autoop.tests.test_dataset import TestDataset  # noqa: F401
+from autoop.tests.test_profile import TestProfile  # noqa: F401
+from autoop.tests.test_sketch import TestSketch  # noqa: F401
 
 import unittest
 
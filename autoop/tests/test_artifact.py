@@ -0,0 +1,86 @@
+from autoop.core.ml.artifact import Artifact
+from autoop.core.ml.dataset import Dataset
+from autoop.core.storage import LocalStorage
+
+import tempfile
+import unittest
+
+
+class CountingStorage(LocalStorage):
+    """
+    LocalStorage that counts how often data is loaded.
+    """
+    loads = 0
+
+    def load(self, key: str) -> bytes:
+        """
+        Counts the load and loads the data.
+        """
+        self.loads += 1
+        return super().load(key)
+
+
+class TestArtifact(unittest.TestCase):
+    """
+    Class that is used for unit testing the Artifact class.
+    """
+    def setUp(self) -> None:
+        """
+        Method that is ran before the tests begin.
+        """
+        self.storage = CountingStorage(tempfile.mkdtemp())
+        self.storage.save(b"a,b\n1,2\n", "data.csv")
+
+    def test_from_storage(self) -> None:
+        """
+        Tests that the data is only fetched on the first read.
+        """
+        artifact = Artifact.from_storage(self.storage, "data.csv",
+                                         name="data")
+        self.assertEqual(artifact.asset_path, "data.csv")
+        self.assertEqual(self.storage.loads, 0)
+        self.assertEqual(artifact.read(), b"a,b\n1,2\n")
+        self.assertEqual(artifact.data, b"a,b\n1,2\n")
+        self.assertEqual(self.storage.loads, 1)
+
+    def test_release(self) -> None:
+        """
+        Tests that released or not kept data is fetched again.
+        """
+        artifact = Artifact.from_storage(self.storage, "data.csv",
+                                         name="data", keep_data=False)
+        artifact.read()
+        self.assertFalse(artifact.is_loaded)
+        artifact.read()
+        self.assertEqual(self.storage.loads, 2)
+        kept = Artifact.from_storage(self.storage, "data.csv", name="data")
+        kept.read()
+        kept.release()
+        self.assertFalse(kept.is_loaded)
+        self.assertEqual(kept.read(), b"a,b\n1,2\n")
+
+    def test_immutable(self) -> None:
+        """
+        Tests that the data of a storage backed artifact can not be set.
+        """
+        dataset = Dataset.from_storage(self.storage, "data.csv", name="data")
+        self.assertEqual(dataset.type, "dataset")
+        with self.assertRaises(AttributeError):
+            dataset.data = b"other"
+        with self.assertRaises(ValueError):
+            Artifact(name="data", data=b"", loader=lambda: b"")
+        self.assertEqual(dataset.read()["b"].tolist(), [2])
+
+    def test_stream(self) -> None:
+        """
+        Tests that streaming a storage backed artifact does not load it.
+        """
+        artifact = Artifact.from_storage(self.storage, "data.csv",
+                                         name="data")
+        chunks = list(artifact.stream(chunk_size=3))
+        self.assertEqual(b"".join(chunks), b"a,b\n1,2\n")
+        self.assertEqual(self.storage.loads, 0)
+        self.assertFalse(artifact.is_loaded)
+        in_memory = Artifact(name="data", data=b"abcde")
+        self.assertEqual([bytes(chunk) for chunk in in_memory.stream(2)],
+                         [b"ab", b"cd", b"e"])
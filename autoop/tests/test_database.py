@@ -1,11 +1,40 @@
-from autoop.core.database import Database
-from autoop.core.storage import LocalStorage
+from autoop.core.database import (
+    ConflictError,
+    Database,
+    JournalDatabase,
+    SQLiteDatabase
+)
+from autoop.core.storage import LocalStorage, ShardedStorage, SQLiteStorage
 
+import multiprocessing
+import os
 import random
 import tempfile
 import unittest
 
 
+def _create_database(kind: str, path: str) -> Database:
+    """
+    Creates a database of a kind on a directory, in any process.
+    """
+    if kind == "journal":
+        return JournalDatabase(LocalStorage(path), compact_every=7)
+    if kind == "sqlite":
+        return SQLiteDatabase(SQLiteStorage(os.path.join(path, "db.sqlite")))
+    return Database(LocalStorage(path))
+
+
+def _increment(kind: str, path: str, times: int) -> None:
+    """
+    Increments a counter in the database in batches.
+    """
+    db = _create_database(kind, path)
+    for _ in range(times):
+        with db.batch():
+            counter = db.get("counters", "a") or {"value": 0}
+            db.set("counters", "a", {"value": counter["value"] + 1})
+
+
 class TestDatabase(unittest.TestCase):
     """
     Class that is used for unit testing the Database class.
@@ -17,6 +46,12 @@ class TestDatabase(unittest.TestCase):
         self.storage = LocalStorage(tempfile.mkdtemp())
         self.db = Database(self.storage)
 
+    def _new_database(self) -> Database:
+        """
+        Creates another database on the same storage.
+        """
+        return Database(self.storage)
+
     def test_init(self) -> None:
         """
         Tests whether the database class gets initialized properly
@@ -51,7 +86,7 @@ class TestDatabase(unittest.TestCase):
         id = str(random.randint(0, 100))
         value = {"key": random.randint(0, 100)}
         self.db.set("collection", id, value)
-        other_db = Database(self.storage)
+        other_db = self._new_database()
         self.assertEqual(other_db.get("collection", id)["key"], value["key"])
 
     def test_refresh(self) -> None:
@@ -60,7 +95,7 @@ class TestDatabase(unittest.TestCase):
         """
         key = str(random.randint(0, 100))
         value = {"key": random.randint(0, 100)}
-        other_db = Database(self.storage)
+        other_db = self._new_database()
         self.db.set("collection", key, value)
         other_db.refresh()
         self.assertEqual(other_db.get("collection", key)["key"], value["key"])
@@ -74,3 +109,225 @@ class TestDatabase(unittest.TestCase):
         self.db.set("collection", key, value)
         # collection should now contain the key
         self.assertIn((key, value), self.db.list("collection"))
+
+    def test_persist_only_changes(self) -> None:
+        """
+        Tests that only the changed entries are written to storage.
+        """
+        for id in range(10):
+            self.db.set("collection", str(id), {"key": id})
+        saved = []
+        save = self.storage.save
+        self.storage.save = lambda data, key: saved.append(key) or save(
+            data, key)
+        self.db.set("collection", "3", {"key": 30})
+        self.assertEqual(saved, [f"collection{os.sep}3", ".manifest"])
+
+    def test_batch(self) -> None:
+        """
+        Tests that a batch persists once and rolls back on an exception.
+        """
+        with self.db.batch():
+            self.db.set("collection", "a", {"key": 1})
+            self.db.set("collection", "b", {"key": 2})
+            self.db.delete("collection", "a")
+            self.assertIsNone(self._new_database().get("collection", "b"))
+        other_db = self._new_database()
+        self.assertIsNone(other_db.get("collection", "a"))
+        self.assertEqual(other_db.get("collection", "b")["key"], 2)
+        with self.assertRaises(RuntimeError):
+            with self.db.batch():
+                self.db.set("collection", "c", {"key": 3})
+                raise RuntimeError("failure")
+        self.assertIsNone(self.db.get("collection", "c"))
+        self.assertIsNone(self._new_database().get("collection", "c"))
+
+    def test_refresh_changes_only(self) -> None:
+        """
+        Tests that refresh only loads the entries that were changed.
+        """
+        for id in range(10):
+            self.db.set("collection", str(id), {"key": id})
+        other_db = self._new_database()
+        loaded = []
+        load = self.storage.load
+        self.storage.load = lambda key: loaded.append(key) or load(key)
+        other_db.refresh()
+        self.assertLessEqual(len(loaded), 1)
+        self.db.set("collection", "3", {"key": 30})
+        self.db.delete("collection", "4")
+        loaded.clear()
+        other_db.refresh()
+        self.assertEqual(other_db.get("collection", "3")["key"], 30)
+        self.assertIsNone(other_db.get("collection", "4"))
+        self.assertEqual(len(other_db.list("collection")), 9)
+        self.assertLessEqual(len(loaded), 4)
+
+    def test_query(self) -> None:
+        """
+        Tests querying with and without indexes.
+        """
+        self.db.set("collection", "a", {"type": "dataset", "name": "iris",
+                                        "tags": ["flowers"]})
+        self.db.set("collection", "b", {"type": "dataset", "name": "car",
+                                        "tags": []})
+        self.db.set("collection", "c", {"type": "pipeline", "name": "iris",
+                                        "tags": ["flowers"]})
+        self.db.create_index("collection", "type")
+        self.db.create_index("collection", "tags")
+        self.db.create_index("collection", "name")
+        for indexed in (True, False):
+            ids = [id for id, entry in self.db.query(
+                "collection", equal={"type": "dataset"})]
+            self.assertEqual(ids, ["a", "b"])
+            ids = [id for id, entry in self.db.query(
+                "collection", contains={"tags": "flowers"},
+                prefix={"name": "ir"})]
+            self.assertEqual(ids, ["a", "c"])
+            self.db = self._new_database()
+        self.db.create_index("collection", "type")
+        self.db.delete("collection", "b")
+        self.db.set("collection", "a", {"type": "model"})
+        ids = [id for id, entry in self.db.query(
+            "collection", equal={"type": "dataset"})]
+        self.assertEqual(ids, [])
+
+    def test_revision(self) -> None:
+        """
+        Tests that changes based on an old revision are rejected.
+        """
+        self.assertEqual(self.db.revision("collection", "a"), 0)
+        self.db.set("collection", "a", {"key": 1}, revision=0)
+        other_db = self._new_database()
+        self.assertEqual(other_db.revision("collection", "a"), 1)
+        other_db.set("collection", "a", {"key": 2}, revision=1)
+        with self.assertRaises(ConflictError):
+            self.db.set("collection", "a", {"key": 3}, revision=1)
+        self.assertEqual(self.db.get("collection", "a"), {"key": 2})
+        with self.assertRaises(ConflictError):
+            self.db.delete("collection", "a", revision=1)
+        self.db.delete("collection", "a", revision=2)
+        self.assertIsNone(self._new_database().get("collection", "a"))
+
+
+class TestShardedDatabase(TestDatabase):
+    """
+    Class that runs the database tests on a ShardedStorage.
+    """
+    def setUp(self) -> None:
+        """
+        Method that is ran before the tests begin.
+        """
+        self.storage = ShardedStorage(tempfile.mkdtemp())
+        self.db = Database(self.storage)
+
+
+class TestJournalDatabase(TestDatabase):
+    """
+    Class that runs the database tests against the JournalDatabase class.
+    """
+    def setUp(self) -> None:
+        """
+        Method that is ran before the tests begin.
+        """
+        self.storage = LocalStorage(tempfile.mkdtemp())
+        self.db = JournalDatabase(self.storage, compact_every=5)
+
+    def _new_database(self) -> Database:
+        """
+        Creates another database on the same storage.
+        """
+        return JournalDatabase(self.storage, compact_every=5)
+
+    def test_persist_only_changes(self) -> None:
+        """
+        Tests that changes are appended to the journal.
+        """
+        self.db.set("collection", "a", {"key": 1})
+        self.db.set("collection", "b", {"key": 2})
+        self.assertEqual(self.storage.list(""), ["journal"])
+        self.assertEqual(len(self.storage.load("journal").splitlines()), 2)
+
+    def test_compact(self) -> None:
+        """
+        Tests that the journal is compacted into a snapshot.
+        """
+        for id in range(6):
+            self.db.set("collection", str(id), {"key": id})
+        self.db.delete("collection", "0")
+        self.assertEqual(len(self.storage.load("journal").splitlines()), 2)
+        other_db = self._new_database()
+        self.assertEqual(len(other_db.list("collection")), 5)
+        self.assertIsNone(other_db.get("collection", "0"))
+
+    def test_incomplete_journal(self) -> None:
+        """
+        Tests that an interrupted append to the journal is ignored.
+        """
+        self.db.set("collection", "a", {"key": 1})
+        self.storage.append(b'{"op": "set", "coll', "journal")
+        self.assertEqual(self._new_database().get("collection", "a")["key"],
+                         1)
+
+    def test_append_after_incomplete_journal(self) -> None:
+        """
+        Tests that changes appended after an interrupted append are kept.
+        """
+        self.db.set("collection", "a", {"key": 1})
+        self.storage.append(b'{"op": "set", "coll', "journal")
+        database = self._new_database()
+        database.set("collection", "b", {"key": 2})
+        reloaded = self._new_database()
+        self.assertEqual(reloaded.get("collection", "a")["key"], 1)
+        self.assertEqual(reloaded.get("collection", "b")["key"], 2)
+
+
+class TestSQLiteDatabase(TestDatabase):
+    """
+    Class that runs the database tests against the SQLiteDatabase class.
+    """
+    def setUp(self) -> None:
+        """
+        Method that is ran before the tests begin.
+        """
+        self.storage = SQLiteStorage(
+            os.path.join(tempfile.mkdtemp(), "dbo.sqlite"))
+        self.db = SQLiteDatabase(self.storage)
+
+    def _new_database(self) -> Database:
+        """
+        Creates another database on the same storage.
+        """
+        return SQLiteDatabase(self.storage)
+
+    def test_persist_only_changes(self) -> None:
+        """
+        Tests that changes are written to the entries table, not as keys.
+        """
+        self.db.set("collection", "a", {"key": 1})
+        self.assertEqual(self.storage.list(""), [])
+        rows = self.storage.connection().execute(
+            "SELECT collection, id FROM entries").fetchall()
+        self.assertEqual(rows, [("collection", "a")])
+
+
+class TestConcurrency(unittest.TestCase):
+    """
+    Class that tests databases shared by several processes.
+    """
+    def test_batches(self) -> None:
+        """
+        Tests that batches of several processes do not lose changes.
+        """
+        context = multiprocessing.get_context("spawn")
+        for kind in ("local", "journal", "sqlite"):
+            path = tempfile.mkdtemp()
+            processes = [context.Process(target=_increment,
+                                         args=(kind, path, 10))
+                         for _ in range(3)]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+            db = _create_database(kind, path)
+            self.assertEqual(db.get("counters", "a"), {"value": 30})
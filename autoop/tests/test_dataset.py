@@ -0,0 +1,262 @@
+from autoop.core.ml import columnar
+from autoop.core.ml.dataset import Dataset
+from autoop.core.ml.feature import Feature
+from autoop.core.ml.frame_cache import FrameCache
+from autoop.core.storage import LocalStorage
+from autoop.functional.preprocessing import preprocess_features
+
+import io
+import numpy as np
+import os
+import pandas as pd
+import tempfile
+import unittest
+from unittest import mock
+
+
+class TestDataset(unittest.TestCase):
+    """
+    Class that is used for unit testing the Dataset class.
+    """
+    def setUp(self) -> None:
+        """
+        Method that is ran before the tests begin.
+        """
+        self.frame = pd.DataFrame({
+            "int": [1, 2, 3],
+            "float": [1.5, np.nan, 2.0],
+            "bool": [True, False, True],
+            "str": ["a", None, "a"],
+            "object": pd.Series(["x", "y", np.nan], dtype=object),
+            "nullable": pd.array([1, None, 3], dtype="Int64"),
+            "category": pd.Categorical(["u", "v", "u"]),
+            "date": pd.to_datetime(["2020-01-01", "2021-01-01",
+                                    "2022-01-01"]),
+        })
+
+    def test_columnar(self) -> None:
+        """
+        Tests that columnar datasets keep the types of their columns.
+        """
+        dataset = Dataset.from_dataframe(self.frame, "data", "data",
+                                         format="columnar")
+        self.assertEqual(dataset.format, "columnar")
+        self.assertTrue(columnar.is_columnar(dataset.data))
+        frame = dataset.read()
+        pd.testing.assert_frame_equal(frame, self.frame)
+        frame.loc[0, "int"] = 5
+        self.assertEqual(dataset.read()["int"][0], 1)
+        self.assertEqual(dataset.to_csv(),
+                         self.frame.to_csv(index=False).encode())
+        view = columnar.decode(dataset.data, copy=False)
+        self.assertFalse(view["int"].to_numpy().flags.writeable)
+        with self.assertRaises(TypeError):
+            Dataset.from_dataframe(pd.DataFrame({"a": [1, "b"]}), "mixed",
+                                   "mixed", format="columnar")
+
+    def test_storage(self) -> None:
+        """
+        Tests reading columnar and CSV datasets from a storage.
+        """
+        storage = LocalStorage(tempfile.mkdtemp())
+        for format in Dataset.FORMATS:
+            dataset = Dataset.from_dataframe(self.frame[["int", "str"]],
+                                             "data", "data", format=format)
+            storage.save(dataset.data, format)
+            stored = Dataset.from_storage(storage, format, name="data")
+            pd.testing.assert_frame_equal(stored.read(),
+                                          self.frame[["int", "str"]])
+
+    def test_columns(self) -> None:
+        """
+        Tests reading a selection of the columns in both formats.
+        """
+        for format in Dataset.FORMATS:
+            dataset = Dataset.from_dataframe(self.frame[["int", "str"]],
+                                             "data", "data", format=format)
+            frame = dataset.read(columns=["str", "int"])
+            self.assertEqual(frame.columns.tolist(), ["str", "int"])
+            self.assertEqual(frame["int"].tolist(), [1, 2, 3])
+            with self.assertRaises(ValueError):
+                dataset.read(columns=["missing"])
+
+    def test_cache(self) -> None:
+        """
+        Tests that repeated reads are served from the frame cache and that
+        changing a read frame does not change the cached frame.
+        """
+        cache = FrameCache()
+        with mock.patch.object(Dataset, "frame_cache", cache), \
+                mock.patch("pandas.read_csv", wraps=pd.read_csv) as parse:
+            dataset = Dataset.from_dataframe(self.frame[["int", "str"]],
+                                             "data", "data")
+            frame = dataset.read()
+            frame.loc[0, "int"] = 5
+            self.assertEqual(dataset.read()["int"][0], 1)
+            self.assertEqual(dataset.read(columns=["str"]).shape, (3, 1))
+            copy = Dataset.from_dataframe(self.frame[["int", "str"]],
+                                          "data", "data")
+            copy.read()
+            self.assertEqual(parse.call_count, 1)
+            self.assertEqual(cache.stats["hits"], 3)
+            dataset.read(cache=False)
+            self.assertEqual(parse.call_count, 2)
+            other = Dataset.from_dataframe(self.frame[["int"]], "data",
+                                           "data")
+            self.assertEqual(other.read().columns.tolist(), ["int"])
+            # Columns are cached one by one, so only new columns are parsed
+            columns = Dataset.from_dataframe(self.frame[["int", "str"]],
+                                             "columns", "columns")
+            columns.read(columns=["int"])
+            frame = columns.read(columns=["str", "int"])
+            self.assertEqual(parse.call_args.kwargs["usecols"], ["str"])
+            pd.testing.assert_frame_equal(frame,
+                                          self.frame[["str", "int"]])
+            columns.read(columns=["int", "str"])
+            self.assertEqual(parse.call_count, 5)
+        cache.put("key", self.frame)
+        with mock.patch("autoop.core.ml.frame_cache._copy_on_write",
+                        return_value=False), \
+                mock.patch.object(Dataset, "frame_cache", cache):
+            copy = cache.get("key")
+            self.assertFalse(np.shares_memory(copy["int"].to_numpy(),
+                                              self.frame["int"].to_numpy()))
+            # The first read copies the frame it puts in the cache too
+            cache.clear()
+            frame = dataset.read()
+        cached = cache.get(dataset._cache_key())
+        self.assertFalse(np.shares_memory(frame["int"].to_numpy(),
+                                          cached["int"].to_numpy()))
+        small = FrameCache(max_bytes=1)
+        small.put("key", self.frame)
+        self.assertIsNone(small.get("key"))
+        self.assertEqual(small.stats["entries"], 0)
+
+    def test_unpickle_old_state(self) -> None:
+        """
+        Tests restoring a dataset pickled before it kept a fingerprint,
+        profile and loader.
+        """
+        dataset = Dataset.from_dataframe(self.frame[["int", "str"]], "data",
+                                         "data")
+        state = dataset.__getstate__()
+        for name in ["_fingerprint", "_profile", "_loader", "_keep_data"]:
+            del state[name]
+        restored = Dataset.__new__(Dataset)
+        restored.__setstate__(state)
+        pd.testing.assert_frame_equal(restored.read(), dataset.read())
+        self.assertEqual(restored.profile["rows"], 3)
+        self.assertTrue(restored.is_loaded)
+
+    def test_iter_batches(self) -> None:
+        """
+        Tests reading datasets in batches of rows in both formats.
+        """
+        storage = LocalStorage(tempfile.mkdtemp())
+        frame = pd.concat([self.frame[["int", "str", "object"]]] * 5,
+                          ignore_index=True)
+        for format in Dataset.FORMATS:
+            dataset = Dataset.from_dataframe(frame, "data", "data",
+                                             format=format)
+            storage.save(dataset.data, format)
+            stored = Dataset.from_storage(storage, format, name="data")
+            batches = list(stored.iter_batches(4))
+            self.assertEqual([len(batch) for batch in batches],
+                             [4, 4, 4, 3])
+            pd.testing.assert_frame_equal(pd.concat(batches),
+                                          dataset.read(), check_dtype=False)
+            batches = list(dataset.iter_batches(10, columns=["str", "int"],
+                                                as_numpy=True))
+            self.assertEqual(batches[1].shape, (5, 2))
+            self.assertEqual(batches[1][0, 1], 2)
+            with self.assertRaises(ValueError):
+                list(dataset.iter_batches(0))
+            with self.assertRaises(ValueError):
+                list(dataset.iter_batches(4, columns=["missing"]))
+
+    def test_from_file(self) -> None:
+        """
+        Tests creating datasets from files on disk and file objects.
+        """
+        data = self.frame[["int", "str"]].to_csv(index=False).encode()
+        path = os.path.join(tempfile.mkdtemp(), "data.csv")
+        with open(path, "wb") as file:
+            file.write(data)
+        with mock.patch.object(Dataset, "SAMPLE_SIZE", 8):
+            for file in (path, io.BytesIO(data)):
+                dataset = Dataset.from_file(file, "data", "data")
+                self.assertFalse(dataset.is_loaded)
+                self.assertEqual(dataset.format, "csv")
+                self.assertEqual(b"".join(dataset.stream(4)), data)
+                with dataset.view() as view:
+                    self.assertEqual(bytes(view), data)
+                pd.testing.assert_frame_equal(dataset.read(cache=False),
+                                              self.frame[["int", "str"]])
+        dataset = Dataset.from_file(io.BytesIO(data), "data", "data",
+                                    format="columnar")
+        self.assertTrue(columnar.is_columnar(dataset.data))
+        with self.assertRaises(ValueError):
+            Dataset.from_file(io.BytesIO(b""), "empty", "empty")
+        with self.assertRaises(ValueError):
+            Dataset.from_file(io.BytesIO(b'a,b\n1,2\n"3'), "bad", "bad")
+        # The sample ends in a quoted value with a newline
+        data = b'a,b\n1,"x\ny"\n2,"""z"""\n'
+        with mock.patch.object(Dataset, "SAMPLE_SIZE", 10):
+            dataset = Dataset.from_file(io.BytesIO(data), "quoted", "quoted")
+        self.assertEqual(dataset.read()["b"].tolist(), ["x\ny", '"z"'])
+
+    def test_sample(self) -> None:
+        """
+        Tests taking random samples of the rows in both formats.
+        """
+        frame = pd.DataFrame({"int": np.arange(1000),
+                              "str": [chr(97 + i % 7) for i in range(1000)]})
+        for format in Dataset.FORMATS:
+            dataset = Dataset.from_dataframe(frame, "data", "data",
+                                             format=format)
+            with mock.patch.object(Dataset, "BATCH_SIZE", 64):
+                sample = dataset.sample(100, seed=1)
+            self.assertEqual(sample.attrs["rows"], 1000)
+            self.assertEqual(len(sample), 100)
+            self.assertTrue(sample.index.is_monotonic_increasing)
+            self.assertEqual(sample["int"].tolist(), sample.index.tolist())
+            self.assertEqual(sample["str"].tolist(),
+                             frame["str"][sample.index].tolist())
+            self.assertEqual(dataset.sample(10, columns=["str"]).shape,
+                             (10, 1))
+            self.assertEqual(len(dataset.sample(2000)), 1000)
+
+    def test_compact(self) -> None:
+        """
+        Tests reading datasets in compact dtypes and preprocessing them.
+        """
+        frame = pd.DataFrame({"small": np.arange(100) % 7,
+                              "large": np.arange(100) * 1000,
+                              "float": np.linspace(0, 1, 100),
+                              "city": ["Groningen", "Assen"] * 50,
+                              "id": [f"id{i}" for i in range(100)]})
+        for format in Dataset.FORMATS:
+            dataset = Dataset.from_dataframe(frame, "data", "data",
+                                             format=format)
+            compact = dataset.read(compact=True)
+            self.assertEqual(compact["small"].dtype, "int8")
+            self.assertEqual(compact["large"].dtype, "int32")
+            self.assertEqual(compact["float"].dtype, "float64")
+            self.assertIsInstance(compact["city"].dtype, pd.CategoricalDtype)
+            self.assertNotIsInstance(compact["id"].dtype,
+                                     pd.CategoricalDtype)
+            self.assertGreater(compact.attrs["memory_saved"], 0)
+            pd.testing.assert_frame_equal(compact.astype(dataset.read(
+                cache=False).dtypes.to_dict()), dataset.read(),
+                check_dtype=False)
+            compact = dataset.read(columns=["float"], compact=True,
+                                   allow_float32=True)
+            self.assertEqual(compact["float"].dtype, "float32")
+            self.assertEqual(dataset.read()["small"].dtype, "int64")
+            features = [Feature("categorical", "city"),
+                        Feature("numerical", "small")]
+            expected = preprocess_features(features, dataset)
+            results = preprocess_features(features, dataset, compact=True)
+            for (name, data, _), (_, original, _) in zip(results, expected):
+                np.testing.assert_allclose(data, original, rtol=1e-5)
+            self.assertEqual(results[1][1].dtype, np.float32)
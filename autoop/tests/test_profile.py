@@ -0,0 +1,192 @@
+from app.core.system import ArtifactRegistry
+from autoop.core.database import Database
+from autoop.core.ml.dataset import Dataset
+from autoop.core.storage import LocalStorage
+from autoop.functional.feature import detect_feature_types
+from autoop.functional.profile import (
+    merge_profiles, profile_batches, profile_frame
+)
+
+import json
+import numpy as np
+import pandas as pd
+import tempfile
+import unittest
+from unittest import mock
+
+
+class TestProfile(unittest.TestCase):
+    """
+    Class that is used for unit testing the profiles of datasets.
+    """
+    def setUp(self) -> None:
+        """
+        Method that is ran before the tests begin.
+        """
+        self.frame = pd.DataFrame({
+            "int": [1, 2, 3, 4],
+            "float": [1.5, np.nan, 2.5, 3.5],
+            "str": ["a", "b", "a", None],
+        })
+
+    def test_profile(self) -> None:
+        """
+        Tests the statistics of the columns.
+        """
+        profile = profile_frame(self.frame)
+        self.assertEqual(profile["rows"], 4)
+        self.assertEqual(list(profile["columns"]), ["int", "float", "str"])
+        column = profile["columns"]["int"]
+        self.assertEqual(column["dtype"], "int64")
+        self.assertEqual((column["min"], column["max"], column["mean"]),
+                         (1, 4, 2.5))
+        self.assertEqual(column["distinct"], 4)
+        column = profile["columns"]["float"]
+        self.assertEqual((column["nulls"], column["distinct"]), (1, 3))
+        column = profile["columns"]["str"]
+        self.assertEqual(column["top"], [["a", 2], ["b", 1]])
+        self.assertNotIn("mean", column)
+        self.assertEqual(profile["memory"],
+                         self.frame.memory_usage(index=False,
+                                                 deep=True).sum())
+
+    def test_distinct_at_most_values(self) -> None:
+        """
+        Tests that the estimated distinct count is capped at the number of
+        values, also in merged profiles.
+        """
+        frame = pd.DataFrame({"str": [f"x{i}" for i in range(900)] + [None]})
+        profile = profile_frame(frame)
+        self.assertEqual(profile["columns"]["str"]["distinct"], 900)
+        merged = merge_profiles(profile_frame(frame[:450]),
+                                json.loads(json.dumps(
+                                    profile_frame(frame[450:]))))
+        self.assertLessEqual(merged["columns"]["str"]["distinct"], 900)
+
+    def test_batches(self) -> None:
+        """
+        Tests that batches give the statistics and dtypes of the whole data.
+        """
+        batches = [self.frame.iloc[:1], self.frame.iloc[1:]]
+        profile = profile_batches(batches)
+        self.assertEqual(profile["rows"], 4)
+        self.assertEqual(profile["columns"]["float"]["dtype"], "float64")
+        self.assertEqual(profile["columns"]["int"]["mean"], 2.5)
+        mixed = profile_batches([pd.DataFrame({"a": [1]}),
+                                 pd.DataFrame({"a": [1.5]}),
+                                 pd.DataFrame({"a": ["x"]})])
+        self.assertEqual(mixed["columns"]["a"]["dtype"], "object")
+        values = pd.DataFrame({"a": np.arange(100000) % 20000})
+        distinct = profile_batches([values.iloc[:50000],
+                                    values.iloc[50000:]])
+        self.assertAlmostEqual(distinct["columns"]["a"]["distinct"] / 20000,
+                               1, delta=0.1)
+
+    def test_register(self) -> None:
+        """
+        Tests that registered datasets store their profile, which is used
+        to detect the feature types without reading the data.
+        """
+        registry = ArtifactRegistry(Database(LocalStorage(tempfile.mkdtemp())),
+                                    LocalStorage(tempfile.mkdtemp()))
+        dataset = Dataset.from_dataframe(self.frame, "data", "data.csv")
+        registry.register(dataset)
+        stored = registry.get(dataset.id, lazy=True)
+        # The sketches are stored apart from the metadata
+        profile = stored.metadata["profile"]
+        self.assertNotIn("sketches", profile["columns"]["int"])
+        self.assertLess(len(json.dumps(profile)), 1000)
+        self.assertEqual(registry.load_profile(dataset.id), dataset.profile)
+        self.assertEqual(
+            merge_profiles(registry.load_profile(dataset.id),
+                           dataset.profile)["columns"]["str"]["top"],
+            [["a", 4], ["b", 2]])
+        registry.register(stored)
+        self.assertEqual(registry.load_profile(dataset.id), dataset.profile)
+        with mock.patch.object(Dataset, "view") as view, \
+                mock.patch.object(Dataset, "stream") as stream:
+            features = detect_feature_types(stored)
+        view.assert_not_called()
+        stream.assert_not_called()
+        self.assertEqual([feature.type for feature in features],
+                         ["numerical", "numerical", "categorical"])
+
+    def test_empty(self) -> None:
+        """
+        Tests profiling and detecting the feature types of datasets without
+        rows in both formats.
+        """
+        frame = self.frame[:0]
+        for format in Dataset.FORMATS:
+            dataset = Dataset.from_dataframe(frame, "data", "data.csv",
+                                             format=format)
+            batches = list(dataset.iter_batches(2))
+            self.assertEqual([batch.shape for batch in batches], [(0, 3)])
+            self.assertEqual(dataset.profile["rows"], 0)
+            self.assertEqual(list(dataset.profile["columns"]),
+                             ["int", "float", "str"])
+            for sample_size in [None, 10]:
+                features = detect_feature_types(dataset, sample_size)
+                self.assertEqual([feature.name for feature in features],
+                                 ["int", "float", "str"])
+
+    def test_detect_unpickled(self) -> None:
+        """
+        Tests detecting the feature types of a dataset pickled before it
+        kept its profile.
+        """
+        state = Dataset.from_dataframe(self.frame, "data",
+                                       "data.csv").__getstate__()
+        for name in ["_fingerprint", "_profile", "_loader", "_keep_data"]:
+            del state[name]
+        dataset = Dataset.__new__(Dataset)
+        dataset.__setstate__(state)
+        features = detect_feature_types(dataset)
+        self.assertEqual([feature.type for feature in features],
+                         ["numerical", "numerical", "categorical"])
+        self.assertEqual(features[2].cardinality, 2)
+
+    def test_detect_sample(self) -> None:
+        """
+        Tests detecting the feature types from a sample.
+        """
+        generator = np.random.default_rng(0)
+        frame = pd.DataFrame({
+            "rating": generator.integers(1, 6, 10000),
+            "id": np.arange(10000),
+            "price": generator.random(10000),
+            "code": np.where(generator.random(10000) < 0.1, np.nan,
+                             generator.integers(0, 3, 10000)),
+            "name": generator.choice(["a", "b"], 10000),
+        })
+        dataset = Dataset.from_dataframe(frame, "data", "data.csv",
+                                         format="columnar")
+        features = detect_feature_types(dataset, sample_size=1000)
+        self.assertEqual([feature.type for feature in features],
+                         ["categorical", "numerical", "numerical",
+                          "categorical", "categorical"])
+        self.assertEqual(features[0].cardinality, 5)
+        self.assertEqual(features[0].confidence, 0.75)
+        self.assertAlmostEqual(features[1].cardinality / 10000, 1,
+                               delta=0.5)
+        self.assertEqual([feature.confidence for feature in features[1:]],
+                         [1.0, 1.0, 0.85, 1.0])
+        self.assertIsNone(detect_feature_types(dataset)[0].confidence)
+
+    def test_merge(self) -> None:
+        """
+        Tests that merged profiles match the profile of all rows.
+        """
+        first = pd.DataFrame({"int": [1, 2, 3], "str": ["a", "b", "a"]})
+        second = pd.DataFrame({"int": [3, 4, 5, 6]})
+        merged = merge_profiles(json.loads(json.dumps(profile_frame(first))),
+                                profile_frame(second))
+        self.assertEqual(merged["rows"], 7)
+        column = merged["columns"]["int"]
+        self.assertEqual((column["min"], column["max"], column["distinct"]),
+                         (1, 6, 6))
+        self.assertEqual(column["mean"], 24 / 7)
+        self.assertEqual(column["quantiles"]["0.5"], 3)
+        column = merged["columns"]["str"]
+        self.assertEqual(column["nulls"], 4)
+        self.assertEqual(column["top"], [["a", 2], ["b", 1]])
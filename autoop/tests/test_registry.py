@@ -0,0 +1,275 @@
+from app.core.system import ArtifactRegistry, AsyncArtifactRegistry
+from app.core.system import AutoMLSystem
+from autoop.core.database import Database
+from autoop.core.ml.artifact import Artifact, FileLoader
+from autoop.core.ml.dataset import Dataset
+from autoop.core.storage import AsyncStorage, LocalStorage, NotFoundError
+
+import asyncio
+import io
+import os
+import pandas as pd
+import pickle
+import tempfile
+from typing import List
+import unittest
+from unittest import mock
+
+
+class TestRegistry(unittest.TestCase):
+    """
+    Class that is used for unit testing the ArtifactRegistry class.
+    """
+    def setUp(self) -> None:
+        """
+        Method that is ran before the tests begin.
+        """
+        self.storage = LocalStorage(tempfile.mkdtemp())
+        self.database = Database(LocalStorage(tempfile.mkdtemp()))
+        self.registry = ArtifactRegistry(self.database, self.storage)
+        self.dataset = Dataset.from_dataframe(
+            data=pd.DataFrame({"a": [1, 2, 3], "b": ["x", "y", "z"]}),
+            name="data",
+            asset_path="data.csv",
+        )
+
+    def test_list_lazy(self) -> None:
+        """
+        Tests that lazy listing only loads the data once it is read.
+        """
+        self.registry.register(self.dataset)
+        self.registry.register(Artifact(name="other", data=b"bytes",
+                                        asset_path="other", type="other"))
+        datasets = self.registry.list(type="dataset", lazy=True)
+        self.assertEqual(len(datasets), 1)
+        self.assertIsInstance(datasets[0], Dataset)
+        self.assertFalse(datasets[0].is_loaded)
+        self.assertEqual(datasets[0].id, self.dataset.id)
+        self.assertEqual(datasets[0].read()["b"].tolist(), ["x", "y", "z"])
+        self.assertFalse(datasets[0].is_loaded)
+        self.assertEqual(datasets[0].data, self.dataset.data)
+        self.assertTrue(datasets[0].is_loaded)
+
+    def test_register_many(self) -> None:
+        """
+        Tests registering and getting many artifacts, with per-item errors.
+        """
+        artifacts = [Artifact(name=f"a{i}", data=str(i % 3).encode(),
+                              asset_path=f"a{i}", type="other")
+                     for i in range(6)]
+        broken = Artifact(name="broken", asset_path="broken", type="other",
+                          loader=lambda: 1 / 0)
+        results = self.registry.register_many(artifacts + [broken])
+        self.assertEqual(results[:6], [None] * 6)
+        self.assertIsInstance(results[6], ZeroDivisionError)
+        self.assertEqual(len(self.storage.list("blobs")), 3)
+        found = self.registry.get_many(
+            [artifact.id for artifact in artifacts] + ["missing"])
+        self.assertEqual([artifact.data for artifact in found[:6]],
+                         [artifact.data for artifact in artifacts])
+        self.assertIsInstance(found[6], NotFoundError)
+        self.assertEqual(len(self.registry.list("other")), 6)
+
+    def test_register_many_same_data(self) -> None:
+        """
+        Tests that identical data of artifacts of different types registered
+        in one batch is stored once.
+        """
+        artifacts = [Artifact(name=type, data=b"same", asset_path=type,
+                              type=type) for type in ["model", "other"]]
+        self.assertEqual(self.registry.register_many(artifacts), [None] * 2)
+        self.assertEqual(len(self.storage.list("")), 1)
+        for artifact in artifacts:
+            self.assertEqual(self.registry.get(artifact.id).data, b"same")
+            self.registry.delete(artifact.id)
+        self.assertEqual(self.storage.list(""), [])
+        self.assertEqual(self.database.list("blobs"), [])
+
+    def test_async_event_loops(self) -> None:
+        """
+        Tests that the asynchronous registry can be used by several event
+        loops, also when calls wait for each other.
+        """
+        registry = AsyncArtifactRegistry(
+            self.registry, AsyncStorage(self.storage, max_concurrency=1))
+
+        async def calls(index: int) -> List[Artifact]:
+            await asyncio.gather(*(registry.register(Artifact(
+                name=f"a{index}{i}", data=f"{index}{i}".encode(),
+                asset_path=f"a{index}{i}", type="other")) for i in range(3)))
+            return await registry.list("other")
+
+        self.assertEqual(len(asyncio.run(calls(0))), 3)
+        self.assertEqual(len(asyncio.run(calls(1))), 6)
+
+    def test_register_file(self) -> None:
+        """
+        Tests that datasets of files are streamed to the storage, without
+        reading the whole file.
+        """
+        data = b"a,b\n1,x\n2,y\n"
+        dataset = Dataset.from_file(io.BytesIO(data), "file", "file.csv")
+        with mock.patch.object(FileLoader, "__call__") as read:
+            self.registry.register(dataset)
+        read.assert_not_called()
+        stored = self.registry.get(dataset.id)
+        self.assertEqual(stored.data, data)
+        self.assertEqual(stored.read()["b"].tolist(), ["x", "y"])
+
+    def test_lazy_artifact_is_immutable(self) -> None:
+        """
+        Tests that the data of a lazy artifact can not be overwritten.
+        """
+        self.registry.register(self.dataset)
+        dataset = self.registry.list(type="dataset", lazy=True)[0]
+        with self.assertRaises(AttributeError):
+            dataset.data = b"other"
+
+    def test_pickle_lazy(self) -> None:
+        """
+        Tests that a lazy artifact can be pickled, e.g. in a pipeline.
+        """
+        self.registry.register(self.dataset)
+        dataset = self.registry.list(type="dataset", lazy=True)[0]
+        restored = pickle.loads(pickle.dumps(dataset))
+        self.assertEqual(restored.data, self.dataset.data)
+
+    def test_get_latest(self) -> None:
+        """
+        Tests getting the latest version of an artifact by name.
+        """
+        for version in ["1.2.0", "1.10.0", "1.9.3"]:
+            self.registry.register(Artifact(
+                name="model", data=version.encode(), type="model",
+                asset_path="model", version=version))
+        latest = self.registry.get_latest("model")
+        self.assertEqual(latest.version, "1.10.0")
+        self.assertIsNone(self.registry.get_latest("other"))
+        self.assertEqual(len(self.registry.list(name_prefix="mod")), 3)
+        # Entries written by other tools may have versions that are not
+        # numeric, they rank below the numeric versions
+        for version in ["1.10rc1", "latest"]:
+            entry = dict(self.database.get("artifacts", latest.id))
+            entry["version"] = version
+            self.database.set("artifacts", f"model-{version}", entry)
+        self.assertEqual(self.registry.get_latest("model").version, "1.10.0")
+
+    def test_configure_sqlite(self) -> None:
+        """
+        Tests that the SQLite backends can be selected for the system.
+        """
+        config = dict(AutoMLSystem._config)
+        root = tempfile.mkdtemp()
+        try:
+            AutoMLSystem.configure(root=root, storage="sqlite",
+                                   database="sqlite")
+            AutoMLSystem.get_instance().registry.register(self.dataset)
+            self.assertIn("dbo.sqlite", os.listdir(root))
+            self.assertIn("objects.sqlite", os.listdir(root))
+            AutoMLSystem.configure()
+            datasets = AutoMLSystem.get_instance().registry.list("dataset")
+            self.assertEqual(datasets[0].read().shape, (3, 2))
+        finally:
+            AutoMLSystem.configure(**config)
+
+    def test_configure_compression(self) -> None:
+        """
+        Tests that artifact data is compressed with the codec of its type.
+        """
+        config = dict(AutoMLSystem._config)
+        try:
+            AutoMLSystem.configure(root=tempfile.mkdtemp(),
+                                   compression="lzma,dataset=zlib")
+            automl = AutoMLSystem.get_instance()
+            automl.registry.register(self.dataset)
+            key = automl.storage.list(
+                ArtifactRegistry.blob_prefix("dataset"))[0]
+            self.assertEqual(automl.storage.codec_for(key), "zlib")
+            self.assertEqual(automl.storage.codec_for("other"), "lzma")
+            datasets = automl.registry.list("dataset")
+            self.assertEqual(datasets[0].read().shape, (3, 2))
+        finally:
+            AutoMLSystem.configure(**config)
+
+    def test_deduplication(self) -> None:
+        """
+        Tests that identical data is stored once and deleted with its last
+        holder or reference.
+        """
+        copy = Dataset.from_dataframe(
+            data=self.dataset.read(), name="copy", asset_path="copy.csv")
+        self.registry.register(self.dataset)
+        self.registry.register(copy)
+        self.assertEqual(len(self.storage.list(
+            ArtifactRegistry.blob_prefix("dataset"))), 1)
+        reference = self.registry.reference(copy.id)
+        pipeline = Artifact(name="pipeline", data=pickle.dumps([reference]),
+                            type="pipeline", asset_path="pipeline.pkl")
+        self.registry.register(pipeline, references=[reference])
+        self.registry.delete(self.dataset.id)
+        self.registry.delete(copy.id)
+        self.assertEqual(len(self.storage.list("blobs")), 2)
+        stored = pickle.loads(self.registry.get(pipeline.id).data)[0]
+        dataset = self.registry.resolve(stored)
+        self.assertEqual(dataset.read().shape, (3, 2))
+        self.registry.delete(pipeline.id)
+        self.assertEqual(self.storage.list(""), [])
+        self.assertEqual(self.database.list("blobs"), [])
+
+    def test_reference_unhashed(self) -> None:
+        """
+        Tests referring to an artifact registered before data was stored by
+        hash, which moves its data to a blob.
+        """
+        self.storage.save(self.dataset.data, self.dataset.asset_path)
+        self.database.set("artifacts", self.dataset.id, {
+            "name": self.dataset.name,
+            "version": self.dataset.version,
+            "asset_path": self.dataset.asset_path,
+            "tags": [],
+            "metadata": self.dataset.metadata,
+            "type": "dataset",
+        })
+        reference = self.registry.reference(self.dataset.id)
+        self.assertEqual(self.registry.resolve(reference).read().shape,
+                         (3, 2))
+        self.assertIn("blob", self.database.get("artifacts",
+                                                self.dataset.id))
+        with self.assertRaises(NotFoundError):
+            self.storage.load(self.dataset.asset_path)
+
+
+class TestAsyncRegistry(unittest.IsolatedAsyncioTestCase):
+    """
+    Class that is used for unit testing the AsyncArtifactRegistry class.
+    """
+    def setUp(self) -> None:
+        """
+        Method that is ran before the tests begin.
+        """
+        storage = LocalStorage(tempfile.mkdtemp())
+        registry = ArtifactRegistry(Database(LocalStorage(tempfile.mkdtemp())),
+                                    storage)
+        self.registry = AsyncArtifactRegistry(registry, AsyncStorage(storage))
+
+    async def test_registry(self) -> None:
+        """
+        Tests registering, getting, listing and deleting asynchronously.
+        """
+        artifacts = [Artifact(name=f"a{i}", data=str(i).encode(),
+                              asset_path=f"a{i}", type="other")
+                     for i in range(4)]
+        await self.registry.register(artifacts[0])
+        self.assertEqual(await self.registry.register_many(artifacts[1:]),
+                         [None] * 3)
+        artifact = await self.registry.get(artifacts[0].id)
+        self.assertTrue(artifact.is_loaded)
+        self.assertEqual(artifact.data, b"0")
+        found = await self.registry.get_many([artifacts[1].id, "missing"])
+        self.assertEqual(found[0].data, b"1")
+        self.assertIsInstance(found[1], Exception)
+        listed = await self.registry.list("other")
+        self.assertTrue(all(artifact.is_loaded for artifact in listed))
+        await self.registry.delete(artifacts[0].id)
+        self.assertEqual(len(await self.registry.list("other", lazy=True)),
+                         3)
@@ -0,0 +1,110 @@
+from autoop.functional.sketch import (
+    CountMinSketch, HyperLogLog, KLLSketch, TopK, sketch_from_dict
+)
+
+import json
+import numpy as np
+import pandas as pd
+import unittest
+
+
+class TestSketch(unittest.TestCase):
+    """
+    Class that is used for unit testing the sketches.
+    """
+    def setUp(self) -> None:
+        """
+        Method that is ran before the tests begin.
+        """
+        generator = np.random.default_rng(0)
+        self.numbers = generator.normal(size=100000)
+        self.values = pd.Series(generator.zipf(1.5, 100000) % 5000)
+
+    def _round_trip(self, sketch: object) -> object:
+        """
+        Convert a sketch to JSON and back.
+
+        Args:
+            sketch (object): The sketch.
+        Returns:
+            object: The restored sketch.
+        """
+        return sketch_from_dict(json.loads(json.dumps(sketch.to_dict())))
+
+    def test_hyperloglog(self) -> None:
+        """
+        Tests estimating and merging distinct counts.
+        """
+        first = HyperLogLog()
+        second = HyperLogLog()
+        first.update(np.arange(30000))
+        second.update(np.arange(20000, 50000))
+        self.assertAlmostEqual(first.count() / 30000, 1, delta=0.07)
+        first.merge(self._round_trip(second))
+        self.assertAlmostEqual(first.count() / 50000, 1, delta=0.07)
+        small = HyperLogLog()
+        small.update(["a", "b", "a", None])
+        self.assertEqual(small.count(), 2)
+        with self.assertRaises(ValueError):
+            first.merge(HyperLogLog(precision=10))
+
+    def test_kll(self) -> None:
+        """
+        Tests estimating and merging quantiles.
+        """
+        sketch = KLLSketch(seed=0)
+        for batch in np.array_split(self.numbers[:50000], 7):
+            sketch.update(batch)
+        other = KLLSketch(seed=1)
+        other.update(self.numbers[50000:])
+        sketch.merge(self._round_trip(other))
+        self.assertEqual(sketch.count, 100000)
+        fractions = [0, 0.1, 0.5, 0.9, 1]
+        estimates = sketch.quantiles(fractions)
+        self.assertEqual(estimates[0], self.numbers.min())
+        self.assertEqual(estimates[-1], self.numbers.max())
+        for fraction, estimate in zip(fractions[1:-1], estimates[1:-1]):
+            rank = np.mean(self.numbers <= estimate)
+            self.assertAlmostEqual(rank, fraction, delta=0.02)
+        self.assertLess(sum(len(level) for level in sketch._levels), 1000)
+        self.assertEqual(KLLSketch().quantiles([0.5]), [None])
+
+    def test_count_min(self) -> None:
+        """
+        Tests estimating and merging counts of values.
+        """
+        sketch = CountMinSketch(width=512)
+        sketch.update(self.values[:50000])
+        other = CountMinSketch(width=512)
+        other.update(self.values[50000:])
+        sketch.merge(self._round_trip(other))
+        self.assertEqual(sketch.total, 100000)
+        exact = self.values.value_counts()
+        estimates = sketch.estimate(exact.index[:20])
+        self.assertTrue(np.all(estimates >= exact.to_numpy()[:20]))
+        error = estimates - exact.to_numpy()[:20]
+        self.assertTrue(np.all(error <= np.e / 512 * 100000))
+
+    def test_top_k(self) -> None:
+        """
+        Tests finding and merging the most frequent values.
+        """
+        sketch = TopK(k=50)
+        for batch in np.array_split(self.values, 10):
+            sketch.update(batch)
+        other = self._round_trip(sketch)
+        sketch.merge(other)
+        self.assertEqual(sketch.total, 200000)
+        exact = self.values.value_counts()
+        top = sketch.most_common(5)
+        self.assertEqual([value for value, _ in top],
+                         exact.index[:5].tolist())
+        for value, count in top:
+            self.assertLessEqual(count, 2 * exact[value])
+            self.assertGreaterEqual(count,
+                                    2 * exact[value] - 200000 / 51)
+        small = TopK()
+        small.update(["a", "b", "a"])
+        self.assertEqual(small.most_common(), [("a", 2), ("b", 1)])
+        with self.assertRaises(ValueError):
+            sketch_from_dict({"type": "unknown"})
@@ -1,9 +1,21 @@
-from autoop.core.storage import LocalStorage, NotFoundError
+from autoop.core.storage import (
+    AsyncStorage,
+    CachingStorage,
+    CompressedStorage,
+    LocalStorage,
+    NotFoundError,
+    ShardedStorage,
+    SQLiteStorage
+)
 
+import asyncio
+import io
 import os
 import random
 import tempfile
+import time
 import unittest
+from unittest import mock
 
 
 class TestStorage(unittest.TestCase):
@@ -68,3 +80,296 @@ class TestStorage(unittest.TestCase):
         keys = self.storage.list("test")
         keys = [f"{os.sep}".join(key.split(f"{os.sep}")[-2:]) for key in keys]
         self.assertEqual(set(keys), set(random_keys))
+
+    def test_append(self) -> None:
+        """
+        Tests the append method of the LocalStorage class.
+        """
+        key = f"test{os.sep}journal"
+        self.storage.append(b"first\n", key)
+        self.storage.append(b"second\n", key)
+        self.assertEqual(self.storage.load(key), b"first\nsecond\n")
+
+    def test_load_view(self) -> None:
+        """
+        Tests that a view of the stored data is read-only.
+        """
+        key = f"test{os.sep}view"
+        self.storage.save(b"first", key)
+        with self.storage.load_view(key) as view:
+            self.assertTrue(view.readonly)
+            self.assertEqual(bytes(view), b"first")
+        self.storage.save(b"", key)
+        with self.storage.load_view(key) as view:
+            self.assertEqual(bytes(view), b"")
+
+    def test_stream(self) -> None:
+        """
+        Tests saving and loading data in chunks.
+        """
+        key = f"test{os.sep}stream"
+        data = bytes(range(256)) * 5
+        self.storage.save_stream(io.BytesIO(data), key)
+        self.assertEqual(self.storage.load(key), data)
+        chunks = list(self.storage.load_stream(key, chunk_size=100))
+        self.assertTrue(all(len(chunk) <= 100 for chunk in chunks))
+        self.assertEqual(b"".join(chunks), data)
+        self.storage.save_stream([b"a", b"", memoryview(b"bc")], key)
+        self.assertEqual(self.storage.load(key), b"abc")
+
+    def test_many(self) -> None:
+        """
+        Tests saving and loading many keys at once.
+        """
+        keys = [f"many{os.sep}{i}" for i in range(20)]
+        data = [str(i).encode() for i in range(20)]
+        self.assertEqual(self.storage.save_many(data, keys), [None] * 20)
+        loaded = self.storage.load_many(keys + [f"many{os.sep}missing"])
+        self.assertEqual(loaded[:20], data)
+        self.assertIsInstance(loaded[20], NotFoundError)
+
+
+class TestSQLiteStorage(TestStorage):
+    """
+    Class that runs the storage tests against the SQLiteStorage class.
+    """
+    def setUp(self) -> None:
+        """
+        Method that is ran before the tests begin.
+        """
+        path = os.path.join(tempfile.mkdtemp(), "objects.sqlite")
+        self.storage = SQLiteStorage(path, chunk_size=16)
+
+    def test_init(self) -> None:
+        """
+        Tests the initalizer method of the SQLiteStorage class
+        """
+        self.assertIsInstance(self.storage, SQLiteStorage)
+
+    def test_chunks(self) -> None:
+        """
+        Tests that data spanning several chunks is restored.
+        """
+        data = bytes(range(256)) * 3
+        self.storage.save(data, "blob")
+        self.storage.append(b"tail", "blob")
+        self.assertEqual(self.storage.load("blob"), data + b"tail")
+        self.storage.save(b"short", "blob")
+        self.assertEqual(self.storage.load("blob"), b"short")
+
+    def test_list_prefix(self) -> None:
+        """
+        Tests that listing a prefix only returns the keys in that directory.
+        """
+        for key in ["a", f"a{os.sep}b", f"ab{os.sep}c", f"a{os.sep}c"]:
+            self.storage.save(b"", key)
+        self.assertEqual(self.storage.list("a"),
+                         ["a", f"a{os.sep}b", f"a{os.sep}c"])
+        with self.assertRaises(NotFoundError):
+            self.storage.list("missing")
+
+
+class TestCachingStorage(TestStorage):
+    """
+    Class that runs the storage tests against the CachingStorage class.
+    """
+    def setUp(self) -> None:
+        """
+        Method that is ran before the tests begin.
+        """
+        self.storage = CachingStorage(LocalStorage(tempfile.mkdtemp()),
+                                      max_bytes=10)
+
+    def test_init(self) -> None:
+        """
+        Tests the initalizer method of the CachingStorage class
+        """
+        self.assertIsInstance(self.storage, CachingStorage)
+
+    def test_cache(self) -> None:
+        """
+        Tests hits, misses, evictions and invalidation of the cache.
+        """
+        self.storage.save(b"aaaa", "a")
+        self.storage.save(b"bbbb", "b")
+        self.storage.save(b"cccc", "c")
+        self.storage.load("a")
+        self.storage.load("b")
+        self.storage.load("a")
+        self.assertEqual(self.storage.stats["hits"], 1)
+        self.assertEqual(self.storage.stats["misses"], 2)
+        self.storage.load("c")
+        self.assertEqual(self.storage.stats["evictions"], 1)
+        self.assertEqual(self.storage.stats["bytes"], 8)
+        self.storage.load("a")
+        self.assertEqual(self.storage.stats["hits"], 2)
+        self.storage.save(b"dddd", "a")
+        self.assertEqual(self.storage.load("a"), b"dddd")
+        self.assertEqual(self.storage.stats["misses"], 4)
+
+    def test_save_during_load(self) -> None:
+        """
+        Tests that data saved while it is loaded from the wrapped storage
+        does not leave the outdated data in the cache.
+        """
+        backend = self.storage.storage
+        self.storage.save(b"old", "a")
+        load = backend.load
+
+        def load_and_save(key: str) -> bytes:
+            data = load(key)
+            self.storage.save(b"new", key)
+            return data
+
+        with mock.patch.object(backend, "load", side_effect=load_and_save):
+            self.assertEqual(self.storage.load("a"), b"old")
+        self.assertEqual(self.storage.load("a"), b"new")
+        with self.assertRaises(NotFoundError):
+            self.storage.load("missing")
+        self.assertEqual(self.storage._loading, {})
+
+
+class TestShardedStorage(TestStorage):
+    """
+    Class that runs the storage tests against the ShardedStorage class.
+    """
+    def setUp(self) -> None:
+        """
+        Method that is ran before the tests begin.
+        """
+        self.path = tempfile.mkdtemp()
+        self.storage = ShardedStorage(self.path, compact_every=4)
+
+    def test_init(self) -> None:
+        """
+        Tests the initalizer method of the ShardedStorage class
+        """
+        self.assertIsInstance(self.storage, ShardedStorage)
+
+    def test_index(self) -> None:
+        """
+        Tests that the index is shared, compacted and rebuilt.
+        """
+        for key in ["a", f"a{os.sep}1", f"a{os.sep}2", f"ab{os.sep}1",
+                    ".manifest"]:
+            self.storage.save(b"data", key)
+        self.assertEqual(self.storage.list("a"),
+                         [f"a{os.sep}1", f"a{os.sep}2"])
+        with self.assertRaises(NotFoundError):
+            self.storage.list("b")
+        other = ShardedStorage(self.path)
+        other.delete(f"a{os.sep}1")
+        for _ in range(3):
+            other.save(b"data", f"c{os.sep}1")
+            other.delete(f"c{os.sep}1")
+        self.storage.save(b"data", f"c{os.sep}2")
+        self.assertEqual(self.storage.list("a"), [f"a{os.sep}2"])
+        self.assertEqual(other.list("c"), [f"c{os.sep}2"])
+        keys = self.storage.list("")
+        os.remove(os.path.join(self.path, ".index"))
+        self.assertEqual(ShardedStorage(self.path).list(""), keys)
+        with open(os.path.join(self.path, ".index"), "rb") as f:
+            self.assertEqual(len(f.read().splitlines()), len(keys))
+
+    def test_long_keys(self) -> None:
+        """
+        Tests keys longer than a file name, in segments as in LocalStorage.
+        """
+        keys = [f"a{os.sep}" + "b" * 250, os.sep.join(["c=/d+"] * 40)]
+        for key in keys:
+            self.storage.save(b"data", os.path.normpath(key))
+        keys = sorted(os.path.normpath(key) for key in keys)
+        self.assertEqual(self.storage.list(""), keys)
+        self.assertEqual(self.storage.load(keys[1]), b"data")
+        os.remove(os.path.join(self.path, ".index"))
+        self.assertEqual(ShardedStorage(self.path).list(""), keys)
+
+
+class TestCompressedStorage(TestStorage):
+    """
+    Class that runs the storage tests against the CompressedStorage class.
+    """
+    def setUp(self) -> None:
+        """
+        Method that is ran before the tests begin.
+        """
+        self.base = LocalStorage(tempfile.mkdtemp())
+        self.storage = CompressedStorage(
+            self.base, codec="zlib",
+            rules={"bz": "bz2", "xz": "lzma", f"xz{os.sep}raw": "none"})
+
+    def test_init(self) -> None:
+        """
+        Tests the initalizer method of the CompressedStorage class
+        """
+        self.assertIsInstance(self.storage, CompressedStorage)
+        with self.assertRaises(ValueError):
+            CompressedStorage(self.base, codec="zip")
+
+    def test_codecs(self) -> None:
+        """
+        Tests that every codec round-trips and is chosen by key prefix.
+        """
+        data = b"sepal_length,sepal_width\n" * 1000
+        keys = {"plain": "zlib", f"bz{os.sep}a": "bz2",
+                f"xz{os.sep}a": "lzma", f"xz{os.sep}raw{os.sep}a": "none"}
+        for key, codec in keys.items():
+            self.assertEqual(self.storage.codec_for(key), codec)
+            self.storage.save(data, key)
+            self.assertEqual(self.storage.load(key), data)
+            self.assertEqual(b"".join(self.storage.load_stream(key, 7)),
+                             data)
+            with self.storage.load_view(key) as view:
+                self.assertEqual(bytes(view), data)
+            stored = len(self.base.load(key))
+            if codec == "none":
+                self.assertEqual(stored, len(data) + 5)
+            else:
+                self.assertLess(stored, len(data) // 10)
+
+    def test_legacy(self) -> None:
+        """
+        Tests that data saved without compression is loaded as is.
+        """
+        self.base.save(b"legacy", "old")
+        self.assertEqual(self.storage.load("old"), b"legacy")
+        self.assertEqual(b"".join(self.storage.load_stream("old", 2)),
+                         b"legacy")
+
+
+class TestAsyncStorage(unittest.IsolatedAsyncioTestCase):
+    """
+    Class that is used for testing the AsyncStorage class.
+    """
+    def setUp(self) -> None:
+        """
+        Method that is ran before the tests begin.
+        """
+        self.storage = AsyncStorage(LocalStorage(tempfile.mkdtemp()),
+                                    max_concurrency=2)
+
+    async def test_calls(self) -> None:
+        """
+        Tests the asynchronous calls and the limit on concurrent calls.
+        """
+        keys = [f"test{os.sep}{i}" for i in range(5)]
+        await asyncio.gather(*(self.storage.save(key.encode(), key)
+                               for key in keys))
+        self.assertEqual(sorted(await self.storage.list("test")), keys)
+        loaded = await self.storage.load_many(keys + ["missing"])
+        self.assertEqual(loaded[:5], [key.encode() for key in keys])
+        self.assertIsInstance(loaded[5], NotFoundError)
+        await self.storage.delete(keys[0])
+        with self.assertRaises(NotFoundError):
+            await self.storage.load(keys[0])
+        running = []
+        peak = []
+
+        def call() -> None:
+            running.append(None)
+            peak.append(len(running))
+            time.sleep(0.01)
+            running.pop()
+
+        await asyncio.gather(*(self.storage.run(call) for _ in range(6)))
+        self.assertLessEqual(max(peak), 2)
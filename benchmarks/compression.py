@@ -0,0 +1,61 @@
+"""
+Benchmark of the codecs of CompressedStorage on the bundled datasets.
+
+Prints the compression ratio, the write time and the read throughput of
+every codec per file. Run from the root of the repository:
+
+    python -m benchmarks.compression
+"""
+from autoop.core.storage import CompressedStorage, LocalStorage
+
+import glob
+import os
+import tempfile
+import time
+
+REPEATS = 5
+
+
+def benchmark(storage: CompressedStorage, data: bytes) -> tuple:
+    """
+    Save and load data repeatedly and time it.
+
+    Args:
+        storage (CompressedStorage): The storage to benchmark.
+        data (bytes): The data to save and load.
+    Returns:
+        tuple: The stored size, the best write time and the best read time.
+    """
+    writes = []
+    reads = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        storage.save(data, "data")
+        writes.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        storage.load("data")
+        reads.append(time.perf_counter() - start)
+    stored = len(storage.storage.load("data"))
+    return stored, min(writes), min(reads)
+
+
+def main() -> None:
+    """
+    Run the benchmark on every file in the datasets folder.
+    """
+    print(f"{'file':<40}{'codec':<7}{'ratio':>8}{'write ms':>10}"
+          f"{'read MB/s':>11}")
+    for path in sorted(glob.glob(os.path.join("datasets", "*"))):
+        with open(path, "rb") as file:
+            data = file.read()
+        for codec in CompressedStorage.CODECS:
+            storage = CompressedStorage(LocalStorage(tempfile.mkdtemp()),
+                                        codec=codec)
+            stored, write, read = benchmark(storage, data)
+            print(f"{os.path.basename(path)[:39]:<40}{codec:<7}"
+                  f"{len(data) / stored:>8.2f}{write * 1000:>10.2f}"
+                  f"{len(data) / read / 1e6:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()